@@ -0,0 +1,6 @@
+"""
+Пакет benchmarks: воспроизводимые замеры производительности бота.
+
+Скрипты запускаются как модули из корня проекта, например:
+``python -m benchmarks.slots_queries``.
+"""
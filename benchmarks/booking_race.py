@@ -0,0 +1,153 @@
+"""
+Нагрузочная проверка уникальности слота при одновременной записи.
+
+Запускает сотни одновременных попыток записать разных клиентов на одно
+и то же время, каждую в своей сессии. Ровно одна попытка должна
+завершиться успехом, остальные — ошибкой SlotTakenError; в базе должна
+остаться ровно одна активная запись на это время. Ожидание блокировки
+записи (BookingBusyError) считается отдельно: при настройках рабочего
+бота (WAL, таймаут ожидания) таких исходов быть не должно. Затем то же самое
+проверяется для переноса: сотни записей одновременно переносятся на один
+свободный слот.
+
+Запуск:
+    python -m benchmarks.booking_race [количество попыток]
+"""
+import asyncio
+import json
+import sys
+import time as perf
+from datetime import date, datetime, time, timedelta
+
+from benchmarks.common import setup_sqlite_engine
+
+from sqlalchemy import func, select
+
+import database.session as db_session
+from database.migrations import migrate
+from database.models import Appointment, Client
+from services.booking import (
+    BookingBusyError,
+    SlotTakenError,
+    book_appointment,
+    reschedule_appointment
+)
+
+DEFAULT_ATTEMPTS = 300
+
+
+async def seed_clients(count: int) -> list:
+    """
+    Создать клиентов для нагрузочной проверки.
+    
+    Args:
+        count: Количество клиентов
+    
+    Returns:
+        list: ID созданных клиентов
+    """
+    async with db_session.SessionLocal() as session:
+        clients = [
+            Client(full_name=f"Клиент {i}", phone_number=f"+7000{i:07d}")
+            for i in range(count)
+        ]
+        session.add_all(clients)
+        await session.commit()
+        return [client.id for client in clients]
+
+
+async def attempt(call, *args) -> str:
+    """
+    Выполнить одну попытку записи или переноса в отдельной сессии.
+    
+    Args:
+        call: book_appointment или reschedule_appointment
+        *args: Аргументы вызова после сессии
+    
+    Returns:
+        str: 'ok', 'taken', 'busy' или 'missed'
+    """
+    async with db_session.SessionLocal() as session:
+        try:
+            result = await call(session, *args)
+        except SlotTakenError:
+            return "taken"
+        except BookingBusyError:
+            return "busy"
+    return "ok" if result is not False else "missed"
+
+
+async def active_at(slot: datetime) -> int:
+    """Посчитать активные записи на указанное время."""
+    async with db_session.SessionLocal() as session:
+        return await session.scalar(
+            select(func.count()).select_from(Appointment).where(
+                Appointment.date_time == slot,
+                Appointment.status == "active"
+            )
+        )
+
+
+async def main(attempts: int) -> None:
+    """Выполнить проверку и вывести результат в формате JSON."""
+    engine = await setup_sqlite_engine()
+    await migrate(engine)
+    client_ids = await seed_clients(attempts)
+    day = date.today() + timedelta(days=1)
+    slot = datetime.combine(day, time(hour=10))
+    
+    started = perf.perf_counter()
+    outcomes = await asyncio.gather(*(
+        attempt(book_appointment, client_id, slot, "consult")
+        for client_id in client_ids
+    ))
+    booking = {
+        "attempts": attempts,
+        "ok": outcomes.count("ok"),
+        "taken": outcomes.count("taken"),
+        "busy": outcomes.count("busy"),
+        "active_rows": await active_at(slot),
+        "wall_ms": round((perf.perf_counter() - started) * 1000, 1),
+    }
+    
+    # Каждому клиенту — своя запись, затем все переносятся на 12:00
+    appointment_ids = []
+    async with db_session.SessionLocal() as session:
+        for index, client_id in enumerate(client_ids):
+            appointment_ids.append(await book_appointment(
+                session,
+                client_id,
+                datetime.combine(day + timedelta(days=1 + index), time(hour=10)),
+                "consult"
+            ))
+    target = datetime.combine(day, time(hour=12))
+    started = perf.perf_counter()
+    outcomes = await asyncio.gather(*(
+        attempt(reschedule_appointment, appointment_id, target)
+        for appointment_id in appointment_ids
+    ))
+    reschedule = {
+        "attempts": attempts,
+        "ok": outcomes.count("ok"),
+        "taken": outcomes.count("taken"),
+        "busy": outcomes.count("busy"),
+        "active_rows": await active_at(target),
+        "wall_ms": round((perf.perf_counter() - started) * 1000, 1),
+    }
+    await engine.dispose()
+    
+    print(json.dumps(
+        {"booking": booking, "reschedule": reschedule},
+        ensure_ascii=False,
+        indent=2
+    ))
+    if any(
+        result["active_rows"] != 1 or result["ok"] != 1 or result["busy"]
+        for result in (booking, reschedule)
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ATTEMPTS
+    asyncio.run(main(count))
@@ -0,0 +1,155 @@
+"""
+Проверка кодека данных inline-кнопок (keyboards/callbacks.py).
+
+Для каждого кодека упаковывает граничные значения полей и проверяет,
+что данные не длиннее 64 байт, декодируются обратно без потерь
+и не подходят ни под один другой кодек (включая кнопки напоминаний
+прежнего формата «confirm_{id}_yes»).
+
+Затем сравнивает стоимость декодирования одного нажатия: прежний путь
+(replace префикса и datetime.strptime) против codec.unpack для выбора
+даты и времени, а также длину данных в обоих форматах.
+
+Запуск:
+    python -m benchmarks.callback_codec
+"""
+import argparse
+import json
+import sys
+import timeit
+from datetime import date, datetime, time
+
+from keyboards.callbacks import (
+    BOOKING_CONFIRM,
+    BOOKING_DATE,
+    BOOKING_PSYCHOLOGIST,
+    BOOKING_SERVICE,
+    BOOKING_TIME,
+    CANCEL_APPOINTMENT,
+    DELETE_WORK_DAY,
+    MANUAL_TIME,
+    MAX_CALLBACK_DATA,
+    RECORDS_PAGE,
+    REMINDER_ANSWER,
+    RESCHEDULE_DATE,
+    RESCHEDULE_START,
+    RESCHEDULE_TIME,
+    LegacyReminderAnswerFilter,
+    registered_prefixes
+)
+
+DEFAULT_NUMBER = 100_000
+MAX_ID = 2 ** 63 - 1
+LAST_DATE = date(2099, 12, 31)
+
+# Граничные значения полей для каждого кодека
+SAMPLES = {
+    BOOKING_PSYCHOLOGIST: [(1,), (MAX_ID,)],
+    BOOKING_SERVICE: [("consult",), ("supervision",)],
+    BOOKING_DATE: [(date(2020, 1, 1),), (LAST_DATE,)],
+    BOOKING_TIME: [(time(0, 0),), (time(23, 59),)],
+    BOOKING_CONFIRM: [(True,), (False,)],
+    REMINDER_ANSWER: [(1, True), (MAX_ID, False)],
+    CANCEL_APPOINTMENT: [(0,), (MAX_ID,)],
+    RESCHEDULE_START: [(1,), (MAX_ID,)],
+    RESCHEDULE_DATE: [(date(2020, 1, 1),), (LAST_DATE,)],
+    RESCHEDULE_TIME: [(time(0, 0),), (time(23, 59),)],
+    MANUAL_TIME: [(time(9, 30),), (time(23, 59),)],
+    RECORDS_PAGE: [("week", 0), (LAST_DATE.isoformat(), 9999)],
+    DELETE_WORK_DAY: [(0,), (6,)],
+}
+
+
+def check_codecs() -> list:
+    """
+    Проверить длину, обратимость и непересечение данных всех кодеков.
+    
+    Returns:
+        list: Описания найденных нарушений
+    """
+    failures = [
+        f"{prefix}: нет примеров значений"
+        for prefix in registered_prefixes()
+        if prefix not in {codec.prefix for codec in SAMPLES}
+    ]
+    legacy = LegacyReminderAnswerFilter.pattern
+    for codec, samples in SAMPLES.items():
+        for values in samples:
+            data = codec.pack(*values)
+            if len(data.encode()) > MAX_CALLBACK_DATA:
+                failures.append(f"{data}: длиннее {MAX_CALLBACK_DATA} байт")
+            if tuple(codec.unpack(data)) != values:
+                failures.append(f"{data}: декодируется в {tuple(codec.unpack(data))}, ожидалось {values}")
+            others = [other.prefix for other in SAMPLES if other is not codec and other.matches(data)]
+            if others or legacy.match(data):
+                failures.append(f"{data}: подходит под {others or ['confirm_{id}_yes|no']}")
+    for data in ("confirm_yes", "confirm_no", "confirm_15_yes", "confirm_15_no"):
+        matched = [codec.prefix for codec in SAMPLES if codec.matches(data)]
+        if matched:
+            failures.append(f"{data}: прежний формат подходит под {matched}")
+    return failures
+
+
+def measure_decoding(number: int) -> dict:
+    """
+    Сравнить декодирование нажатия в прежнем формате и через кодек.
+    
+    Args:
+        number: Количество декодирований в замере
+    
+    Returns:
+        dict: Время на одно декодирование (мкс), ускорение и длина данных
+    """
+    day = date(2025, 11, 5)
+    cases = {
+        "date": (
+            f"date_{day.strftime('%Y-%m-%d')}",
+            lambda data: datetime.strptime(data.replace("date_", ""), "%Y-%m-%d").date(),
+            BOOKING_DATE.pack(day),
+            BOOKING_DATE.unpack
+        ),
+        "time": (
+            "time_14:30",
+            lambda data: datetime.strptime(data.replace("time_", ""), "%H:%M").time(),
+            BOOKING_TIME.pack("14:30"),
+            BOOKING_TIME.unpack
+        ),
+    }
+    results = {}
+    for name, (old_data, old_decode, new_data, new_decode) in cases.items():
+        old_us = min(timeit.repeat(lambda: old_decode(old_data), number=number, repeat=3)) / number * 1e6
+        new_us = min(timeit.repeat(lambda: new_decode(new_data), number=number, repeat=3)) / number * 1e6
+        results[name] = {
+            "legacy": {"data": old_data, "bytes": len(old_data), "decode_us": round(old_us, 3)},
+            "codec": {"data": new_data, "bytes": len(new_data), "decode_us": round(new_us, 3)},
+            "speedup": round(old_us / new_us, 1),
+        }
+    return results
+
+
+def main(number: int) -> None:
+    """Выполнить проверки и вывести результат в формате JSON."""
+    failures = check_codecs()
+    decoding = measure_decoding(number)
+    failures.extend(
+        f"{name}: декодирование кодеком не быстрее прежнего ({result['speedup']}x)"
+        for name, result in decoding.items()
+        if result["speedup"] <= 1
+    )
+    print(json.dumps(
+        {
+            "codecs": sorted(codec.prefix for codec in SAMPLES),
+            "decoding": decoding,
+            "failures": failures,
+        },
+        ensure_ascii=False,
+        indent=2
+    ))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=DEFAULT_NUMBER)
+    main(parser.parse_args().number)
@@ -0,0 +1,183 @@
+"""
+Проверка кэша клиентов (services/clients.py).
+
+Создаёт постоянных клиентов и прогоняет через диспетчер их обращения
+(/start и /my) с неравномерной частотой: часть клиентов пишет чаще
+остальных. Сравнивает число SQL-запросов на обновление без кэша
+(кэш очищается перед каждым обновлением) и с кэшем, выводит долю
+попаданий.
+
+Затем проверяет ограничение размера (вытеснение давно не использованных
+клиентов), истечение срока жизни записи и обновление снимка после
+изменения клиента.
+
+Запуск:
+    python -m benchmarks.client_cache --clients 200 --updates 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+
+from benchmarks.common import setup_engine, count_queries
+
+from aiogram import Dispatcher
+from aiogram.types import Update
+
+import database.session as db_session
+import services.clients as clients
+from database.models import Client
+from benchmarks.fake_bot_api import FakeBotApi
+from benchmarks.update_sessions import message_update, seed_schedule
+from handlers.client.booking import register_client_handlers
+from handlers.client.cancel import register_cancel_handlers
+from middlewares.db_session import register_db_session_middleware
+
+DEFAULT_CLIENTS = 200
+DEFAULT_UPDATES = 2000
+FIRST_USER_ID = 40_000
+
+
+async def seed_clients(count: int) -> None:
+    """Создать постоянных клиентов с Telegram ID."""
+    async with db_session.SessionLocal() as session:
+        session.add_all([
+            Client(
+                full_name=f"Клиент {index} Постоянный",
+                phone_number=f"+7903{index:07d}",
+                telegram_id=FIRST_USER_ID + index
+            )
+            for index in range(count)
+        ])
+        await session.commit()
+
+
+async def run_updates(dp, bot, engine, users, cold: bool) -> dict:
+    """
+    Подать обновления /start и /my и посчитать SQL-запросы.
+    
+    Args:
+        dp: Диспетчер с обработчиками
+        bot: Бот, подключённый к заглушке Bot API
+        engine: Движок базы
+        users: Telegram ID отправителей по порядку
+        cold: Очищать кэш перед каждым обновлением
+    
+    Returns:
+        dict: Число запросов на обновление, попадания и промахи кэша
+    """
+    clients.clear_client_cache()
+    before = clients.client_cache_stats()
+    with count_queries(engine) as counter:
+        for update_id, user_id in enumerate(users, start=1):
+            if cold:
+                clients.clear_client_cache()
+            text = "/start" if update_id % 2 else "/my"
+            update = Update.model_validate(message_update(update_id, text, user_id), context={"bot": bot})
+            await dp.feed_update(bot, update)
+    after = clients.client_cache_stats()
+    hits = after["hits"] - before["hits"]
+    misses = after["misses"] - before["misses"]
+    return {
+        "queries_per_update": round(counter.count / len(users), 3),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+    }
+
+
+async def check_bounds() -> list:
+    """
+    Проверить вытеснение, срок жизни и обновление снимка.
+    
+    Returns:
+        list: Описания найденных нарушений
+    """
+    failures = []
+    size, ttl = clients.CLIENT_CACHE_SIZE, clients.CLIENT_CACHE_TTL
+    clients.clear_client_cache()
+    try:
+        clients.CLIENT_CACHE_SIZE = 3
+        async with db_session.SessionLocal() as session:
+            for index in range(5):
+                await clients.get_client_by_telegram_id(session, FIRST_USER_ID + index)
+            if clients.client_cache_stats()["size"] != 3:
+                failures.append("размер кэша превысил CLIENT_CACHE_SIZE")
+            if clients.peek_client_by_telegram_id(FIRST_USER_ID) is not None:
+                failures.append("давно не использованный клиент не вытеснен")
+            
+            clients.CLIENT_CACHE_TTL = -1
+            identity = await clients.get_client_by_telegram_id(session, FIRST_USER_ID)
+            if clients.peek_client(identity.id) is not None:
+                failures.append("запись с истёкшим сроком жизни возвращена из кэша")
+            clients.CLIENT_CACHE_TTL = ttl
+            
+            client = await session.get(Client, identity.id)
+            client.phone_number = "+79990000000"
+            await session.commit()
+            clients.remember_client(client)
+            cached = await clients.get_client_by_telegram_id(session, FIRST_USER_ID)
+            if cached.phone_number != "+79990000000":
+                failures.append("снимок клиента не обновлён после изменения")
+            clients.invalidate_client(telegram_id=FIRST_USER_ID)
+            if clients.peek_client(identity.id) is not None:
+                failures.append("клиент остался в кэше после invalidate_client")
+    finally:
+        clients.CLIENT_CACHE_SIZE, clients.CLIENT_CACHE_TTL = size, ttl
+    return failures
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Выполнить проверку и вывести результат в формате JSON."""
+    engine = await setup_engine(args.db_url)
+    await seed_schedule()
+    await seed_clients(args.clients)
+    api = FakeBotApi()
+    await api.start()
+    bot = api.create_bot()
+    dp = Dispatcher()
+    register_db_session_middleware(dp)
+    register_client_handlers(dp)
+    register_cancel_handlers(dp)
+    
+    # Частота обращений клиента убывает с его номером (закон Ципфа)
+    rng = random.Random(args.seed)
+    weights = [1 / (index + 1) for index in range(args.clients)]
+    users = [
+        FIRST_USER_ID + index
+        for index in rng.choices(range(args.clients), weights, k=args.updates)
+    ]
+    cold = await run_updates(dp, bot, engine, users, cold=True)
+    warm = await run_updates(dp, bot, engine, users, cold=False)
+    size = clients.client_cache_stats()["size"]
+    failures = await check_bounds()
+    await bot.session.close()
+    await api.stop()
+    await engine.dispose()
+    
+    if warm["queries_per_update"] >= cold["queries_per_update"]:
+        failures.append("кэш не уменьшил число запросов")
+    print(json.dumps(
+        {
+            "clients": args.clients,
+            "updates": args.updates,
+            "without_cache": cold,
+            "with_cache": warm,
+            "cached_clients": size,
+            "failures": failures,
+        },
+        ensure_ascii=False,
+        indent=2
+    ))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db-url", help="URL базы (по умолчанию временная SQLite)")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument("--updates", type=int, default=DEFAULT_UPDATES)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
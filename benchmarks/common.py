@@ -0,0 +1,122 @@
+"""
+Общие утилиты для бенчмарков.
+
+Поднимает временную базу SQLite (aiosqlite) или подключается к указанной
+базе, подключает к ней фабрику сессий проекта и считает SQL-запросы,
+выполненные во время замера.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+# config.py требует эти переменные; для замеров подойдут любые значения
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+os.environ.setdefault("PSYCHOLOGIST_ID", "1")
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker
+)
+
+import database.session as db_session
+from database.migrations import ensure_default_psychologist, migrate
+from database.models import Base
+
+
+class QueryCounter:
+    """
+    Счётчик SQL-запросов, выполненных движком.
+    
+    Attributes:
+        statements (List[str]): Тексты выполненных запросов
+        commits (int): Количество фиксаций транзакций
+    """
+
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+        self.commits = 0
+
+    @property
+    def count(self) -> int:
+        """Количество выполненных запросов."""
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, *args) -> None:
+        self.statements.append(statement)
+
+    def _on_commit(self, conn) -> None:
+        self.commits += 1
+
+
+async def setup_sqlite_engine() -> AsyncEngine:
+    """
+    Создать временную базу SQLite и подключить к ней сессии проекта.
+    
+    Движок строится как в рабочем боте (build_engine): журнал WAL
+    и ожидание блокировки записи вместо немедленной ошибки. Создаёт все
+    таблицы и подменяет ``database.session.SessionLocal``, чтобы сервисы
+    работали с временной базой. Внешние ключи проверяются, поэтому
+    заводится и психолог по умолчанию, как в новой рабочей базе.
+    
+    Returns:
+        AsyncEngine: Движок временной базы
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="psybot-bench-"), "bench.db")
+    engine = db_session.build_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(ensure_default_psychologist)
+    db_session.engine = engine
+    db_session.SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    return engine
+
+
+async def setup_engine(url: Optional[str] = None) -> AsyncEngine:
+    """
+    Подключить сессии проекта к базе для замера.
+    
+    Без URL создаётся временная база SQLite. С URL (например, локальный
+    PostgreSQL) движок строится как в рабочем боте (build_engine),
+    недостающие таблицы создаются и применяются миграции. Используйте
+    отдельную базу: бенчмарки очищают таблицы перед заполнением.
+    
+    Args:
+        url: URL базы данных SQLAlchemy или None
+    
+    Returns:
+        AsyncEngine: Движок базы
+    """
+    if url is None:
+        engine = await setup_sqlite_engine()
+    else:
+        engine = db_session.build_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        db_session.engine = engine
+        db_session.SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    await migrate(engine)
+    return engine
+
+
+@contextmanager
+def count_queries(engine: AsyncEngine) -> Iterator[QueryCounter]:
+    """
+    Посчитать SQL-запросы и фиксации внутри блока ``with``.
+    
+    Args:
+        engine: Движок, запросы которого нужно считать
+    
+    Yields:
+        QueryCounter: Счётчик, заполняемый по мере выполнения запросов
+    """
+    counter = QueryCounter()
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", counter._on_execute)
+    event.listen(sync_engine, "commit", counter._on_commit)
+    try:
+        yield counter
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", counter._on_execute)
+        event.remove(sync_engine, "commit", counter._on_commit)
@@ -0,0 +1,200 @@
+"""
+Заглушка сервера Telegram Bot API для бенчмарков.
+
+Поднимает локальный aiohttp-сервер с маршрутом /bot{token}/{method}
+и отвечает на методы, которыми пользуется бот:
+
+- getMe — описание бота;
+- getUpdates — long polling по очереди обновлений, добавленных push_update;
+- sendMessage, editMessageText — объект сообщения;
+- остальные методы (setWebhook, deleteWebhook, answerCallbackQuery...) — True.
+
+Отправленные и изменённые сообщения записываются (messages_for) вместе
+с клавиатурами, поэтому имитируемый клиент может нажимать кнопки, которые
+ему действительно показал бот. inject_faults() включает ответы 429
+(RetryAfter) и зависания дольше таймаута клиента для части вызовов.
+
+Бот aiogram подключается к заглушке через create_bot().
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+BOT_TOKEN = "42:fake"
+BOT_INFO = {"id": 42, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+
+
+class FakeBotApi:
+    """
+    Локальная заглушка Bot API.
+    
+    Attributes:
+        calls (Counter): Число обращений по каждому методу
+        faults (Counter): Число внедрённых сбоев по виду (retry_after, timeout)
+    """
+
+    def __init__(self) -> None:
+        self.calls: Counter = Counter()
+        self.faults: Counter = Counter()
+        self._messages: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        self._retry_after_rate = 0.0
+        self._timeout_rate = 0.0
+        self._retry_after = 1
+        self._hang = 0.0
+        self._fault_methods: Sequence[str] = ()
+        self._random = random.Random(0)
+        self._updates: List[Dict[str, Any]] = []
+        self._arrived = asyncio.Event()
+        self._message_id = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    async def start(self) -> str:
+        """
+        Запустить сервер на свободном порту.
+        
+        Returns:
+            str: Базовый адрес сервера
+        """
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        """Остановить сервер."""
+        self._arrived.set()
+        await self._runner.cleanup()
+
+    def create_bot(self, timeout: float = 60.0) -> Bot:
+        """
+        Создать бота aiogram, обращающегося к заглушке.
+        
+        Args:
+            timeout: Таймаут запроса к Bot API, секунд
+        """
+        session = AiohttpSession(
+            api=TelegramAPIServer.from_base(self.base_url),
+            timeout=timeout
+        )
+        return Bot(token=BOT_TOKEN, session=session)
+
+    def inject_faults(
+        self,
+        retry_after_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        retry_after: int = 1,
+        hang: float = 5.0,
+        methods: Sequence[str] = ("sendMessage", "editMessageText"),
+        seed: int = 0
+    ) -> None:
+        """
+        Включить сбои для части вызовов.
+        
+        Args:
+            retry_after_rate: Доля вызовов с ответом 429 (Too Many Requests)
+            timeout_rate: Доля вызовов, ответ на которые задерживается
+                          на hang секунд (дольше таймаута клиента)
+            retry_after: Значение retry_after в ответе 429, секунд
+            hang: Задержка ответа при зависании, секунд
+            methods: Методы, к которым применяются сбои
+            seed: Зерно генератора случайных чисел
+        """
+        self._retry_after_rate = retry_after_rate
+        self._timeout_rate = timeout_rate
+        self._retry_after = retry_after
+        self._hang = hang
+        self._fault_methods = tuple(methods)
+        self._random = random.Random(seed)
+
+    def messages_for(self, chat_id: int) -> List[Dict[str, Any]]:
+        """
+        Получить сообщения, отправленные и изменённые ботом в чате.
+        
+        Args:
+            chat_id: ID чата
+        
+        Returns:
+            List[Dict[str, Any]]: Записи с полями method, text
+                                  и reply_markup (словарь или None)
+        """
+        return self._messages[chat_id]
+
+    def push_update(self, update: Dict[str, Any]) -> None:
+        """Добавить обновление в очередь getUpdates."""
+        self._updates.append(update)
+        self._arrived.set()
+
+    async def _get_updates(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Long polling: вернуть обновления с update_id >= offset или ждать их."""
+        offset = int(params.get("offset", 0))
+        timeout = float(params.get("timeout", 0))
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(self._updates)
+
+    def _message(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """Построить объект отправленного сообщения."""
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+            "text": params.get("text", ""),
+        }
+
+    def _record(self, method: str, params: Dict[str, str]) -> None:
+        """Записать отправленное или изменённое сообщение."""
+        markup = params.get("reply_markup")
+        self._messages[int(params.get("chat_id", 0))].append({
+            "method": method,
+            "text": params.get("text", ""),
+            "reply_markup": json.loads(markup) if markup else None,
+        })
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        """Ответить на вызов метода Bot API."""
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] += 1
+        if method in self._fault_methods:
+            roll = self._random.random()
+            if roll < self._retry_after_rate:
+                self.faults["retry_after"] += 1
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self._retry_after}",
+                    "parameters": {"retry_after": self._retry_after},
+                }, status=429)
+            if roll < self._retry_after_rate + self._timeout_rate:
+                self.faults["timeout"] += 1
+                await asyncio.sleep(self._hang)
+        if method == "getMe":
+            result: Any = BOT_INFO
+        elif method == "getUpdates":
+            result = await self._get_updates(params)
+        elif method in ("sendMessage", "editMessageText"):
+            self._record(method, params)
+            result = self._message(params)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
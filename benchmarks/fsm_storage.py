@@ -0,0 +1,192 @@
+"""
+Бенчмарк задержек хранилищ состояний FSM.
+
+Замеряет задержку set_state/get_state/set_data/get_data для каждого
+хранилища из services/fsm_storage.py:
+
+- memory — MemoryStorage;
+- redis — RedisStorage aiogram, подключённый к локальной заглушке,
+  говорящей на протоколе Redis (RESP), которую бенчмарк поднимает сам;
+- db — DatabaseStorage на временной базе SQLite.
+
+Данные состояния — как у сценария записи (ФИО, телефон, услуга, date, time);
+после каждого чтения проверяется, что даты и время восстановлены без потерь.
+
+Запуск:
+    python -m benchmarks.fsm_storage [количество операций]
+"""
+import asyncio
+import json
+import sys
+import time as perf
+from datetime import date, time
+from statistics import quantiles
+from typing import Dict, List, Optional
+
+from benchmarks.common import setup_sqlite_engine
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
+
+from services.fsm_storage import (
+    DatabaseStorage,
+    dumps_state_data,
+    loads_state_data
+)
+
+DEFAULT_OPERATIONS = 500
+STATE = "BookingStates:time"
+DATA = {
+    "full_name": "Иванова Мария Петровна",
+    "phone": "+79001234567",
+    "service": "consult",
+    "date": date(2026, 10, 20),
+    "time": time(14, 0),
+}
+
+
+class RespStandIn:
+    """
+    Локальная заглушка сервера Redis.
+    
+    Понимает команды GET, SET, DEL, PING, SELECT и CLIENT в протоколе RESP
+    и хранит значения в словаре; срок жизни ключей (EX) не учитывается.
+    """
+
+    def __init__(self) -> None:
+        self.values: Dict[bytes, bytes] = {}
+        self.server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self) -> int:
+        """Запустить сервер на свободном порту и вернуть номер порта."""
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Остановить сервер."""
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> List[bytes]:
+        """Прочитать одну команду (массив bulk-строк RESP)."""
+        header = await reader.readline()
+        if not header:
+            raise ConnectionError
+        parts = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            parts.append((await reader.readexactly(length + 2))[:-2])
+        return parts
+
+    def _execute(self, command: List[bytes]) -> bytes:
+        """Выполнить команду и вернуть ответ в формате RESP."""
+        name = command[0].upper()
+        if name == b"GET":
+            value = self.values.get(command[1])
+            if value is None:
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SET":
+            self.values[command[1]] = command[2]
+            return b"+OK\r\n"
+        if name == b"DEL":
+            removed = sum(self.values.pop(key, None) is not None for key in command[1:])
+            return b":%d\r\n" % removed
+        if name == b"PING":
+            return b"+PONG\r\n"
+        return b"+OK\r\n"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обслуживать одно соединение до его закрытия."""
+        try:
+            while True:
+                writer.write(self._execute(await self._read_command(reader)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Медиана и 99-й перцентиль задержки в миллисекундах."""
+    cuts = quantiles(samples, n=100)
+    return {
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+    }
+
+
+async def measure(storage: BaseStorage, operations: int) -> Dict[str, Dict[str, float]]:
+    """
+    Замерить задержку операций хранилища.
+    
+    Args:
+        storage: Хранилище FSM
+        operations: Количество повторов каждой операции
+    
+    Returns:
+        Dict[str, Dict[str, float]]: Перцентили задержки по операциям
+    """
+    samples = {"set_state": [], "get_state": [], "set_data": [], "get_data": []}
+    for index in range(operations):
+        key = StorageKey(bot_id=1, chat_id=index % 50, user_id=index % 50)
+        started = perf.perf_counter()
+        await storage.set_state(key, STATE)
+        samples["set_state"].append(perf.perf_counter() - started)
+        
+        started = perf.perf_counter()
+        await storage.set_data(key, DATA)
+        samples["set_data"].append(perf.perf_counter() - started)
+        
+        started = perf.perf_counter()
+        state = await storage.get_state(key)
+        samples["get_state"].append(perf.perf_counter() - started)
+        
+        started = perf.perf_counter()
+        data = await storage.get_data(key)
+        samples["get_data"].append(perf.perf_counter() - started)
+        
+        if state != STATE or data != DATA:
+            raise AssertionError(f"Данные искажены: {state!r}, {data!r}")
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+async def main(operations: int) -> None:
+    """Выполнить замеры и вывести результат в формате JSON."""
+    engine = await setup_sqlite_engine()
+    stand_in = RespStandIn()
+    port = await stand_in.start()
+    redis_storage = RedisStorage.from_url(
+        f"redis://127.0.0.1:{port}/0",
+        json_dumps=dumps_state_data,
+        json_loads=loads_state_data
+    )
+    storages = {
+        "memory": MemoryStorage(),
+        "redis": redis_storage,
+        "db": DatabaseStorage(),
+    }
+    results = {}
+    for name, storage in storages.items():
+        results[name] = await measure(storage, operations)
+        await storage.close()
+    await stand_in.stop()
+    await engine.dispose()
+    
+    print(json.dumps(
+        {
+            "operations": operations,
+            "serialized_bytes": len(dumps_state_data(DATA).encode()),
+            "serialized": dumps_state_data(DATA),
+            "latency": results,
+        },
+        ensure_ascii=False,
+        indent=2
+    ))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_OPERATIONS
+    asyncio.run(main(count))
@@ -0,0 +1,186 @@
+"""
+Замер стоимости клавиатур на одно нажатие.
+
+Сравнивает построение клавиатур заново на каждое нажатие (как раньше:
+новые объекты InlineKeyboardMarkup/ReplyKeyboardMarkup с валидацией
+pydantic) и получение их из кэша keyboards/inline.py и keyboards/reply.py:
+время и объём выделенной памяти (tracemalloc) на одну клавиатуру.
+
+Также проверяет, что повторный вызов возвращает тот же объект, а после
+сброса доступности (invalidate_dates) клавиатура строится заново.
+
+Запуск:
+    python -m benchmarks.keyboards
+"""
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+from datetime import date, timedelta
+from typing import Callable, Dict
+
+from benchmarks import common  # noqa: F401  (переменные окружения для config.py)
+
+from aiogram.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    KeyboardButton,
+    ReplyKeyboardMarkup
+)
+
+from keyboards.callbacks import BOOKING_CONFIRM, BOOKING_DATE, BOOKING_SERVICE, BOOKING_TIME
+from keyboards.inline import (
+    confirm_keyboard,
+    dates_keyboard,
+    keyboard_cache_stats,
+    service_keyboard,
+    times_keyboard
+)
+from keyboards.reply import client_main_keyboard
+from services.slots import format_day_label, invalidate_dates
+
+DEFAULT_NUMBER = 5_000
+DAY = date.today() + timedelta(days=1)
+SLOTS = [f"{hour:02d}:00" for hour in range(9, 18)]
+DATES = [
+    (format_day_label(DAY + timedelta(days=offset), SLOTS), DAY + timedelta(days=offset))
+    for offset in range(10)
+]
+
+
+def legacy_inline(rows) -> InlineKeyboardMarkup:
+    """Построить inline-клавиатуру заново, по кнопке в строке."""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=text, callback_data=data)]
+        for text, data in rows
+    ])
+
+
+CASES: Dict[str, Dict[str, Callable[[], object]]] = {
+    "service": {
+        "legacy": lambda: legacy_inline([
+            ("🧠 Консультация", BOOKING_SERVICE.pack("consult")),
+            ("💬 Первая встреча", BOOKING_SERVICE.pack("intro")),
+            ("📌 Супервизия", BOOKING_SERVICE.pack("supervision")),
+        ]),
+        "cached": service_keyboard,
+    },
+    "confirm": {
+        "legacy": lambda: legacy_inline([
+            ("✅ Подтвердить", BOOKING_CONFIRM.pack(True)),
+            ("❌ Отменить", BOOKING_CONFIRM.pack(False)),
+        ]),
+        "cached": confirm_keyboard,
+    },
+    "client_menu": {
+        "legacy": lambda: ReplyKeyboardMarkup(
+            keyboard=[
+                [KeyboardButton(text="📅 Записаться"), KeyboardButton(text="🗓 Мои записи")],
+                [KeyboardButton(text="ℹ️ О боте")]
+            ],
+            resize_keyboard=True
+        ),
+        "cached": client_main_keyboard,
+    },
+    "dates": {
+        "legacy": lambda: legacy_inline([(label, BOOKING_DATE.pack(day)) for label, day in DATES]),
+        "cached": lambda: dates_keyboard(BOOKING_DATE, DATES),
+    },
+    "times": {
+        "legacy": lambda: legacy_inline([(slot, BOOKING_TIME.pack(slot)) for slot in SLOTS]),
+        "cached": lambda: times_keyboard(BOOKING_TIME, DAY, SLOTS),
+    },
+}
+
+
+def allocated_bytes(build: Callable[[], object], number: int) -> float:
+    """Средний пик памяти, выделенной за один вызов (tracemalloc), байт."""
+    build()
+    tracemalloc.start()
+    total = 0
+    for _ in range(number):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        build()
+        total += tracemalloc.get_traced_memory()[1] - start
+    tracemalloc.stop()
+    return total / number
+
+
+def measure(number: int) -> Dict[str, Dict]:
+    """
+    Замерить время и память на одну клавиатуру по каждому случаю.
+    
+    Args:
+        number: Количество вызовов в замере
+    
+    Returns:
+        Dict[str, Dict]: Время (мкс) и память (байт) до и после, ускорение
+    """
+    results = {}
+    for name, builders in CASES.items():
+        row = {}
+        for variant, build in builders.items():
+            build()
+            seconds = min(timeit.repeat(build, number=number, repeat=3))
+            row[variant] = {
+                "us": round(seconds / number * 1e6, 3),
+                "bytes": round(allocated_bytes(build, min(number, 1000))),
+            }
+        row["speedup"] = round(row["legacy"]["us"] / max(row["cached"]["us"], 1e-3), 1)
+        results[name] = row
+    return results
+
+
+def check_invalidation() -> list:
+    """
+    Проверить повторное использование и сброс клавиатур дат и времени.
+    
+    Returns:
+        list: Описания найденных нарушений
+    """
+    failures = []
+    first = times_keyboard(BOOKING_TIME, DAY, SLOTS)
+    if times_keyboard(BOOKING_TIME, DAY, SLOTS) is not first:
+        failures.append("повторный вызов построил клавиатуру времени заново")
+    if times_keyboard(BOOKING_TIME, DAY, SLOTS[1:]) is first:
+        failures.append("клавиатура не изменилась при другом списке слотов")
+    dates = dates_keyboard(BOOKING_DATE, DATES)
+    invalidate_dates(DAY)
+    if times_keyboard(BOOKING_TIME, DAY, SLOTS) is first:
+        failures.append("клавиатура времени не сброшена после invalidate_dates")
+    if dates_keyboard(BOOKING_DATE, DATES) is dates:
+        failures.append("клавиатура дат не сброшена после invalidate_dates")
+    if service_keyboard() is not service_keyboard():
+        failures.append("статическая клавиатура строится заново")
+    return failures
+
+
+def main(number: int) -> None:
+    """Выполнить замер и вывести результат в формате JSON."""
+    failures = check_invalidation()
+    results = measure(number)
+    failures.extend(
+        f"{name}: кэшированная клавиатура не быстрее построения ({row['speedup']}x)"
+        for name, row in results.items()
+        if row["speedup"] <= 1
+    )
+    print(json.dumps(
+        {
+            "number": number,
+            "keyboards": results,
+            "cache": keyboard_cache_stats(),
+            "failures": failures,
+        },
+        ensure_ascii=False,
+        indent=2
+    ))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=DEFAULT_NUMBER)
+    main(parser.parse_args().number)
@@ -0,0 +1,342 @@
+"""
+Нагрузочный прогон сценариев записи, переноса и отмены.
+
+Имитирует N клиентов, одновременно проходящих сценарий записи
+(/start → ФИО → телефон → услуга → дата → время → подтверждение),
+после чего часть клиентов переносит запись (/my → «Перенести» → дата →
+время), а часть отменяет её (/my → «Отменить»). Обновления подаются
+в диспетчер с теми же middleware и обработчиками, что и в bot.py, а бот
+обращается к заглушке Bot API (benchmarks/fake_bot_api.py). Клиент
+нажимает только кнопки, которые бот ему действительно показал, выбирая
+дату и время случайно, поэтому одновременные клиенты конкурируют
+за слоты.
+
+Заглушка может отвечать 429 (RetryAfter) и зависать дольше таймаута
+клиента (--retry-after-rate, --timeout-rate). Клиент, не получивший
+ответа, повторяет действие (--retries).
+
+Результат в формате JSON: пропускная способность, p50/p99 задержки
+обработки по шагам, ошибки и повторы по шагам, итоги сценариев, общее
+число SQL-запросов и вызовов Bot API. Без внедрённых сбоев проверяется,
+что число активных записей в базе совпадает с итогами клиентов.
+
+Запуск:
+    python -m benchmarks.load_booking --clients 50
+    python -m benchmarks.load_booking --retry-after-rate 0.05 --timeout-rate 0.02
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import setup_engine, count_queries
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from sqlalchemy import func, select
+
+import database.session as db_session
+from database.models import Appointment
+from benchmarks.fake_bot_api import FakeBotApi
+from benchmarks.update_sessions import callback_update, message_update, seed_schedule
+from handlers.client.booking import register_client_handlers
+from handlers.client.cancel import register_cancel_handlers
+from handlers.client.menu import register_user_menu
+from handlers.client.reminders import register_reminder_handlers
+from handlers.client.reschedule import register_reschedule_handlers
+from keyboards.callbacks import (
+    BOOKING_CONFIRM,
+    BOOKING_DATE,
+    BOOKING_SERVICE,
+    BOOKING_TIME,
+    CANCEL_APPOINTMENT,
+    RESCHEDULE_DATE,
+    RESCHEDULE_START,
+    RESCHEDULE_TIME
+)
+from middlewares.db_session import register_db_session_middleware
+from services.clients import client_cache_stats
+
+DEFAULT_CLIENTS = 50
+DEFAULT_RESCHEDULE_SHARE = 0.3
+DEFAULT_CANCEL_SHARE = 0.2
+DEFAULT_RETRIES = 2
+DEFAULT_API_TIMEOUT = 1.0
+FIRST_USER_ID = 30_000
+RETRY_PAUSE = 0.05
+
+
+class Stalled(Exception):
+    """Клиент не получил ожидаемого ответа и прекращает сценарий."""
+
+
+class LoadReport:
+    """
+    Статистика прогона.
+    
+    Attributes:
+        latencies (Dict[str, List[float]]): Задержки обработки по шагам, мс
+        errors (Dict[str, Counter]): Исключения обработчиков по шагам
+        retries (Counter): Повторы действий по шагам
+        outcomes (Counter): Итоги сценариев клиентов
+    """
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.retries: Counter = Counter()
+        self.outcomes: Counter = Counter()
+
+    def steps(self) -> Dict[str, Dict[str, Any]]:
+        """Сводка по шагам: число обновлений, p50/p99, ошибки и повторы."""
+        return {
+            step: {
+                "updates": len(values),
+                "p50_ms": round(percentile(values, 0.5), 2),
+                "p99_ms": round(percentile(values, 0.99), 2),
+                "errors": dict(self.errors[step]),
+                "retries": self.retries[step],
+            }
+            for step, values in self.latencies.items()
+        }
+
+
+def percentile(values: List[float], share: float) -> float:
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def buttons(reply: Optional[Dict[str, Any]], prefix: str) -> List[str]:
+    """
+    Получить callback_data inline-кнопок ответа с заданным префиксом.
+    
+    Args:
+        reply: Записанное заглушкой сообщение бота
+        prefix: Префикс callback_data
+    
+    Returns:
+        List[str]: Подходящие callback_data
+    """
+    markup = (reply or {}).get("reply_markup") or {}
+    return [
+        button["callback_data"]
+        for row in markup.get("inline_keyboard", [])
+        for button in row
+        if button.get("callback_data", "").startswith(prefix)
+    ]
+
+
+class SimulatedClient:
+    """Клиент, проходящий сценарии через диспетчер."""
+
+    def __init__(
+        self,
+        index: int,
+        dp: Dispatcher,
+        bot: Bot,
+        api: FakeBotApi,
+        report: LoadReport,
+        update_ids: itertools.count,
+        retries: int,
+        seed: int
+    ) -> None:
+        self.user_id = FIRST_USER_ID + index
+        self.index = index
+        self.dp = dp
+        self.bot = bot
+        self.api = api
+        self.report = report
+        self.update_ids = update_ids
+        self.retries = retries
+        self.random = random.Random(seed * 1_000_003 + index)
+
+    async def send(self, step: str, build: Callable[[int], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Подать обновление и дождаться ответа бота, повторяя при его отсутствии.
+        
+        Args:
+            step: Название шага для статистики
+            build: Построитель обновления по update_id
+        
+        Returns:
+            Dict[str, Any]: Последнее сообщение бота в ответ на обновление
+        
+        Raises:
+            Stalled: Если ответа нет и после повторов
+        """
+        messages = self.api.messages_for(self.user_id)
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.report.retries[step] += 1
+                await asyncio.sleep(RETRY_PAUSE)
+            seen = len(messages)
+            update = Update.model_validate(build(next(self.update_ids)), context={"bot": self.bot})
+            started = time.perf_counter()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                self.report.errors[step][type(e).__name__] += 1
+            self.report.latencies[step].append((time.perf_counter() - started) * 1000)
+            if len(messages) > seen:
+                return messages[-1]
+        raise Stalled(step)
+
+    async def write(self, step: str, text: str) -> Dict[str, Any]:
+        """Отправить текстовое сообщение."""
+        return await self.send(step, lambda update_id: message_update(update_id, text, self.user_id))
+
+    async def tap(self, step: str, reply: Dict[str, Any], prefix: str) -> Dict[str, Any]:
+        """
+        Нажать случайную из показанных кнопок с заданным префиксом.
+        
+        Raises:
+            Stalled: Если подходящих кнопок нет или бот не ответил
+        """
+        options = buttons(reply, prefix)
+        if not options:
+            raise Stalled(step)
+        data = self.random.choice(options)
+        return await self.send(step, lambda update_id: callback_update(update_id, data, self.user_id))
+
+    async def book(self) -> bool:
+        """Пройти сценарий записи; вернуть True, если запись сохранена."""
+        reply = await self.write("start", "/start")
+        if not buttons(reply, BOOKING_SERVICE.prefix):
+            await self.write("full_name", f"Клиент {self.index} Нагрузочный")
+            reply = await self.write("phone", f"+7902{self.index:07d}")
+        reply = await self.tap("select_service", reply, BOOKING_SERVICE.prefix)
+        reply = await self.tap("select_date", reply, BOOKING_DATE.prefix)
+        reply = await self.tap("select_time", reply, BOOKING_TIME.prefix)
+        reply = await self.tap("confirm_booking", reply, BOOKING_CONFIRM.pack(True))
+        if "сохранена" in reply["text"]:
+            self.report.outcomes["booked"] += 1
+            return True
+        self.report.outcomes["slot_taken" if "занято" in reply["text"] else "not_booked"] += 1
+        return False
+
+    async def reschedule(self) -> None:
+        """Перенести запись на случайные свободные дату и время."""
+        reply = await self.write("my_appointments", "/my")
+        reply = await self.tap("reschedule_start", reply, RESCHEDULE_START.prefix)
+        reply = await self.tap("reschedule_date", reply, RESCHEDULE_DATE.prefix)
+        reply = await self.tap("reschedule_time", reply, RESCHEDULE_TIME.prefix)
+        if "перенесена" in reply["text"]:
+            self.report.outcomes["rescheduled"] += 1
+        else:
+            self.report.outcomes["reschedule_failed"] += 1
+
+    async def cancel(self) -> None:
+        """Отменить запись."""
+        reply = await self.write("my_appointments", "/my")
+        reply = await self.tap("cancel", reply, CANCEL_APPOINTMENT.prefix)
+        if "отменена" in reply["text"]:
+            self.report.outcomes["cancelled"] += 1
+        else:
+            self.report.outcomes["cancel_failed"] += 1
+
+    async def run(self, reschedule_share: float, cancel_share: float) -> None:
+        """Пройти запись и, с заданной вероятностью, перенос и отмену."""
+        try:
+            if not await self.book():
+                return
+            if self.random.random() < reschedule_share:
+                await self.reschedule()
+            if self.random.random() < cancel_share:
+                await self.cancel()
+        except Stalled as e:
+            self.report.outcomes[f"stalled:{e}"] += 1
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Выполнить прогон и вывести результат в формате JSON."""
+    engine = await setup_engine(args.db_url)
+    await seed_schedule()
+    api = FakeBotApi()
+    await api.start()
+    api.inject_faults(
+        retry_after_rate=args.retry_after_rate,
+        timeout_rate=args.timeout_rate,
+        hang=args.api_timeout * 2,
+        seed=args.seed
+    )
+    bot = api.create_bot(timeout=args.api_timeout)
+    
+    dp = Dispatcher()
+    register_db_session_middleware(dp)
+    register_client_handlers(dp)
+    register_cancel_handlers(dp)
+    register_reminder_handlers(dp)
+    register_reschedule_handlers(dp)
+    register_user_menu(dp)
+    
+    report = LoadReport()
+    update_ids = itertools.count(1)
+    clients = [
+        SimulatedClient(index, dp, bot, api, report, update_ids, args.retries, args.seed)
+        for index in range(args.clients)
+    ]
+    with count_queries(engine) as counter:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client.run(args.reschedule_share, args.cancel_share)
+            for client in clients
+        ))
+        elapsed = time.perf_counter() - started
+    
+    async with db_session.SessionLocal() as session:
+        active = await session.scalar(
+            select(func.count(Appointment.id)).where(Appointment.status == "active")
+        )
+    await bot.session.close()
+    await api.stop()
+    await engine.dispose()
+    
+    updates = sum(len(values) for values in report.latencies.values())
+    expected_active = report.outcomes["booked"] - report.outcomes["cancelled"]
+    failures = []
+    if not api.faults and active != expected_active:
+        failures.append(f"активных записей {active}, по итогам клиентов {expected_active}")
+    print(json.dumps(
+        {
+            "backend": engine.dialect.name,
+            "clients": args.clients,
+            "elapsed_s": round(elapsed, 2),
+            "updates": updates,
+            "updates_per_second": round(updates / elapsed, 1),
+            "bookings_per_second": round(report.outcomes["booked"] / elapsed, 1),
+            "outcomes": dict(report.outcomes),
+            "steps": report.steps(),
+            "db": {
+                "queries": counter.count,
+                "queries_per_update": round(counter.count / updates, 2) if updates else 0,
+                "active_appointments": active,
+            },
+            "client_cache": client_cache_stats(),
+            "api": {"calls": dict(api.calls), "faults": dict(api.faults)},
+            "failures": failures,
+        },
+        ensure_ascii=False,
+        indent=2
+    ))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db-url", help="URL базы (по умолчанию временная SQLite)")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument("--reschedule-share", type=float, default=DEFAULT_RESCHEDULE_SHARE)
+    parser.add_argument("--cancel-share", type=float, default=DEFAULT_CANCEL_SHARE)
+    parser.add_argument("--retry-after-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--api-timeout", type=float, default=DEFAULT_API_TIMEOUT)
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
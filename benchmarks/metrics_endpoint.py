@@ -0,0 +1,162 @@
+"""
+Проверка эндпоинта метрик.
+
+Прогоняет сценарий записи (как benchmarks/update_sessions.py) через
+диспетчер с middleware метрик и заглушкой Bot API, выполняет задачу
+APScheduler (в том числе с ID задачи напоминания), затем запрашивает /metrics по HTTP и проверяет, что в ответе
+есть гистограммы обработчиков, SQL-запросов, вызовов Bot API и задач
+планировщика, а также значения подключённых источников статистики.
+Метка задачи напоминания не должна содержать номер записи.
+Дополнительно замеряет время формирования ответа.
+
+Запуск:
+    python -m benchmarks.metrics_endpoint
+"""
+import asyncio
+import json
+import socket
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import setup_sqlite_engine
+
+from aiogram import Dispatcher
+from aiogram.types import Update
+from aiohttp import ClientSession
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from benchmarks.fake_bot_api import FakeBotApi
+from benchmarks.update_sessions import callback_update, message_update, seed_schedule
+from handlers.client.booking import register_client_handlers
+from keyboards.callbacks import BOOKING_CONFIRM, BOOKING_DATE, BOOKING_SERVICE, BOOKING_TIME
+from middlewares.db_session import register_db_session_middleware, session_stats
+from middlewares.metrics import register_metrics_middleware
+from services.metrics import (
+    instrument_database,
+    instrument_scheduler,
+    job_name,
+    register_collector,
+    render_metrics,
+    start_metrics_server
+)
+from services.scheduler import reminder_24h_job_id, reminder_day_job_id
+from services.slots import cache_stats
+
+EXPECTED_SERIES = [
+    'psybot_handler_duration_seconds_count{handler="booking.select_service",status="ok"}',
+    'psybot_handler_duration_seconds_count{handler="booking.confirm_booking",status="ok"}',
+    'psybot_db_query_duration_seconds_count{operation="SELECT"}',
+    'psybot_db_query_duration_seconds_count{operation="INSERT"}',
+    'psybot_telegram_request_duration_seconds_count{method="sendMessage"}',
+    'psybot_telegram_request_duration_seconds_count{method="editMessageText"}',
+    'psybot_job_duration_seconds_count{job="bench_job"}',
+    'psybot_job_lag_seconds_count{job="bench_job"}',
+    'psybot_job_runs_total{job="bench_job",result="ok"}',
+    'psybot_job_runs_total{job="reminder_24h",result="ok"}',
+    "psybot_slots_cache_misses",
+    "psybot_update_sessions_sessions",
+    "psybot_update_sessions_updates",
+]
+# Имена задач для метки: номер записи отбрасывается
+EXPECTED_JOB_NAMES = {
+    reminder_24h_job_id(15): "reminder_24h",
+    reminder_day_job_id(15): "reminder_day",
+    "bench_job_42": "bench_job",
+}
+RENDER_REPEATS = 200
+
+
+def free_port() -> int:
+    """Свободный TCP-порт на localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def bench_job() -> None:
+    """Задача планировщика для проверки метрик задач."""
+    await asyncio.sleep(0.01)
+
+
+async def main() -> None:
+    """Выполнить проверку и вывести результат в формате JSON."""
+    engine = await setup_sqlite_engine()
+    await seed_schedule()
+    api = FakeBotApi()
+    await api.start()
+    bot = api.create_bot()
+    
+    dp = Dispatcher()
+    register_db_session_middleware(dp)
+    register_metrics_middleware(dp, bot)
+    register_client_handlers(dp)
+    instrument_database()
+    register_collector("slots_cache", cache_stats)
+    register_collector("update_sessions", session_stats)
+    
+    day = date.today() + timedelta(days=1)
+    updates = [
+        message_update(1, "/start"),
+        message_update(2, "Иванова Мария Петровна"),
+        message_update(3, "+79001234567"),
+        callback_update(4, BOOKING_SERVICE.pack("consult")),
+        callback_update(5, BOOKING_DATE.pack(day)),
+        callback_update(6, BOOKING_TIME.pack("10:00")),
+        callback_update(7, BOOKING_CONFIRM.pack(True)),
+    ]
+    for raw in updates:
+        await dp.feed_update(bot, Update.model_validate(raw, context={"bot": bot}))
+    
+    scheduler = AsyncIOScheduler()
+    instrument_scheduler(scheduler)
+    scheduler.start()
+    scheduler.add_job(bench_job, id="bench_job_42")
+    scheduler.add_job(bench_job, id=reminder_24h_job_id(42))
+    await asyncio.sleep(0.5)
+    scheduler.shutdown(wait=False)
+    
+    port = free_port()
+    runner = await start_metrics_server("127.0.0.1", port)
+    async with ClientSession() as http:
+        async with http.get(f"http://127.0.0.1:{port}/metrics") as response:
+            status = response.status
+            content_type = response.headers.get("Content-Type", "")
+            body = await response.text()
+    await runner.cleanup()
+    
+    started = time.perf_counter()
+    for _ in range(RENDER_REPEATS):
+        render_metrics()
+    render_ms = (time.perf_counter() - started) / RENDER_REPEATS * 1000
+    
+    await bot.session.close()
+    await api.stop()
+    await engine.dispose()
+    
+    missing = [series for series in EXPECTED_SERIES if series not in body]
+    wrong_job_names = {
+        job_id: job_name(job_id)
+        for job_id, expected in EXPECTED_JOB_NAMES.items()
+        if job_name(job_id) != expected
+    }
+    if reminder_24h_job_id(42) in body:
+        wrong_job_names[reminder_24h_job_id(42)] = "номер записи попал в метку"
+    print(json.dumps(
+        {
+            "status": status,
+            "content_type": content_type,
+            "lines": len(body.splitlines()),
+            "render_ms": round(render_ms, 3),
+            "missing": missing,
+            "wrong_job_names": wrong_job_names,
+        },
+        ensure_ascii=False,
+        indent=2
+    ))
+    if status != 200 or missing or wrong_job_names:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""
+Нагрузочная проверка очереди исходящих сообщений.
+
+Имитирует утреннюю рассылку: по напоминанию каждому из нескольких сотен
+клиентов и серию сообщений в один чат психолога. Вместо Telegram используется
+бот-заглушка, которая фиксирует время каждой отправки и периодически отвечает
+TelegramRetryAfter. Проверяется, что:
+
+- все сообщения доставлены, а сообщения каждого чата — в исходном порядке;
+- общая скорость за любую секунду не превышает лимит корзины с учётом всплеска;
+- в один чат не уходит больше сообщений, чем позволяет корзина чата;
+- после RetryAfter отправка возобновляется не раньше указанного времени.
+
+Запуск:
+    python -m benchmarks.outbound_queue [количество клиентов]
+"""
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict
+
+import benchmarks.common  # noqa: F401  (переменные окружения для config.py)
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from services.outbound import OutboundQueue
+
+DEFAULT_CLIENTS = 200
+PSYCHOLOGIST_CHAT = 1
+GLOBAL_RATE = 25.0
+CHAT_RATE = 1.0
+CHAT_BURST = 3.0
+# Каждое RETRY_EVERY-е обращение к API отвечает RetryAfter
+RETRY_EVERY = 97
+RETRY_AFTER = 1
+
+
+class FakeBot:
+    """Бот-заглушка: записывает отправки и иногда отвечает RetryAfter."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.sent = []
+        self.retry_until = 0.0
+        self.early = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> str:
+        """Зафиксировать отправку или вернуть RetryAfter."""
+        now = time.monotonic()
+        self.calls += 1
+        if now < self.retry_until:
+            self.early += 1
+        if self.calls % RETRY_EVERY == 0:
+            self.retry_until = now + RETRY_AFTER
+            raise TelegramRetryAfter(
+                method=SendMessage(chat_id=chat_id, text=text),
+                message="Too Many Requests",
+                retry_after=RETRY_AFTER
+            )
+        self.sent.append((now, chat_id, text))
+        return text
+
+
+def max_per_window(times: list, window: float) -> int:
+    """Наибольшее число отправок в любом окне длиной window секунд."""
+    best = 0
+    start = 0
+    for end, moment in enumerate(times):
+        while moment - times[start] >= window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+async def main(clients: int) -> None:
+    """Выполнить проверку и вывести результат в формате JSON."""
+    bot = FakeBot()
+    queue = OutboundQueue(
+        global_rate=GLOBAL_RATE,
+        chat_rate=CHAT_RATE,
+        chat_burst=CHAT_BURST,
+        workers=8
+    )
+    queue.start(bot)
+    
+    expected = defaultdict(list)
+    futures = []
+    started = time.monotonic()
+    for index in range(clients):
+        chat_id = 1000 + index
+        text = f"напоминание {index}"
+        expected[chat_id].append(text)
+        futures.append(queue.enqueue(chat_id, text))
+    for index in range(10):
+        text = f"психологу {index}"
+        expected[PSYCHOLOGIST_CHAT].append(text)
+        futures.append(queue.enqueue(PSYCHOLOGIST_CHAT, text))
+    peak_depth = queue.depth()
+    
+    await asyncio.gather(*futures)
+    elapsed = time.monotonic() - started
+    stats = queue.stats()
+    await queue.stop()
+    
+    delivered = defaultdict(list)
+    chat_times = defaultdict(list)
+    for moment, chat_id, text in bot.sent:
+        delivered[chat_id].append(text)
+        chat_times[chat_id].append(moment)
+    all_times = [moment for moment, _, _ in bot.sent]
+    
+    result = {
+        "messages": len(futures),
+        "delivered": len(bot.sent),
+        "ordered": delivered == expected,
+        "elapsed_s": round(elapsed, 2),
+        "peak_depth": peak_depth,
+        "max_global_per_s": max_per_window(all_times, 1.0),
+        "max_chat_per_s": max(
+            max_per_window(times, 1.0) for times in chat_times.values()
+        ),
+        "sent_during_retry_after": bot.early,
+        "stats": stats,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    ok = (
+        result["ordered"]
+        and result["delivered"] == result["messages"]
+        and result["max_global_per_s"] <= 2 * GLOBAL_RATE
+        and result["max_chat_per_s"] <= CHAT_BURST + CHAT_RATE
+        and bot.early == 0
+    )
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CLIENTS
+    asyncio.run(main(count))
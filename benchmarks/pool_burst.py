@@ -0,0 +1,111 @@
+"""
+Подбор размера пула соединений под утреннюю рассылку.
+
+Имитирует всплеск: N одновременных коротких транзакций (как захват
+и запись напоминаний в dispatch_due_reminders), каждая держит соединение
+заданное время. Для нескольких конфигураций пула (размер + переполнение)
+выводит статистику InstrumentedPool: среднее и максимальное ожидание
+соединения, таймауты и общее время всплеска.
+
+База — временный файл SQLite; время удержания соединения задаётся явно,
+поэтому результат отражает работу пула, а не скорость самой базы.
+
+Запуск:
+    python -m benchmarks.pool_burst [--burst N] [--hold-ms MS] [--sizes 5+5,10+10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import benchmarks.common  # noqa: F401  (переменные окружения для config.py)
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.session import build_engine, pool_stats
+
+DEFAULT_BURST = 200
+DEFAULT_HOLD_MS = 20.0
+DEFAULT_SIZES = "2+0,5+5,10+10,20+20"
+POOL_TIMEOUT = 5.0
+
+
+def parse_sizes(value: str) -> List[Tuple[int, int]]:
+    """Разобрать список конфигураций вида 'размер+переполнение,...'."""
+    sizes = []
+    for item in value.split(","):
+        size, overflow = item.split("+")
+        sizes.append((int(size), int(overflow)))
+    return sizes
+
+
+async def run_burst(size: int, overflow: int, burst: int, hold: float) -> Dict[str, Any]:
+    """
+    Выполнить всплеск транзакций на пуле заданного размера.
+    
+    Args:
+        size: Размер пула
+        overflow: Допустимое переполнение
+        burst: Число одновременных транзакций
+        hold: Время удержания соединения, секунд
+    
+    Returns:
+        Dict[str, Any]: Статистика пула и общее время всплеска
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="psybot-pool-"), "pool.db")
+    engine = build_engine(
+        f"sqlite+aiosqlite:///{path}",
+        pool_size=size,
+        max_overflow=overflow,
+        pool_timeout=POOL_TIMEOUT
+    )
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def transaction() -> bool:
+        try:
+            async with sessions() as session:
+                await session.execute(text("SELECT 1"))
+                await asyncio.sleep(hold)
+                await session.commit()
+            return True
+        except PoolTimeoutError:
+            return False
+    
+    started = time.perf_counter()
+    results = await asyncio.gather(*(transaction() for _ in range(burst)))
+    elapsed = time.perf_counter() - started
+    stats = pool_stats(engine)
+    await engine.dispose()
+    return {
+        "pool": f"{size}+{overflow}",
+        "elapsed_s": round(elapsed, 3),
+        "completed": sum(results),
+        **stats,
+    }
+
+
+async def main(burst: int, hold_ms: float, sizes: List[Tuple[int, int]]) -> None:
+    """Выполнить всплеск для каждой конфигурации и вывести результат в JSON."""
+    results = [
+        await run_burst(size, overflow, burst, hold_ms / 1000)
+        for size, overflow in sizes
+    ]
+    print(json.dumps(
+        {"burst": burst, "hold_ms": hold_ms, "results": results},
+        ensure_ascii=False,
+        indent=2
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST)
+    parser.add_argument("--hold-ms", type=float, default=DEFAULT_HOLD_MS)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    args = parser.parse_args()
+    asyncio.run(main(args.burst, args.hold_ms, parse_sizes(args.sizes)))
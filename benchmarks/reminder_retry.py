@@ -0,0 +1,216 @@
+"""
+Проверка повторной отправки напоминаний после сбоя.
+
+Заполняет базу записями, напоминания по которым уже положены, и проверяет:
+
+- отправка догоняющей рассылкой (dispatch_due_reminders) завершилась
+  ошибкой — следующий запуск рассылки доставляет напоминания;
+- отправка задачей напоминания (deliver_reminder) завершилась ошибкой —
+  повторный вызов доставляет напоминание, третий не отправляет его снова;
+- захват без результата старше REMINDER_CLAIM_TIMEOUT (процесс упал
+  во время отправки) перехватывается рассылкой, а свежий — нет;
+- ни один клиент не получил одно напоминание дважды.
+
+Запуск:
+    python -m benchmarks.reminder_retry [--db-url URL]
+"""
+import argparse
+import asyncio
+import json
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from benchmarks.common import setup_engine
+
+import database.session as db_session
+from database.models import Appointment, Client, ReminderLog
+import services.scheduler as scheduler
+from services.catalog import DEFAULT_SERVICE, get_service
+from services.outbound import OutboundQueue
+from services.scheduler import (
+    REMINDER_24H,
+    REMINDER_CLAIM_TIMEOUT,
+    REMINDER_DAY,
+    deliver_reminder,
+    dispatch_due_reminders,
+)
+
+# Telegram ID клиента записи с номером n
+TELEGRAM_ID_BASE = 700_000
+
+
+class FlakyBot:
+    """
+    Бот-заглушка: пока failing=True, отправка завершается ошибкой.
+    
+    Attributes:
+        failing (bool): Отвечать ли на отправку ошибкой
+        delivered (Counter): Число доставленных сообщений по чатам
+    """
+
+    def __init__(self) -> None:
+        self.failing = False
+        self.delivered: Counter = Counter()
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> str:
+        if self.failing:
+            raise RuntimeError("Bad Gateway")
+        self.delivered[chat_id] += 1
+        return text
+
+
+async def add_appointment(number: int) -> int:
+    """
+    Создать клиента и запись через 10 + number часов, оформленную двое
+    суток назад.
+    
+    Напоминание за сутки по такой записи уже положено.
+    
+    Args:
+        number: Номер записи (определяет Telegram ID клиента)
+    
+    Returns:
+        int: ID записи
+    """
+    now = datetime.now()
+    date_time = (now + timedelta(hours=10 + number)).replace(second=0, microsecond=0)
+    async with db_session.SessionLocal() as session:
+        client = Client(
+            full_name=f"Клиент {number}",
+            phone_number=f"+7900{number:07d}",
+            telegram_id=TELEGRAM_ID_BASE + number
+        )
+        session.add(client)
+        await session.flush()
+        appointment = Appointment(
+            client_id=client.id,
+            date_time=date_time,
+            service=DEFAULT_SERVICE,
+            busy_until=date_time + get_service(DEFAULT_SERVICE).busy,
+            booked_at=now - timedelta(days=2)
+        )
+        session.add(appointment)
+        await session.commit()
+        return appointment.id
+
+
+async def add_claims(appointment_id: int, claimed_at: datetime) -> None:
+    """
+    Записать захват обоих напоминаний без результата отправки.
+    
+    Args:
+        appointment_id: ID записи
+        claimed_at: Время захвата
+    """
+    async with db_session.SessionLocal() as session:
+        session.add_all(
+            ReminderLog(
+                appointment_id=appointment_id,
+                kind=kind,
+                due_at=claimed_at,
+                claimed_at=claimed_at
+            )
+            for kind in (REMINDER_24H, REMINDER_DAY)
+        )
+        await session.commit()
+
+
+async def log_rows(appointment_id: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Прочитать строки журнала напоминаний записи.
+    
+    Args:
+        appointment_id: ID записи
+    
+    Returns:
+        Dict[str, Dict[str, Any]]: Вид напоминания → отправлено ли и ошибка
+    """
+    async with db_session.SessionLocal() as session:
+        query = await session.execute(
+            ReminderLog.__table__.select()
+            .where(ReminderLog.appointment_id == appointment_id)
+        )
+        return {
+            row.kind: {"sent": row.sent_at is not None, "error": row.error}
+            for row in query.all()
+        }
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Выполнить проверки и вывести результат в формате JSON."""
+    engine = await setup_engine(args.db_url)
+    bot = FlakyBot()
+    queue = OutboundQueue(global_rate=10_000)
+    queue.start(bot)
+    default_queue, scheduler.outbound = scheduler.outbound, queue
+    failures: List[str] = []
+    steps: Dict[str, Any] = {}
+    try:
+        dispatched = await add_appointment(1)
+        bot.failing = True
+        steps["dispatch_failing"] = await dispatch_due_reminders()
+        failed_rows = await log_rows(dispatched)
+        bot.failing = False
+        steps["dispatch_retry"] = await dispatch_due_reminders()
+        steps["dispatch_again"] = await dispatch_due_reminders()
+        if steps["dispatch_failing"]:
+            failures.append("рассылка при сбое отправки сообщила об отправке")
+        if not failed_rows.get(REMINDER_24H, {}).get("error"):
+            failures.append("ошибка первой отправки не записана в журнал")
+        if not steps["dispatch_retry"]:
+            failures.append("следующий запуск рассылки не повторил напоминание после ошибки")
+        if steps["dispatch_again"]:
+            failures.append("третий запуск рассылки отправил напоминания повторно")
+        
+        delivered = await add_appointment(2)
+        bot.failing = True
+        steps["deliver_failing"] = await deliver_reminder(delivered, REMINDER_24H)
+        bot.failing = False
+        steps["deliver_retry"] = await deliver_reminder(delivered, REMINDER_24H)
+        steps["deliver_again"] = await deliver_reminder(delivered, REMINDER_24H)
+        if steps["deliver_failing"] or not steps["deliver_retry"] or steps["deliver_again"]:
+            failures.append(
+                "deliver_reminder после ошибки: ожидалось False, True, False — "
+                f"получено {steps['deliver_failing']}, {steps['deliver_retry']}, "
+                f"{steps['deliver_again']}"
+            )
+        
+        stale = await add_appointment(3)
+        fresh = await add_appointment(4)
+        now = datetime.now()
+        await add_claims(stale, now - REMINDER_CLAIM_TIMEOUT - timedelta(minutes=1))
+        await add_claims(fresh, now)
+        steps["dispatch_claims"] = await dispatch_due_reminders()
+        if not (await log_rows(stale))[REMINDER_24H]["sent"]:
+            failures.append("устаревший захват не перехвачен рассылкой")
+        if any(row["sent"] for row in (await log_rows(fresh)).values()):
+            failures.append("свежий захват перехвачен рассылкой")
+        
+        for number, appointment_id in enumerate((dispatched, delivered, stale, fresh), 1):
+            sent = sum(row["sent"] for row in (await log_rows(appointment_id)).values())
+            received = bot.delivered[TELEGRAM_ID_BASE + number]
+            if received != sent:
+                failures.append(
+                    f"запись {appointment_id}: отправлено по журналу {sent}, "
+                    f"получено клиентом {received}"
+                )
+    finally:
+        scheduler.outbound = default_queue
+        await queue.stop()
+        await engine.dispose()
+    
+    print(json.dumps(
+        {"steps": steps, "delivered": dict(bot.delivered), "failures": failures},
+        ensure_ascii=False,
+        indent=2
+    ))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db-url", help="URL базы (по умолчанию временная SQLite)")
+    asyncio.run(main(parser.parse_args()))
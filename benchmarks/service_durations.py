@@ -0,0 +1,185 @@
+"""
+Проверка услуг разной продолжительности и индекса занятых интервалов.
+
+Записывает на завтра супервизию (90 минут + перерыв) и закрывает час
+после обеда, затем сверяет свободные слоты каждой услуги каталога
+с ожидаемыми: приём с перерывом не должен пересекать ни запись, ни
+закрытый интервал, а приём — выходить за конец рабочего дня. Проверяет,
+что запись и перенос на время, пересекающее другую запись с другим
+началом, отклоняются (SlotTakenError).
+
+Затем сравнивает IntervalIndex (services/slots.py) с перебором всех
+интервалов на случайных данных разного размера: ответы должны совпадать,
+время на одну проверку — расти логарифмически, а не линейно.
+
+Запуск:
+    python -m benchmarks.service_durations
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import timeit
+from datetime import date, datetime, time, timedelta
+
+from benchmarks.common import setup_engine
+
+import database.session as db_session
+from database.models import Client, UnavailableSlot
+from benchmarks.update_sessions import seed_schedule
+from services.booking import SlotTakenError, book_appointment, reschedule_appointment
+from services.catalog import SERVICES
+from services.slots import IntervalIndex, get_available_slots, invalidate_all
+
+DAY = date.today() + timedelta(days=1)
+SIZES = (10, 100, 1_000, 10_000)
+DEFAULT_QUERIES = 2_000
+
+# Свободные слоты завтрашнего дня (рабочие часы 09:00–18:00) после записи
+# супервизии на 10:00 (занята до 11:40) и закрытия 14:00–15:00
+EXPECTED_SLOTS = {
+    "consult": ["09:00", "12:00", "13:00", "15:00", "16:00", "17:00"],
+    "intro": ["09:00", "12:00", "13:00", "15:00", "16:00", "17:00"],
+    "supervision": ["12:00", "15:00", "16:00"],
+}
+
+
+def at(hour: int) -> datetime:
+    """Завтра в hour:00."""
+    return datetime.combine(DAY, time(hour=hour))
+
+
+async def check_durations() -> tuple:
+    """
+    Проверить слоты услуг, запись и перенос с учётом продолжительности.
+    
+    Returns:
+        tuple: Свободные слоты по услугам и описания найденных нарушений
+    """
+    failures = []
+    await seed_schedule()
+    async with db_session.SessionLocal() as session:
+        client = Client(full_name="Клиент Супервизии", phone_number="+79990000001")
+        session.add(client)
+        session.add(UnavailableSlot(date_time_start=at(14), date_time_end=at(15)))
+        await session.commit()
+        supervision_id = await book_appointment(session, client.id, at(10), "supervision")
+    invalidate_all()
+    
+    slots = {code: await get_available_slots(DAY, service=code) for code in SERVICES}
+    failures.extend(
+        f"{code}: слоты {slots[code]}, ожидалось {expected}"
+        for code, expected in EXPECTED_SLOTS.items()
+        if slots[code] != expected
+    )
+    
+    async with db_session.SessionLocal() as session:
+        try:
+            await book_appointment(session, client.id, at(11), "consult")
+            failures.append("запись на 11:00 пересекает супервизию, но сохранена")
+        except SlotTakenError:
+            pass
+        consult_id = await book_appointment(session, client.id, at(12), "consult")
+        try:
+            await reschedule_appointment(session, consult_id, at(11), "consult")
+            failures.append("перенос на 11:00 пересекает супервизию, но выполнен")
+        except SlotTakenError:
+            pass
+        # Перенос на час раньше пересекает только саму переносимую запись
+        if not await reschedule_appointment(session, supervision_id, at(9), "supervision"):
+            failures.append("супервизия не перенесена на 09:00")
+    return slots, failures
+
+
+def check_index(size: int, queries: int, rng: random.Random) -> dict:
+    """
+    Сравнить IntervalIndex с перебором на случайных интервалах.
+    
+    Args:
+        size: Количество занятых интервалов
+        queries: Количество проверяемых интервалов
+        rng: Генератор случайных чисел
+    
+    Returns:
+        dict: Время на проверку (мкс) обоими способами, ускорение
+              и число расхождений ответов
+    """
+    origin = datetime.combine(DAY, time.min)
+    span = max(size, 10) * 120
+
+    def random_interval(longest: int) -> tuple:
+        start = origin + timedelta(minutes=rng.randrange(span))
+        return start, start + timedelta(minutes=rng.randint(15, longest))
+    
+    intervals = [random_interval(100) for _ in range(size)]
+    candidates = [random_interval(100) for _ in range(queries)]
+    index = IntervalIndex(intervals)
+
+    def scan(start: datetime, end: datetime) -> bool:
+        return any(busy_start < end and busy_end > start for busy_start, busy_end in intervals)
+    
+    mismatches = sum(
+        index.overlaps(start, end) != scan(start, end)
+        for start, end in candidates
+    )
+    indexed = min(timeit.repeat(
+        lambda: [index.overlaps(start, end) for start, end in candidates],
+        number=1,
+        repeat=3
+    ))
+    scanned = min(timeit.repeat(
+        lambda: [scan(start, end) for start, end in candidates],
+        number=1,
+        repeat=3
+    ))
+    return {
+        "intervals": size,
+        "index_us": round(indexed / queries * 1e6, 3),
+        "scan_us": round(scanned / queries * 1e6, 3),
+        "speedup": round(scanned / indexed, 1),
+        "mismatches": mismatches,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Выполнить проверки и вывести результат в формате JSON."""
+    engine = await setup_engine(args.db_url)
+    slots, failures = await check_durations()
+    await engine.dispose()
+    
+    rng = random.Random(args.seed)
+    index = [check_index(size, args.queries, rng) for size in SIZES]
+    failures.extend(
+        f"{row['intervals']} интервалов: {row['mismatches']} расхождений с перебором"
+        for row in index
+        if row["mismatches"]
+    )
+    if index[-1]["speedup"] <= 1:
+        failures.append("индекс не быстрее перебора на больших данных")
+    print(json.dumps(
+        {
+            "services": {
+                code: {
+                    "duration_min": int(service.duration.total_seconds() // 60),
+                    "buffer_min": int(service.buffer.total_seconds() // 60),
+                    "slots": slots[code],
+                }
+                for code, service in SERVICES.items()
+            },
+            "interval_index": index,
+            "failures": failures,
+        },
+        ensure_ascii=False,
+        indent=2
+    ))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db-url", help="URL базы (по умолчанию временная SQLite)")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
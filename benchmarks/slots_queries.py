@@ -0,0 +1,134 @@
+"""
+Бенчмарк количества запросов при расчёте свободных слотов.
+
+Для рабочих дней разной длины (4–16 часов) заполняет половину слотов
+записями, добавляет закрытый интервал и замеряет количество SQL-запросов
+и время работы ``get_available_slots``. Затем замеряет
+``get_available_days`` на горизонтах разной длины. Количество запросов
+не должно зависеть ни от длины рабочего дня, ни от горизонта; строки
+рабочего расписания берутся из резидентного снимка.
+
+Каждый вызов замеряется дважды: после сброса кэша доступности (cold)
+и на прогретом кэше (warm), где запросов к БД быть не должно.
+
+Запуск:
+    python -m benchmarks.slots_queries
+"""
+import asyncio
+import json
+import time as perf
+from datetime import date, datetime, time, timedelta
+
+from benchmarks.common import setup_sqlite_engine, count_queries
+
+import database.session as db_session
+from database.models import Appointment, Client, UnavailableSlot, WorkSchedule
+from services.slots import (
+    cache_stats,
+    get_available_days,
+    get_available_slots,
+    invalidate_all
+)
+from services.work_schedule import refresh_schedule_snapshot
+
+DAY_LENGTHS = (4, 8, 12, 16)
+HORIZONS = (7, 10, 30, 90)
+REPEATS = 50
+
+
+async def seed_day(target: date, hours: int) -> None:
+    """
+    Заполнить базу данными одного рабочего дня.
+    
+    Расписание задаётся на день недели, поэтому тот же рабочий день
+    повторяется каждую неделю горизонта.
+    
+    Args:
+        target: Дата рабочего дня
+        hours: Продолжительность рабочего дня в часах
+    """
+    async with db_session.SessionLocal() as session:
+        for model in (Appointment, UnavailableSlot, WorkSchedule, Client):
+            await session.execute(model.__table__.delete())
+        start = time(hour=6)
+        session.add(WorkSchedule(
+            weekday=target.weekday(),
+            start_time=start,
+            end_time=time(hour=6 + hours)
+        ))
+        client = Client(full_name="Бенчмарк", phone_number="+70000000000")
+        session.add(client)
+        await session.flush()
+        day_start = datetime.combine(target, start)
+        for hour in range(0, hours, 2):
+            session.add(Appointment(
+                client_id=client.id,
+                date_time=day_start + timedelta(hours=hour),
+                service="consult",
+                status="active"
+            ))
+        session.add(UnavailableSlot(
+            date_time_start=day_start + timedelta(hours=1),
+            date_time_end=day_start + timedelta(hours=2),
+            reason="Бенчмарк"
+        ))
+        await session.commit()
+    await refresh_schedule_snapshot()
+
+
+async def measure(engine, call, *args) -> dict:
+    """
+    Замерить вызов без кэша (cold) и с прогретым кэшем (warm).
+    
+    Args:
+        engine: Движок временной базы
+        call: Асинхронная функция сервиса слотов
+        *args: Аргументы вызова
+    
+    Returns:
+        dict: Количество запросов и среднее время для обоих режимов
+    """
+    invalidate_all()
+    with count_queries(engine) as cold:
+        started = perf.perf_counter()
+        result = await call(*args)
+        cold_ms = (perf.perf_counter() - started) * 1000
+    with count_queries(engine) as warm:
+        started = perf.perf_counter()
+        for _ in range(REPEATS):
+            await call(*args)
+        warm_ms = (perf.perf_counter() - started) * 1000 / REPEATS
+    return {
+        "result_size": len(result),
+        "cold_queries": cold.count,
+        "cold_ms": round(cold_ms, 3),
+        "warm_queries": warm.count,
+        "warm_avg_ms": round(warm_ms, 3),
+    }
+
+
+async def main() -> None:
+    """Выполнить замеры и вывести результат в формате JSON."""
+    engine = await setup_sqlite_engine()
+    target = date.today() + timedelta(days=1)
+    results = []
+    for hours in DAY_LENGTHS:
+        await seed_day(target, hours)
+        results.append({
+            "call": "get_available_slots",
+            "day_hours": hours,
+            **await measure(engine, get_available_slots, target),
+        })
+    for days_ahead in HORIZONS:
+        results.append({
+            "call": "get_available_days",
+            "days_ahead": days_ahead,
+            **await measure(engine, get_available_days, days_ahead),
+        })
+    results.append({"call": "cache_stats", **cache_stats()})
+    await engine.dispose()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,364 @@
+"""
+Проверка числа SQL-запросов на путях, читающих записи вместе с клиентами.
+
+Дайджест психолога, просмотр записей, ответ клиента на напоминание и отмена
+с причиной загружают клиента через связь Appointment.client в том же
+запросе, что и запись. Проверка выполняет каждый путь на базе с разным
+числом записей и сравнивает количество SQL-запросов с точным ожидаемым
+значением: оно не должно зависеть от числа записей (нет N+1).
+
+Пути оформления записи (подтверждение клиентом и ручная запись психологом)
+проверяются так же и, кроме того, должны фиксировать транзакцию ровно
+один раз: клиент находится или создаётся в той же транзакции, что и запись.
+Ручная запись на известный телефон с другим ФИО не фиксируется, пока
+психолог не подтвердит найденного клиента.
+
+Запуск:
+    python -m benchmarks.statement_counts
+"""
+import asyncio
+import json
+import sys
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+from benchmarks.common import setup_engine, count_queries
+
+from aiogram import Dispatcher
+from sqlalchemy import func, select
+
+import database.session as db_session
+from database.session import update_session_scope
+from database.models import DEFAULT_PSYCHOLOGIST_ID, Appointment, Client
+from handlers.client.booking import register_client_handlers
+from handlers.client.cancel import receive_cancel_reason
+from handlers.client.reminders import register_reminder_handlers
+from handlers.psychologist.menu import manual_confirm
+from handlers.psychologist.records import render_records_page
+from keyboards.callbacks import ReminderAnswer
+from services.clients import clear_client_cache, peek_client_by_telegram_id
+from services.outbound import outbound
+from services.scheduler import send_daily_digest
+from config import PSYCHOLOGIST_ID
+
+SIZES = (1, 25)
+# Telegram ID клиента, впервые записывающегося через бота
+NEW_USER_ID = 99_000
+# Другой пользователь, вводящий телефон клиента NEW_USER_ID в другом виде
+OTHER_USER_ID = 99_001
+NEW_CLIENT_PHONE = "8 (901) 000-00-01"
+# Психолог вводит телефон клиента «Клиент 0» с другим ФИО
+RENAMED_CLIENT_NAME = "Петров Пётр"
+RENAMED_CLIENT_PHONE = "+7 (000) 000-00-00"
+
+# Точное число SQL-запросов для каждого пути
+EXPECTED = {
+    "digest": 1,
+    "records_tomorrow": 1,
+    "records_week": 1,
+    "handle_confirmation": 2,
+    "cancel_with_reason": 2,
+    # Upsert клиента и INSERT записи
+    "confirm_booking_new_client": 2,
+    # Клиент из кэша: только INSERT записи
+    "confirm_booking_known_client": 1,
+    # Телефон принадлежит другому Telegram ID: upsert не отдаёт клиента
+    "confirm_booking_foreign_phone": 1,
+    "manual_confirm_new_client": 2,
+    # Номер уже есть у клиента бота: тот же upsert, клиент получит уведомление
+    "manual_confirm_existing_phone": 2,
+    # Телефон записан за клиентом с другим ФИО: только upsert, затем
+    # психолог подтверждает найденного клиента
+    "manual_confirm_renamed_phone": 1,
+    "manual_confirm_renamed_phone_confirmed": 2,
+}
+
+# Точное число фиксаций транзакции для путей оформления записи
+EXPECTED_COMMITS = {
+    "confirm_booking_new_client": 1,
+    "confirm_booking_known_client": 1,
+    "confirm_booking_foreign_phone": 0,
+    "manual_confirm_new_client": 1,
+    "manual_confirm_existing_phone": 1,
+    "manual_confirm_renamed_phone": 0,
+    "manual_confirm_renamed_phone_confirmed": 1,
+}
+
+
+class StubBot:
+    """Бот-заглушка для очереди исходящих сообщений."""
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> str:
+        return text
+
+
+class StubMessage:
+    """Сообщение-заглушка: принимает ответы и правки без обращения к API."""
+
+    def __init__(self, text: str = "", user_id: int = PSYCHOLOGIST_ID) -> None:
+        self.text = text
+        self.from_user = SimpleNamespace(id=user_id)
+        self.chat = SimpleNamespace(id=user_id)
+        self.answers = []
+
+    async def answer(self, text: str, *args, **kwargs) -> None:
+        self.answers.append(text)
+
+    async def edit_text(self, *args, **kwargs) -> None:
+        pass
+
+
+class StubState:
+    """Контекст FSM-заглушка с заранее заданными данными."""
+
+    def __init__(self, **data) -> None:
+        self.data = data
+
+    async def get_data(self) -> dict:
+        return self.data
+
+    async def update_data(self, **data) -> None:
+        self.data.update(data)
+
+    async def clear(self) -> None:
+        pass
+
+
+async def seed(count: int) -> list:
+    """
+    Создать клиентов и по count записей на сегодня и на завтра.
+    
+    Args:
+        count: Количество записей на каждый из двух дней
+    
+    Returns:
+        list: ID записей на завтра
+    """
+    async with db_session.SessionLocal() as session:
+        clear_client_cache()
+        for model in (Appointment, Client):
+            await session.execute(model.__table__.delete())
+        today = date.today()
+        tomorrow_ids = []
+        for index in range(count):
+            client = Client(
+                full_name=f"Клиент {index}",
+                phone_number=f"+7000{index:07d}",
+                phone_normalized=f"7000{index:07d}",
+                telegram_id=10_000 + index
+            )
+            session.add(client)
+            await session.flush()
+            slot = time(hour=8 + index // 6, minute=(index % 6) * 10)
+            session.add(Appointment(
+                client_id=client.id,
+                date_time=datetime.combine(today, slot),
+                service="consult",
+                status="active"
+            ))
+            tomorrow = Appointment(
+                client_id=client.id,
+                date_time=datetime.combine(today + timedelta(days=1), slot),
+                service="consult",
+                status="active"
+            )
+            session.add(tomorrow)
+            await session.flush()
+            tomorrow_ids.append(tomorrow.id)
+        await session.commit()
+    return tomorrow_ids
+
+
+def booking_state(hour: int, **data) -> StubState:
+    """Данные FSM на шаге подтверждения записи на завтра в hour:00."""
+    return StubState(
+        date=date.today() + timedelta(days=1),
+        time=time(hour=hour),
+        service="consult",
+        **data
+    )
+
+
+async def measure(engine, count: int, handle_confirmation, confirm_booking) -> dict:
+    """
+    Выполнить каждый путь и посчитать его SQL-запросы и фиксации.
+    
+    Args:
+        engine: Движок базы
+        count: Количество записей на день
+        handle_confirmation: Обработчик ответа на напоминание
+        confirm_booking: Обработчик подтверждения записи клиентом
+    
+    Returns:
+        dict: Число запросов и фиксаций по каждому пути
+    """
+    tomorrow_ids = await seed(count)
+    new_user = SimpleNamespace(message=StubMessage(), from_user=SimpleNamespace(id=NEW_USER_ID))
+    other_user = SimpleNamespace(message=StubMessage(), from_user=SimpleNamespace(id=OTHER_USER_ID))
+    renamed_message = StubMessage("Да")
+    renamed_state = booking_state(18, full_name=RENAMED_CLIENT_NAME, phone=RENAMED_CLIENT_PHONE)
+    calls = {
+        "digest": lambda session: send_daily_digest(),
+        "records_tomorrow": lambda session: render_records_page("tomorrow", 0, DEFAULT_PSYCHOLOGIST_ID),
+        "records_week": lambda session: render_records_page("week", 0, DEFAULT_PSYCHOLOGIST_ID),
+        "handle_confirmation": lambda session: handle_confirmation(
+            SimpleNamespace(message=StubMessage(), from_user=SimpleNamespace(id=10_000)),
+            session,
+            ReminderAnswer(tomorrow_ids[0], True)
+        ),
+        "cancel_with_reason": lambda session: receive_cancel_reason(
+            StubMessage("Болезнь"),
+            StubState(cancel_appointment_id=tomorrow_ids[-1]),
+            session
+        ),
+        "confirm_booking_new_client": lambda session: confirm_booking(
+            new_user,
+            booking_state(20, full_name="Новый Клиент", phone=NEW_CLIENT_PHONE),
+            session
+        ),
+        # Клиент, созданный предыдущим путём, уже в кэше
+        "confirm_booking_known_client": lambda session: confirm_booking(
+            new_user,
+            booking_state(
+                21,
+                full_name="Новый Клиент",
+                phone="+79010000001",
+                client_id=peek_client_by_telegram_id(NEW_USER_ID).id
+            ),
+            session
+        ),
+        # Другой пользователь не получает чужого клиента и его записи
+        "confirm_booking_foreign_phone": lambda session: confirm_booking(
+            other_user,
+            booking_state(19, full_name="Другой Клиент", phone="+7 901 000-00-01"),
+            session
+        ),
+        "manual_confirm_new_client": lambda session: manual_confirm(
+            StubMessage("Да"),
+            booking_state(22, full_name="Клиент Психолога", phone="+7 902 000 00 02"),
+            session
+        ),
+        "manual_confirm_existing_phone": lambda session: manual_confirm(
+            StubMessage("Да"),
+            booking_state(23, full_name="Клиент 0", phone="8 000 000-00-00"),
+            session
+        ),
+        # Психолог видит найденного клиента, запись ещё не создана
+        "manual_confirm_renamed_phone": lambda session: manual_confirm(
+            renamed_message,
+            renamed_state,
+            session
+        ),
+        # Повторное «Да» записывает найденного клиента
+        "manual_confirm_renamed_phone_confirmed": lambda session: manual_confirm(
+            StubMessage("Да"),
+            renamed_state,
+            session
+        ),
+    }
+    counts = {}
+    for name, call in calls.items():
+        # Каждый путь выполняется как отдельное обновление со своей сессией
+        with count_queries(engine) as counter:
+            async with update_session_scope() as scope:
+                await call(scope.get())
+        counts[name] = {"statements": counter.count, "commits": counter.commits}
+    
+    async with db_session.SessionLocal() as session:
+        evening = datetime.combine(date.today() + timedelta(days=1), time(hour=18))
+        booked = (await session.execute(
+            select(func.count())
+            .select_from(Appointment)
+            .where(Appointment.date_time >= evening)
+        )).scalar()
+        clients = (await session.execute(select(func.count()).select_from(Client))).scalar()
+        new_client_phone = (await session.execute(
+            select(Client.phone_number).where(Client.telegram_id == NEW_USER_ID)
+        )).scalar()
+        renamed_booked_for = (await session.execute(
+            select(Client.full_name)
+            .join(Appointment, Appointment.client_id == Client.id)
+            .where(Appointment.date_time == evening)
+        )).scalar()
+    counts["bookings_saved"] = booked
+    counts["clients_created"] = clients - count
+    counts["new_client_phone"] = new_client_phone
+    counts["renamed_prompt_shown"] = any("Клиент 0" in text for text in renamed_message.answers)
+    counts["renamed_booked_for"] = renamed_booked_for
+    return counts
+
+
+async def main() -> None:
+    """Выполнить проверку и вывести результат в формате JSON."""
+    engine = await setup_engine()
+    outbound.start(StubBot())
+    dp = Dispatcher()
+    register_reminder_handlers(dp)
+    register_client_handlers(dp)
+    handlers = {
+        handler.callback.__name__: handler.callback
+        for handler in dp.callback_query.handlers
+    }
+    
+    results = {}
+    for count in SIZES:
+        results[count] = await measure(
+            engine,
+            count,
+            handlers["handle_confirmation"],
+            handlers["confirm_booking"]
+        )
+    await outbound.stop()
+    await engine.dispose()
+    
+    failures = [
+        f"{name}: {counts[name]['statements']} запросов при {count} записях, ожидалось {EXPECTED[name]}"
+        for count, counts in results.items()
+        for name in EXPECTED
+        if counts[name]["statements"] != EXPECTED[name]
+    ]
+    failures.extend(
+        f"{name}: {counts[name]['commits']} фиксаций при {count} записях, ожидалось {EXPECTED_COMMITS[name]}"
+        for count, counts in results.items()
+        for name in EXPECTED_COMMITS
+        if counts[name]["commits"] != EXPECTED_COMMITS[name]
+    )
+    failures.extend(
+        f"при {count} записях сохранено {counts['bookings_saved']} записей "
+        f"и {counts['clients_created']} новых клиентов, ожидалось 5 и 2"
+        for count, counts in results.items()
+        if (counts["bookings_saved"], counts["clients_created"]) != (5, 2)
+    )
+    failures.extend(
+        f"при {count} записях психологу не показан клиент с телефоном "
+        f"{RENAMED_CLIENT_PHONE}"
+        for count, counts in results.items()
+        if not counts["renamed_prompt_shown"]
+    )
+    failures.extend(
+        f"при {count} записях запись на телефон {RENAMED_CLIENT_PHONE} оформлена "
+        f"на «{counts['renamed_booked_for']}», ожидалось «Клиент 0»"
+        for count, counts in results.items()
+        if counts["renamed_booked_for"] != "Клиент 0"
+    )
+    failures.extend(
+        f"при {count} записях телефон клиента изменён на {counts['new_client_phone']}"
+        for count, counts in results.items()
+        if counts["new_client_phone"] != NEW_CLIENT_PHONE
+    )
+    print(json.dumps(
+        {
+            "expected": EXPECTED,
+            "expected_commits": EXPECTED_COMMITS,
+            "measured": results,
+            "failures": failures,
+        },
+        ensure_ascii=False,
+        indent=2
+    ))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,351 @@
+"""
+Проверка разделения расписаний и кэшей по психологам.
+
+Для нескольких размеров команды (по умолчанию 1, 10 и 100 психологов)
+заполняет базу одинаковыми расписаниями и записями каждого психолога
+и замеряет для выборки психологов:
+
+- холодную загрузку свободных дней (get_available_days) — время
+  и число SQL-запросов;
+- повторный вызов из кэша — без запросов к базе;
+- оформление записи (book_appointment).
+
+Затем проверяет, что запись к одному психологу сбрасывает кэш только
+его раздела, а утренний дайджест обходится одним запросом при любом
+числе психологов. Время холодной загрузки и записи при наибольшей
+команде не должно превышать время при наименьшей больше чем в
+--max-ratio раз, а число запросов — расти с числом психологов.
+
+Запуск:
+    python -m benchmarks.tenants [--tenants 1 10 100]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from typing import Any, Dict, List
+
+from benchmarks.common import setup_engine, count_queries
+
+import database.session as db_session
+from database.models import (
+    DEFAULT_PSYCHOLOGIST_ID,
+    Appointment,
+    Client,
+    Psychologist,
+    WorkSchedule,
+)
+import services.scheduler as scheduler
+from services.booking import SlotTakenError, book_appointment
+from services.catalog import DEFAULT_SERVICE, get_service
+from services.outbound import OutboundQueue
+from services.psychologists import refresh_psychologists
+from services.scheduler import send_daily_digest
+from services.slots import get_available_days, invalidate_all, invalidate_dates
+from services.work_schedule import refresh_schedule_snapshot
+
+DEFAULT_TENANTS = (1, 10, 100)
+DEFAULT_APPOINTMENTS = 60
+DEFAULT_SAMPLE = 10
+DEFAULT_MAX_RATIO = 3.0
+HORIZON = 30
+REPEATS = 5
+# Telegram ID психолога с номером n (кроме психолога по умолчанию)
+TELEGRAM_ID_BASE = 500_000
+
+
+class StubBot:
+    """Бот-заглушка: запоминает получателей дайджеста."""
+
+    def __init__(self) -> None:
+        self.recipients: List[int] = []
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> str:
+        self.recipients.append(chat_id)
+        return text
+
+
+async def seed(tenants: int, appointments: int, rng: random.Random) -> None:
+    """
+    Заполнить базу психологами, их расписаниями и записями.
+    
+    У каждого психолога рабочие часы 09:00–18:00 каждый день недели
+    и appointments записей на ближайшие HORIZON дней.
+    
+    Args:
+        tenants: Количество психологов
+        appointments: Количество записей у каждого психолога
+        rng: Генератор случайных чисел
+    """
+    today = date.today()
+    busy = get_service(DEFAULT_SERVICE).busy
+    async with db_session.SessionLocal() as session:
+        for model in (Appointment, WorkSchedule, Client):
+            await session.execute(model.__table__.delete())
+        await session.execute(
+            Psychologist.__table__.delete()
+            .where(Psychologist.id != DEFAULT_PSYCHOLOGIST_ID)
+        )
+        session.add_all(
+            Psychologist(
+                id=psychologist_id,
+                telegram_id=TELEGRAM_ID_BASE + psychologist_id,
+                full_name=f"Психолог {psychologist_id}"
+            )
+            for psychologist_id in range(DEFAULT_PSYCHOLOGIST_ID + 1, tenants + 1)
+        )
+        client = Client(full_name="Бенчмарк", phone_number="+70000000000")
+        session.add(client)
+        await session.flush()
+        for psychologist_id in range(DEFAULT_PSYCHOLOGIST_ID, tenants + 1):
+            session.add_all(
+                WorkSchedule(
+                    psychologist_id=psychologist_id,
+                    weekday=weekday,
+                    start_time=dtime(9, 0),
+                    end_time=dtime(18, 0)
+                )
+                for weekday in range(7)
+            )
+            starts = rng.sample(
+                [
+                    datetime.combine(today + timedelta(days=day), dtime(hour=hour))
+                    for day in range(1, HORIZON)
+                    for hour in range(9, 18)
+                ],
+                appointments
+            )
+            session.add_all(
+                Appointment(
+                    client_id=client.id,
+                    psychologist_id=psychologist_id,
+                    date_time=start,
+                    service=DEFAULT_SERVICE,
+                    busy_until=start + busy
+                )
+                for start in starts
+            )
+        await session.commit()
+    await refresh_psychologists()
+    await refresh_schedule_snapshot()
+    invalidate_all()
+
+
+async def measure_days(engine, psychologist_id: int) -> Dict[str, float]:
+    """
+    Замерить холодную и повторную загрузку свободных дней психолога.
+    
+    Args:
+        engine: Движок базы
+        psychologist_id: ID психолога
+    
+    Returns:
+        Dict[str, float]: Лучшее время (мс) и число запросов в обоих случаях
+    """
+    cold, warm = [], []
+    for _ in range(REPEATS):
+        invalidate_all(psychologist_id)
+        with count_queries(engine) as cold_counter:
+            started = time.perf_counter()
+            await get_available_days(HORIZON, psychologist_id=psychologist_id)
+            cold.append(time.perf_counter() - started)
+        with count_queries(engine) as warm_counter:
+            started = time.perf_counter()
+            await get_available_days(HORIZON, psychologist_id=psychologist_id)
+            warm.append(time.perf_counter() - started)
+    return {
+        "cold_ms": min(cold) * 1000,
+        "cold_queries": cold_counter.count,
+        "warm_ms": min(warm) * 1000,
+        "warm_queries": warm_counter.count,
+    }
+
+
+async def measure_booking(psychologist_id: int, rng: random.Random) -> float:
+    """
+    Замерить оформление записи к психологу на свободное время.
+    
+    Args:
+        psychologist_id: ID психолога
+        rng: Генератор случайных чисел
+    
+    Returns:
+        float: Время оформления записи, мс
+    """
+    days = await get_available_days(HORIZON, psychologist_id=psychologist_id)
+    day = rng.choice(days)[1]
+    async with db_session.SessionLocal() as session:
+        client_id = (await session.execute(Client.__table__.select())).first().id
+        for hour in rng.sample(range(9, 18), 9):
+            try:
+                started = time.perf_counter()
+                await book_appointment(
+                    session,
+                    client_id,
+                    datetime.combine(day, dtime(hour=hour)),
+                    DEFAULT_SERVICE,
+                    psychologist_id=psychologist_id
+                )
+                elapsed = time.perf_counter() - started
+            except SlotTakenError:
+                continue
+            invalidate_dates(day, psychologist_id=psychologist_id)
+            return elapsed * 1000
+    raise RuntimeError(f"нет свободного времени у психолога {psychologist_id} на {day}")
+
+
+async def check_isolation(engine, sample: List[int]) -> List[str]:
+    """
+    Проверить, что сброс кэша одного психолога не задевает остальных.
+    
+    Args:
+        engine: Движок базы
+        sample: ID психологов выборки
+    
+    Returns:
+        List[str]: Описания найденных нарушений
+    """
+    failures = []
+    for psychologist_id in sample:
+        await get_available_days(HORIZON, psychologist_id=psychologist_id)
+    invalidate_dates(date.today() + timedelta(days=1), psychologist_id=sample[0])
+    for psychologist_id in sample:
+        with count_queries(engine) as counter:
+            await get_available_days(HORIZON, psychologist_id=psychologist_id)
+        if psychologist_id == sample[0] and not counter.count:
+            failures.append(f"кэш психолога {psychologist_id} не сброшен после записи")
+        if psychologist_id != sample[0] and counter.count:
+            failures.append(
+                f"сброс кэша психолога {sample[0]} затронул психолога {psychologist_id}"
+            )
+    return failures
+
+
+async def check_digest(engine, tenants: int) -> Dict[str, Any]:
+    """
+    Отправить дайджест и посчитать запросы и получателей.
+    
+    Args:
+        engine: Движок базы
+        tenants: Количество психологов
+    
+    Returns:
+        Dict[str, Any]: Число запросов и получателей дайджеста
+    """
+    bot = StubBot()
+    queue = OutboundQueue(global_rate=10_000)
+    queue.start(bot)
+    default_queue, scheduler.outbound = scheduler.outbound, queue
+    try:
+        with count_queries(engine) as counter:
+            await send_daily_digest()
+    finally:
+        scheduler.outbound = default_queue
+        await queue.stop()
+    return {
+        "queries": counter.count,
+        "recipients": len(set(bot.recipients)),
+        "expected_recipients": tenants,
+    }
+
+
+async def run(url, tenants: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Заполнить базу для одного размера команды и выполнить замеры.
+    
+    Args:
+        url: URL базы или None для временной SQLite
+        tenants: Количество психологов
+        args: Параметры запуска
+    
+    Returns:
+        Dict[str, Any]: Результаты замеров для этого размера команды
+    """
+    rng = random.Random(args.seed)
+    engine = await setup_engine(url)
+    await seed(tenants, args.appointments, rng)
+    step = max(tenants // args.sample, 1)
+    sample = list(range(DEFAULT_PSYCHOLOGIST_ID, tenants + 1, step))[:args.sample]
+    
+    days = [await measure_days(engine, psychologist_id) for psychologist_id in sample]
+    booking = [await measure_booking(psychologist_id, rng) for psychologist_id in sample]
+    failures = await check_isolation(engine, sample)
+    digest = await check_digest(engine, tenants)
+    await engine.dispose()
+    return {
+        "tenants": tenants,
+        "sampled": len(sample),
+        "cold_ms": round(statistics.median(row["cold_ms"] for row in days), 3),
+        "cold_queries": max(row["cold_queries"] for row in days),
+        "warm_ms": round(statistics.median(row["warm_ms"] for row in days), 3),
+        "warm_queries": max(row["warm_queries"] for row in days),
+        "booking_ms": round(statistics.median(booking), 3),
+        "digest": digest,
+        "failures": failures,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Выполнить замеры и вывести результат в формате JSON."""
+    results = [await run(args.db_url, tenants, args) for tenants in sorted(args.tenants)]
+    
+    failures = []
+    for row in results:
+        failures.extend(f"{row['tenants']} психологов: {failure}" for failure in row.pop("failures"))
+        if row["warm_queries"]:
+            failures.append(
+                f"{row['tenants']} психологов: повторная загрузка дней выполнила "
+                f"{row['warm_queries']} запросов"
+            )
+        digest = row["digest"]
+        if digest["queries"] != 1:
+            failures.append(f"{row['tenants']} психологов: дайджест выполнил {digest['queries']} запросов")
+        if digest["recipients"] != digest["expected_recipients"]:
+            failures.append(
+                f"{row['tenants']} психологов: дайджест получили "
+                f"{digest['recipients']} из {digest['expected_recipients']}"
+            )
+    smallest, largest = results[0], results[-1]
+    if largest["cold_queries"] > smallest["cold_queries"]:
+        failures.append(
+            f"число запросов холодной загрузки растёт: {smallest['cold_queries']} → "
+            f"{largest['cold_queries']}"
+        )
+    ratios = {
+        key: round(largest[key] / smallest[key], 2)
+        for key in ("cold_ms", "booking_ms")
+    }
+    failures.extend(
+        f"{key} вырос в {ratio} раз при {largest['tenants']} психологах"
+        for key, ratio in ratios.items()
+        if ratio > args.max_ratio
+    )
+    print(json.dumps(
+        {
+            "appointments_per_tenant": args.appointments,
+            "horizon_days": HORIZON,
+            "results": results,
+            "ratios": ratios,
+            "failures": failures,
+        },
+        ensure_ascii=False,
+        indent=2
+    ))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db-url", help="URL базы (по умолчанию временная SQLite)")
+    parser.add_argument("--tenants", type=int, nargs="+", default=list(DEFAULT_TENANTS))
+    parser.add_argument("--appointments", type=int, default=DEFAULT_APPOINTMENTS)
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE)
+    parser.add_argument("--max-ratio", type=float, default=DEFAULT_MAX_RATIO)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,176 @@
+"""
+Проверка сессии БД на обновление.
+
+Прогоняет через диспетчер с DbSessionMiddleware полный сценарий записи
+нового клиента (/start → ФИО → телефон → услуга → дата → время →
+подтверждение) и для каждого обновления считает созданные сессии БД
+и SQL-запросы. Ожидается не больше одной сессии на обновление: сервисы
+(services/slots.py) используют сессию обновления через get_session().
+
+Затем обрабатывается обновление с обработчиком, который открывает сессию
+в обход get_session() и не закрывает её, — детектор утечек должен
+это заметить.
+
+Запуск:
+    python -m benchmarks.update_sessions
+"""
+import asyncio
+import json
+import sys
+import time
+from datetime import date, time as dtime, timedelta
+from typing import Any, Dict
+
+from benchmarks.common import setup_sqlite_engine, count_queries
+
+from aiogram import Dispatcher
+from aiogram.filters import Command
+from aiogram.types import Message, Update
+from sqlalchemy import text
+
+import database.session as db_session
+from database.models import WorkSchedule
+from benchmarks.fake_bot_api import FakeBotApi
+from handlers.client.booking import register_client_handlers
+from keyboards.callbacks import BOOKING_CONFIRM, BOOKING_DATE, BOOKING_SERVICE, BOOKING_TIME
+from middlewares.db_session import register_db_session_middleware, session_stats
+from services.work_schedule import refresh_schedule_snapshot
+
+USER_ID = 5000
+MAX_SESSIONS_PER_UPDATE = 1
+
+
+class CountingSessionFactory:
+    """Фабрика сессий, считающая созданные сессии."""
+
+    def __init__(self, factory) -> None:
+        self.factory = factory
+        self.created = 0
+
+    def __call__(self, *args, **kwargs):
+        self.created += 1
+        return self.factory(*args, **kwargs)
+
+
+def message_update(update_id: int, text_: str, user_id: int = USER_ID) -> Dict[str, Any]:
+    """Обновление с текстовым сообщением клиента."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Клиент"},
+            "text": text_,
+        },
+    }
+
+
+def callback_update(update_id: int, data: str, user_id: int = USER_ID) -> Dict[str, Any]:
+    """Обновление с нажатием inline-кнопки."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": "1",
+            "from": {"id": user_id, "is_bot": False, "first_name": "Клиент"},
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "…",
+            },
+        },
+    }
+
+
+async def seed_schedule() -> None:
+    """Рабочие часы 09:00–18:00 каждый день недели."""
+    async with db_session.SessionLocal() as session:
+        for weekday in range(7):
+            session.add(WorkSchedule(
+                weekday=weekday,
+                start_time=dtime(9, 0),
+                end_time=dtime(18, 0)
+            ))
+        await session.commit()
+    await refresh_schedule_snapshot()
+
+
+async def main() -> None:
+    """Выполнить проверку и вывести результат в формате JSON."""
+    engine = await setup_sqlite_engine()
+    await seed_schedule()
+    api = FakeBotApi()
+    await api.start()
+    bot = api.create_bot()
+    
+    dp = Dispatcher()
+    register_db_session_middleware(dp)
+    leaked = []
+
+    @dp.message(Command("leak"))
+    async def leaky_handler(message: Message) -> None:
+        session = db_session.SessionLocal()
+        await session.execute(text("SELECT 1"))
+        leaked.append(session)
+    
+    register_client_handlers(dp)
+    factory = CountingSessionFactory(db_session.SessionLocal)
+    db_session.SessionLocal = factory
+    
+    day = date.today() + timedelta(days=1)
+    steps = [
+        ("start", message_update(1, "/start")),
+        ("full_name", message_update(2, "Иванова Мария Петровна")),
+        ("phone", message_update(3, "+79001234567")),
+        ("select_service", callback_update(4, BOOKING_SERVICE.pack("consult"))),
+        ("select_date", callback_update(5, BOOKING_DATE.pack(day))),
+        ("select_time", callback_update(6, BOOKING_TIME.pack("10:00"))),
+        ("confirm_booking", callback_update(7, BOOKING_CONFIRM.pack(True))),
+    ]
+    results = {}
+    for name, raw in steps:
+        created = factory.created
+        with count_queries(engine) as counter:
+            await dp.feed_update(bot, Update.model_validate(raw, context={"bot": bot}))
+        results[name] = {
+            "sessions": factory.created - created,
+            "queries": counter.count,
+        }
+    
+    leaks_before = session_stats()["leaks"]
+    await dp.feed_update(bot, Update.model_validate(message_update(8, "/leak"), context={"bot": bot}))
+    leak_detected = session_stats()["leaks"] == leaks_before + 1
+    for session in leaked:
+        await session.close()
+    
+    await bot.session.close()
+    await api.stop()
+    await engine.dispose()
+    
+    failures = [
+        f"{name}: сессий {values['sessions']}, допустимо {MAX_SESSIONS_PER_UPDATE}"
+        for name, values in results.items()
+        if values["sessions"] > MAX_SESSIONS_PER_UPDATE
+    ]
+    if not leak_detected:
+        failures.append("утечка сессии не обнаружена")
+    print(json.dumps(
+        {
+            "steps": results,
+            "leak_detected": leak_detected,
+            "stats": session_stats(),
+            "api_calls": dict(api.calls),
+            "failures": failures,
+        },
+        ensure_ascii=False,
+        indent=2
+    ))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
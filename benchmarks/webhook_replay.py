@@ -0,0 +1,220 @@
+"""
+Повтор записанных обновлений: вебхук против long polling.
+
+Одна и та же последовательность обновлений подаётся боту двумя способами:
+
+- webhook — POST-запросами на сервер services/webhook.py с секретным токеном;
+- polling — через заглушку Bot API (benchmarks/fake_bot_api.py), из которой
+  диспетчер забирает обновления getUpdates.
+
+Обновления поступают с заданной частотой; каждое обрабатывается
+обработчиком, имитирующим работу бота (asyncio.sleep). Сквозная задержка —
+время от поступления обновления до завершения его обработки. Дополнительно
+проверяется, что запрос с неверным секретом отклоняется с кодом 401.
+
+Обновления берутся из JSON-файла (список объектов Update, например выгрузка
+getUpdates) или генерируются: сообщения /start от разных пользователей.
+
+Запуск:
+    python -m benchmarks.webhook_replay [файл.json] [--count N] [--rate R]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from statistics import quantiles
+from typing import Any, Callable, Dict, List
+
+import benchmarks.common  # noqa: F401  (переменные окружения для config.py)
+
+from aiohttp import ClientSession, web
+from aiogram import Dispatcher
+
+from benchmarks.fake_bot_api import FakeBotApi
+from services.webhook import (
+    SECRET_HEADER,
+    WebhookReceiver,
+    create_webhook_app
+)
+
+DEFAULT_COUNT = 500
+DEFAULT_RATE = 200.0
+HANDLER_DELAY = 0.005
+SECRET = "replay-secret"
+PATH = "/webhook"
+
+
+def synthetic_updates(count: int) -> List[Dict[str, Any]]:
+    """Сгенерировать сообщения /start от 50 разных пользователей."""
+    updates = []
+    for index in range(count):
+        user_id = 1000 + index % 50
+        updates.append({
+            "update_id": index + 1,
+            "message": {
+                "message_id": index + 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Клиент"},
+                "text": "/start",
+            },
+        })
+    return updates
+
+
+def load_updates(path: str) -> List[Dict[str, Any]]:
+    """Загрузить записанные обновления и пронумеровать их по порядку."""
+    with open(path, encoding="utf-8") as file:
+        updates = json.load(file)
+    for index, update in enumerate(updates):
+        update["update_id"] = index + 1
+    return updates
+
+
+def create_dispatcher(done: Dict[int, float], finished: asyncio.Event, total: int) -> Dispatcher:
+    """
+    Создать диспетчер, фиксирующий завершение обработки каждого обновления.
+    
+    Args:
+        done: Время завершения по update_id (заполняется)
+        finished: Событие, устанавливаемое после обработки всех обновлений
+        total: Общее число обновлений
+    """
+    dp = Dispatcher()
+
+    async def track(handler: Callable, update, data: Dict[str, Any]) -> Any:
+        await asyncio.sleep(HANDLER_DELAY)
+        result = await handler(update, data)
+        done[update.update_id] = time.perf_counter()
+        if len(done) == total:
+            finished.set()
+        return result
+    
+    dp.update.outer_middleware(track)
+    return dp
+
+
+def summarize(arrived: Dict[int, float], done: Dict[int, float], elapsed: float) -> Dict[str, float]:
+    """Перцентили сквозной задержки (мс) и пропускная способность."""
+    samples = [done[key] - arrived[key] for key in arrived]
+    cuts = quantiles(samples, n=100)
+    return {
+        "updates": len(samples),
+        "throughput_per_s": round(len(samples) / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+async def pace(updates: List[Dict[str, Any]], rate: float, deliver: Callable) -> None:
+    """Подавать обновления с частотой rate в секунду."""
+    started = time.perf_counter()
+    for index, update in enumerate(updates):
+        delay = started + index / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        deliver(update)
+
+
+async def replay_webhook(updates: List[Dict[str, Any]], rate: float) -> Dict[str, Any]:
+    """Подать обновления POST-запросами на сервер вебхука."""
+    api = FakeBotApi()
+    await api.start()
+    bot = api.create_bot()
+    arrived, done, finished = {}, {}, asyncio.Event()
+    dp = create_dispatcher(done, finished, len(updates))
+    receiver = WebhookReceiver(bot, dp, SECRET)
+    runner = web.AppRunner(create_webhook_app(receiver, PATH))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}{PATH}"
+    receiver.start()
+    
+    statuses = []
+    posts = []
+    async with ClientSession() as http:
+        async with http.post(url, json=updates[0], headers={SECRET_HEADER: "wrong"}) as response:
+            rejected_status = response.status
+
+        async def post(update: Dict[str, Any]) -> None:
+            async with http.post(url, json=update, headers={SECRET_HEADER: SECRET}) as response:
+                statuses.append(response.status)
+
+        def deliver(update: Dict[str, Any]) -> None:
+            arrived[update["update_id"]] = time.perf_counter()
+            posts.append(asyncio.create_task(post(update)))
+        
+        started = time.perf_counter()
+        await pace(updates, rate, deliver)
+        await asyncio.gather(*posts)
+        await finished.wait()
+        elapsed = time.perf_counter() - started
+    
+    await receiver.stop()
+    await runner.cleanup()
+    await bot.session.close()
+    await api.stop()
+    return {
+        **summarize(arrived, done, elapsed),
+        "bad_secret_status": rejected_status,
+        "non_200_responses": sum(status != 200 for status in statuses),
+        "receiver": receiver.stats(),
+    }
+
+
+async def replay_polling(updates: List[Dict[str, Any]], rate: float) -> Dict[str, Any]:
+    """Подать обновления через getUpdates заглушки Bot API."""
+    api = FakeBotApi()
+    await api.start()
+    bot = api.create_bot()
+    arrived, done, finished = {}, {}, asyncio.Event()
+    dp = create_dispatcher(done, finished, len(updates))
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+
+    def deliver(update: Dict[str, Any]) -> None:
+        arrived[update["update_id"]] = time.perf_counter()
+        api.push_update(update)
+    
+    started = time.perf_counter()
+    await pace(updates, rate, deliver)
+    await finished.wait()
+    elapsed = time.perf_counter() - started
+    
+    await dp.stop_polling()
+    await polling
+    await api.stop()
+    return {
+        **summarize(arrived, done, elapsed),
+        "get_updates_calls": api.calls["getUpdates"],
+    }
+
+
+async def main(updates: List[Dict[str, Any]], rate: float) -> None:
+    """Выполнить оба повтора и вывести результат в формате JSON."""
+    results = {
+        "rate_per_s": rate,
+        "handler_delay_ms": HANDLER_DELAY * 1000,
+        "webhook": await replay_webhook([dict(u) for u in updates], rate),
+        "polling": await replay_polling([dict(u) for u in updates], rate),
+    }
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    webhook = results["webhook"]
+    if (
+        webhook["bad_secret_status"] != 401
+        or webhook["non_200_responses"]
+        or webhook["receiver"]["processed"] != len(updates)
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", nargs="?", help="JSON-файл с записанными обновлениями")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE)
+    args = parser.parse_args()
+    source = load_updates(args.path) if args.path else synthetic_updates(args.count)
+    asyncio.run(main(source, args.rate))
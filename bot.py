@@ -10,11 +10,32 @@ import logging
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
 
-from config import BOT_TOKEN
-from services.scheduler import schedule_reminders, send_missed_day_reminders
+from config import BOT_TOKEN, BOT_MODE
+from database.session import engine, pool_stats
+from services.scheduler import (
+    scheduler,
+    schedule_reminders,
+    restore_reminder_jobs,
+    dispatch_due_reminders
+)
+from services.outbound import outbound
+from services.fsm_storage import create_fsm_storage
+from services.webhook import run_webhook
+from services.metrics import (
+    instrument_database,
+    instrument_scheduler,
+    register_collector,
+    start_metrics_server
+)
+from services.slots import cache_stats
+from keyboards.inline import keyboard_cache_stats
+from services.clients import client_cache_stats
+from middlewares.db_session import register_db_session_middleware, session_stats
+from middlewares.metrics import register_metrics_middleware
+from services.work_schedule import refresh_schedule_snapshot
+from services.psychologists import refresh_psychologists
 from handlers.client.menu import register_user_menu
 from handlers.client.booking import register_client_handlers
 from handlers.client.cancel import register_cancel_handlers
@@ -24,6 +45,7 @@ from handlers.psychologist.menu import register_psychologist_menu
 from handlers.psychologist.schedule import register_schedule_handlers
 from handlers.psychologist.work_hours import register_work_hours_handlers
 from handlers.psychologist.records import register_records_handlers
+from handlers.psychologist.team import register_team_handlers
 
 
 async def main() -> None:
@@ -33,11 +55,12 @@ async def main() -> None:
     Выполняет следующие действия:
     1. Настраивает логирование
     2. Инициализирует бота с HTML-парсингом по умолчанию
-    3. Создаёт диспетчер с хранилищем состояний в памяти
-    4. Регистрирует все обработчики для клиентов и психолога
-    5. Запускает планировщик напоминаний
-    6. Отправляет пропущенные напоминания (если бот был выключен)
-    7. Начинает polling для получения обновлений от Telegram
+    3. Создаёт диспетчер с хранилищем состояний из FSM_STORAGE
+    4. Подключает сессию БД на обновление, метрики и все обработчики
+    5. Загружает справочник психологов и снимок рабочего расписания
+    6. Запускает очередь исходящих сообщений и планировщик напоминаний
+    7. Догоняет напоминания, пропущенные за время простоя
+    8. Получает обновления от Telegram: polling или вебхук (BOT_MODE)
     """
     logging.basicConfig(
         level=logging.INFO,
@@ -49,7 +72,22 @@ async def main() -> None:
         token=BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    dp = Dispatcher(storage=MemoryStorage())
+    dp = Dispatcher(storage=create_fsm_storage())
+
+    # Одна сессия БД на обновление: фиксируется или откатывается после обработки
+    register_db_session_middleware(dp)
+
+    # Метрики: обработчики, вызовы Bot API, SQL-запросы, задачи планировщика
+    register_metrics_middleware(dp, bot)
+    instrument_database()
+    instrument_scheduler(scheduler)
+    register_collector("slots_cache", cache_stats)
+    register_collector("keyboard_cache", keyboard_cache_stats)
+    register_collector("client_cache", client_cache_stats)
+    register_collector("outbound", outbound.stats)
+    register_collector("db_pool", pool_stats)
+    register_collector("update_sessions", session_stats)
+    metrics_server = await start_metrics_server()
 
     # Регистрация обработчиков для клиентов
     register_client_handlers(dp)
@@ -63,13 +101,36 @@ async def main() -> None:
     register_schedule_handlers(dp)
     register_work_hours_handlers(dp)
     register_records_handlers(dp)
+    register_team_handlers(dp)
+
+    # Справочник психологов и их рабочее расписание держатся в памяти
+    # и обновляются при изменениях
+    await refresh_psychologists()
+    await refresh_schedule_snapshot()
+
+    # Все исходящие рассылки идут через очередь с лимитами Telegram
+    outbound.start(bot)
 
     # Запуск планировщика напоминаний
-    schedule_reminders(bot)
-    await send_missed_day_reminders(bot)
+    schedule_reminders()
+    await restore_reminder_jobs()
+    await dispatch_due_reminders()
     
     logging.info("Бот успешно запущен и готов к работе!")
-    await dp.start_polling(bot)
+    try:
+        if BOT_MODE == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            # Telegram не отдаёт getUpdates, пока установлен вебхук
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        await outbound.stop()
+        await dp.storage.close()
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        # Соединения aiosqlite держат потоки, не дающие процессу завершиться
+        await engine.dispose()
 
 
 if __name__ == "__main__":
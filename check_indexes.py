@@ -0,0 +1,170 @@
+"""
+Утилита проверки планов горячих запросов.
+
+Выполняет EXPLAIN для запросов планировщика, просмотра записей и расчёта
+свободных слотов и проверяет, что каждый из них использует индекс,
+созданный миграциями (database/migrations.py).
+
+На PostgreSQL последовательное сканирование на время проверки отключается
+(SET LOCAL enable_seqscan = off): на почти пустых таблицах планировщик
+предпочёл бы его любому индексу, а проверяется именно пригодность индекса.
+
+Запуск:
+    python check_indexes.py
+"""
+import asyncio
+import logging
+import sys
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Sequence
+
+from sqlalchemy import select, text, Select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from database.models import DEFAULT_PSYCHOLOGIST_ID, Client
+from database.session import engine
+from services.scheduler import appointments_for_day_query, due_reminders_query
+from services.slots import booked_slots_query, closures_query
+from handlers.client.cancel import upcoming_appointments_query
+from handlers.psychologist.records import appointments_between_query
+
+
+class PlanCheck(NamedTuple):
+    """
+    Результат проверки плана одного запроса.
+    
+    Attributes:
+        name (str): Название запроса
+        indexes (Sequence[str]): Индексы, любой из которых подходит
+        ok (bool): Используется ли один из ожидаемых индексов
+        plan (str): Текст плана запроса
+    """
+    name: str
+    indexes: Sequence[str]
+    ok: bool
+    plan: str
+
+
+def hot_queries() -> List[tuple]:
+    """
+    Собрать горячие запросы с ожидаемыми индексами.
+    
+    Returns:
+        List[tuple]: Кортежи (название, запрос, ожидаемые индексы)
+    """
+    today = date.today()
+    now = datetime.now()
+    horizon_end = datetime.combine(today, datetime.min.time()) + timedelta(days=10)
+    return [
+        (
+            "scheduler: записи на сегодня",
+            appointments_for_day_query(today, unconfirmed_only=True),
+            ("ix_appointments_date_time_status",),
+        ),
+        (
+            "scheduler: окно догоняющей рассылки",
+            due_reminders_query(now),
+            ("ix_appointments_date_time_status",),
+        ),
+        (
+            "records: записи психолога за неделю",
+            appointments_between_query(
+                today,
+                today + timedelta(days=6),
+                DEFAULT_PSYCHOLOGIST_ID
+            ),
+            ("ix_appointments_tenant_date_time_status",),
+        ),
+        (
+            "my_appointments: будущие записи клиента",
+            upcoming_appointments_query(1, now),
+            ("ix_appointments_client_date_time",),
+        ),
+        (
+            "slots: занятые слоты психолога на горизонт",
+            booked_slots_query(now, horizon_end, DEFAULT_PSYCHOLOGIST_ID),
+            (
+                "ux_appointments_tenant_active_slot",
+                "ix_appointments_tenant_date_time_status",
+            ),
+        ),
+        (
+            "slots: закрытые интервалы психолога на горизонт",
+            closures_query(now, horizon_end, DEFAULT_PSYCHOLOGIST_ID),
+            ("ix_unavailable_slots_tenant_range",),
+        ),
+        (
+            "booking: клиент по нормализованному телефону",
+            select(Client).where(Client.phone_normalized == "70000000000"),
+            ("ux_clients_phone_normalized",),
+        ),
+    ]
+
+
+async def explain(conn: AsyncConnection, query: Select) -> str:
+    """
+    Получить план запроса в текстовом виде.
+    
+    Args:
+        conn: Асинхронное соединение с БД
+        query: Проверяемый запрос
+    
+    Returns:
+        str: План запроса (строки плана через перевод строки)
+    """
+    sql = str(query.compile(
+        dialect=conn.dialect,
+        compile_kwargs={"literal_binds": True}
+    ))
+    if conn.dialect.name == "sqlite":
+        result = await conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+        return "\n".join(row[-1] for row in result.all())
+    result = await conn.execute(text(f"EXPLAIN {sql}"))
+    return "\n".join(row[0] for row in result.all())
+
+
+async def check_query_plans(db_engine: AsyncEngine) -> List[PlanCheck]:
+    """
+    Проверить, что горячие запросы используют ожидаемые индексы.
+    
+    Args:
+        db_engine: Асинхронный движок SQLAlchemy
+    
+    Returns:
+        List[PlanCheck]: Результаты проверки по каждому запросу
+    """
+    checks = []
+    async with db_engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, query, indexes in hot_queries():
+            plan = await explain(conn, query)
+            ok = any(index in plan for index in indexes)
+            checks.append(PlanCheck(name, indexes, ok, plan))
+        await conn.rollback()
+    return checks
+
+
+async def main() -> int:
+    """
+    Вывести результаты проверки планов.
+    
+    Returns:
+        int: Код завершения (0 — все запросы используют индексы)
+    """
+    checks = await check_query_plans(engine)
+    for check in checks:
+        status = "OK" if check.ok else "НЕТ ИНДЕКСА"
+        logging.info(f"[{status}] {check.name} (ожидается {', '.join(check.indexes)})")
+        if not check.ok:
+            logging.info(check.plan)
+    await engine.dispose()
+    return 0 if all(check.ok for check in checks) else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(asyncio.run(main()))
@@ -3,8 +3,12 @@
 
 Загружает переменные окружения из файла .env и предоставляет настройки для:
 - Подключения к Telegram Bot API
-- Подключения к базе данных PostgreSQL
+- Подключения к базе данных (PostgreSQL или SQLite) и пула соединений
 - Идентификации психолога в системе
+- Ограничения скорости исходящих сообщений
+- Хранилища состояний FSM
+- Режима получения обновлений (polling или webhook)
+- HTTP-сервера метрик
 
 Raises:
     ValueError: Если обязательные переменные окружения (BOT_TOKEN, PSYCHOLOGIST_ID)
@@ -44,9 +48,49 @@ def get_db_config() -> Dict[str, str]:
 
 DB_CONFIG = get_db_config()
 
-DB_URL = (
-    f"postgresql+asyncpg://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
-    f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+# СУБД: postgresql (по умолчанию) или sqlite — локальный файл SQLITE_PATH
+# для установки на одном сервере. Явно заданный DB_URL имеет приоритет,
+# СУБД тогда определяется по его схеме.
+DB_URL = os.getenv("DB_URL", "")
+DB_BACKEND = os.getenv("DB_BACKEND", "").lower() or (
+    "sqlite" if DB_URL.startswith("sqlite") else "postgresql"
+)
+if DB_BACKEND not in ("postgresql", "sqlite"):
+    raise ValueError(f"Неизвестный DB_BACKEND: {DB_BACKEND} (ожидается postgresql или sqlite)")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "psychologist_bot.db")
+if not DB_URL:
+    if DB_BACKEND == "sqlite":
+        DB_URL = f"sqlite+aiosqlite:///{SQLITE_PATH}"
+    else:
+        DB_URL = (
+            f"postgresql+asyncpg://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
+            f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+        )
+# SQLite: сколько секунд ждать, пока другая транзакция держит блокировку записи
+DB_SQLITE_BUSY_TIMEOUT = float(os.getenv("DB_SQLITE_BUSY_TIMEOUT", "10"))
+
+# Пул соединений с БД (database/session.py). Пиковая нагрузка — утренняя
+# рассылка напоминаний: размер пула + переполнение ограничивают число
+# одновременных транзакций, остальные ждут до DB_POOL_TIMEOUT секунд.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Соединения старше DB_POOL_RECYCLE секунд пересоздаются
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Проверять соединение перед выдачей из пула (переживает рестарт PostgreSQL)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Ожидание соединения дольше этого порога (секунд) пишется в лог
+DB_POOL_WAIT_WARN = float(os.getenv("DB_POOL_WAIT_WARN", "0.5"))
+# Параметры драйвера asyncpg: кэш подготовленных запросов на соединение
+# и таймаут выполнения одного запроса, секунд
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+
+# Синхронный драйвер для хранилища задач APScheduler (SQLAlchemyJobStore);
+# по умолчанию — та же база, что и DB_URL
+JOBSTORE_DB_URL = os.getenv(
+    "JOBSTORE_DB_URL",
+    DB_URL.replace("+asyncpg", "+psycopg2").replace("+aiosqlite", "")
 )
 
 _psych_id = os.getenv("PSYCHOLOGIST_ID")
@@ -54,3 +98,45 @@ if _psych_id is None:
     raise ValueError("PSYCHOLOGIST_ID не задан в .env файле")
 
 PSYCHOLOGIST_ID: int = int(_psych_id)
+
+# Лимиты очереди исходящих сообщений (services/outbound.py).
+# Telegram допускает около 30 сообщений в секунду на бота
+# и около одного сообщения в секунду в один чат.
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "25"))
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_CHAT_BURST = float(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "8"))
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "5"))
+
+# Кэш данных клиентов по Telegram ID (services/clients.py): наибольшее
+# число клиентов в памяти и время жизни записи, секунд
+CLIENT_CACHE_SIZE = int(os.getenv("CLIENT_CACHE_SIZE", "2048"))
+CLIENT_CACHE_TTL = float(os.getenv("CLIENT_CACHE_TTL", "600"))
+
+# Хранилище состояний FSM: memory (в памяти процесса), redis или db
+# (таблица fsm_storage в основной базе данных)
+FSM_STORAGE = os.getenv("FSM_STORAGE", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Время жизни незавершённого сценария в Redis, секунд (0 — без ограничения)
+FSM_TTL = int(os.getenv("FSM_TTL", "86400")) or None
+
+# Режим получения обновлений: polling (long polling) или webhook
+# (встроенный aiohttp-сервер, services/webhook.py)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# Внешний HTTPS-адрес, по которому Telegram доступен сервер вебхука
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+# Секретный токен вебхука; если не задан, генерируется при каждом запуске
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+# Число одновременно обрабатываемых обновлений и длина очереди приёма
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "16"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+if BOT_MODE == "webhook" and not WEBHOOK_BASE_URL:
+    raise ValueError("WEBHOOK_BASE_URL не задан в .env файле (BOT_MODE=webhook)")
+
+# HTTP-сервер метрик в формате Prometheus (services/metrics.py);
+# METRICS_PORT=0 отключает сервер
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
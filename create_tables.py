@@ -1,23 +1,27 @@
 """
-Утилита для создания таблиц в базе данных.
+Утилита для создания и обновления таблиц в базе данных.
 
-Запускает асинхронное создание всех таблиц на основе моделей SQLAlchemy.
-Используется для инициализации базы данных перед первым запуском приложения.
+Запускает асинхронное создание всех таблиц на основе моделей SQLAlchemy,
+после чего применяет версионируемые миграции (индексы и изменения схемы).
+Используется для инициализации базы данных перед первым запуском приложения
+и для обновления существующей базы на месте.
 """
 import asyncio
 import logging
 
 from database.models import Base
+from database.migrations import migrate
 from database.session import engine
 
 
 async def create() -> None:
     """
-    Создать все таблицы в базе данных.
+    Создать все таблицы в базе данных и применить миграции.
     
     Выполняет синхронный вызов Base.metadata.create_all() через
     асинхронное соединение для создания всех таблиц, определённых
-    в моделях SQLAlchemy.
+    в моделях SQLAlchemy, затем применяет ещё не применённые
+    миграции из database/migrations.py.
     
     Raises:
         Exception: При ошибке подключения к БД или создания таблиц
@@ -26,9 +30,16 @@ async def create() -> None:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         logging.info("Таблицы успешно созданы в базе данных")
+        applied = await migrate(engine)
+        if applied:
+            logging.info(f"Применены миграции: {applied}")
+        else:
+            logging.info("Схема базы данных актуальна")
     except Exception as e:
         logging.exception(f"Ошибка при создании таблиц: {e}")
         raise
+    finally:
+        await engine.dispose()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,368 @@
+"""
+Версионируемые миграции схемы базы данных.
+
+Base.metadata.create_all() создаёт только отсутствующие таблицы и не умеет
+изменять уже существующую базу. Миграции из этого модуля применяются поверх
+неё по порядку версий; номер каждой применённой миграции записывается
+в таблицу schema_migrations, поэтому рабочую базу можно обновлять на месте
+повторным запуском create_tables.py.
+
+Каждая миграция выполняется в отдельной транзакции. SQL-операторы пишутся
+идемпотентными (IF NOT EXISTS), а для отдельных СУБД можно задать свой
+набор операторов. Изменения, которые нельзя записать идемпотентным SQL
+(например, добавление столбца, который create_all уже создал в новой базе),
+задаются функциями от синхронного соединения.
+"""
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Sequence, Union
+
+from sqlalchemy import Connection, bindparam, inspect, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config import PSYCHOLOGIST_ID
+from database.models import DEFAULT_PSYCHOLOGIST_ID, Appointment, Psychologist, SchemaMigration
+from services.catalog import get_service
+from utils.phone import normalize_phone
+
+# Шаг миграции: SQL-оператор или функция от синхронного соединения
+Statement = Union[str, Callable[[Connection], None]]
+
+
+def add_column(table: str, column: str, ddl: str) -> Callable[[Connection], None]:
+    """
+    Шаг миграции: добавить столбец, если его ещё нет.
+    
+    Args:
+        table: Имя таблицы
+        column: Имя столбца
+        ddl: Тип и ограничения столбца в SQL
+    
+    Returns:
+        Callable[[Connection], None]: Шаг миграции
+    """
+    def apply(sync_conn: Connection) -> None:
+        columns = {c["name"] for c in inspect(sync_conn).get_columns(table)}
+        if column not in columns:
+            sync_conn.execute(
+                text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+            )
+    return apply
+
+
+def backfill_phone_normalized(sync_conn: Connection) -> None:
+    """
+    Шаг миграции: заполнить нормализованный телефон существующих клиентов.
+    
+    Если один номер записан у нескольких клиентов, ключ получает только
+    один из них — клиент с Telegram ID, а среди равных самый ранний;
+    у остальных phone_normalized остаётся NULL, и уникальный индекс
+    создаётся без ошибки.
+    
+    Args:
+        sync_conn: Синхронное соединение миграции
+    """
+    rows = sync_conn.execute(text(
+        "SELECT id, phone_number, phone_normalized FROM clients "
+        "ORDER BY telegram_id IS NULL, id"
+    )).all()
+    taken = {row.phone_normalized for row in rows if row.phone_normalized}
+    updates = []
+    for row in rows:
+        if row.phone_normalized:
+            continue
+        key = normalize_phone(row.phone_number)
+        if key and key not in taken:
+            taken.add(key)
+            updates.append({"id": row.id, "key": key})
+    if updates:
+        sync_conn.execute(
+            text("UPDATE clients SET phone_normalized = :key WHERE id = :id"),
+            updates
+        )
+
+
+def backfill_busy_until(sync_conn: Connection) -> None:
+    """
+    Шаг миграции: заполнить конец приёма с перерывом у активных записей.
+    
+    Продолжительность берётся из каталога услуг (services/catalog.py).
+    Завершённые и отменённые записи время не занимают, их busy_until
+    остаётся NULL.
+    
+    Args:
+        sync_conn: Синхронное соединение миграции
+    """
+    appointments = Appointment.__table__
+    rows = sync_conn.execute(
+        select(appointments.c.id, appointments.c.date_time, appointments.c.service)
+        .where(
+            appointments.c.status == "active",
+            appointments.c.busy_until.is_(None)
+        )
+    ).all()
+    updates = [
+        {"row_id": row.id, "until": row.date_time + get_service(row.service).busy}
+        for row in rows
+    ]
+    if updates:
+        sync_conn.execute(
+            update(appointments)
+            .where(appointments.c.id == bindparam("row_id"))
+            .values(busy_until=bindparam("until")),
+            updates
+        )
+
+
+def ensure_default_psychologist(sync_conn: Connection) -> None:
+    """
+    Шаг миграции: завести психолога по умолчанию — владельца бота.
+    
+    Существующие записи, расписание и закрытые слоты переходят к нему
+    через значение по умолчанию столбца psychologist_id. Telegram ID
+    берётся из PSYCHOLOGIST_ID. На PostgreSQL последовательность ID
+    сдвигается за вставленный явно ID.
+    
+    Args:
+        sync_conn: Синхронное соединение миграции
+    """
+    psychologists = Psychologist.__table__
+    existing = sync_conn.execute(
+        select(psychologists.c.id).where(psychologists.c.id == DEFAULT_PSYCHOLOGIST_ID)
+    ).first()
+    if existing is not None:
+        return
+    sync_conn.execute(psychologists.insert().values(
+        id=DEFAULT_PSYCHOLOGIST_ID,
+        telegram_id=PSYCHOLOGIST_ID,
+        full_name="Психолог",
+        is_active=True
+    ))
+    if sync_conn.dialect.name == "postgresql":
+        sync_conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('psychologists', 'id'), "
+            "(SELECT MAX(id) FROM psychologists))"
+        ))
+
+
+def tenant_statements(column_ddl: str) -> List[Statement]:
+    """
+    Шаги миграции 6 для заданного определения столбца psychologist_id.
+    
+    Args:
+        column_ddl: Тип, ограничения и значение по умолчанию столбца
+    
+    Returns:
+        List[Statement]: Шаги миграции
+    """
+    return [
+        ensure_default_psychologist,
+        *(
+            add_column(table, "psychologist_id", column_ddl)
+            for table in ("appointments", "work_schedule", "unavailable_slots")
+        ),
+        # Одно время может быть занято у разных психологов: уникальность
+        # активной записи теперь в пределах психолога. Индекс заменяет
+        # ux_appointments_active_slot из миграции 2 и служит расчёту
+        # свободных слотов психолога.
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_appointments_tenant_active_slot "
+        "ON appointments (psychologist_id, date_time) WHERE status = 'active'",
+        "DROP INDEX IF EXISTS ux_appointments_active_slot",
+        # Просмотр записей психолога за период
+        "CREATE INDEX IF NOT EXISTS ix_appointments_tenant_date_time_status "
+        "ON appointments (psychologist_id, date_time, status)",
+        # Закрытые интервалы психолога, пересекающие горизонт
+        "CREATE INDEX IF NOT EXISTS ix_unavailable_slots_tenant_range "
+        "ON unavailable_slots (psychologist_id, date_time_end, date_time_start)",
+        "DROP INDEX IF EXISTS ix_unavailable_slots_range",
+        # Рабочие дни психолога при редактировании расписания
+        "CREATE INDEX IF NOT EXISTS ix_work_schedule_tenant_weekday "
+        "ON work_schedule (psychologist_id, weekday)",
+    ]
+
+
+class Migration(NamedTuple):
+    """
+    Описание одной миграции.
+    
+    Attributes:
+        version (int): Номер версии (строго возрастает)
+        name (str): Краткое описание
+        statements (Sequence[Statement]): Шаги миграции для любой СУБД
+        dialect_statements (Dict[str, Sequence[Statement]]): Шаги, заменяющие
+            statements для конкретного диалекта ('postgresql', 'sqlite')
+    """
+    version: int
+    name: str
+    statements: Sequence[Statement]
+    dialect_statements: Dict[str, Sequence[Statement]] = {}
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        name="Индексы для горячих запросов",
+        statements=(
+            # Расчёт свободных слотов: активные записи в диапазоне дат
+            "CREATE INDEX IF NOT EXISTS ix_appointments_active_date_time "
+            "ON appointments (date_time) WHERE status = 'active'",
+            # Планировщик и просмотр записей: диапазон дат + фильтр статуса
+            "CREATE INDEX IF NOT EXISTS ix_appointments_date_time_status "
+            "ON appointments (date_time, status)",
+            # «Мои записи»: будущие записи клиента
+            "CREATE INDEX IF NOT EXISTS ix_appointments_client_date_time "
+            "ON appointments (client_id, date_time)",
+            # Поиск клиента при записи по ФИО и телефону
+            "CREATE INDEX IF NOT EXISTS ix_clients_full_name_phone "
+            "ON clients (full_name, phone_number)",
+            # Закрытые интервалы, пересекающие горизонт: условие
+            # date_time_end > начала горизонта отсекает все прошедшие
+            # интервалы, поэтому конец интервала идёт первым
+            "CREATE INDEX IF NOT EXISTS ix_unavailable_slots_range "
+            "ON unavailable_slots (date_time_end, date_time_start)",
+        ),
+    ),
+    Migration(
+        version=2,
+        name="Уникальность активной записи на время",
+        statements=(
+            # Две активные записи на одно время запрещены на уровне БД;
+            # уникальный индекс заменяет обычный частичный индекс
+            # из миграции 1. Если в базе уже есть такие дубликаты,
+            # миграция завершится ошибкой — их нужно разрешить вручную.
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_appointments_active_slot "
+            "ON appointments (date_time) WHERE status = 'active'",
+            "DROP INDEX IF EXISTS ix_appointments_active_date_time",
+        ),
+    ),
+    Migration(
+        version=3,
+        name="Время оформления записи для журнала напоминаний",
+        statements=(
+            # Напоминания, срок которых наступил раньше оформления записи,
+            # не отправляются при догоняющей рассылке. Таблицу reminder_log
+            # создаёт create_all, её уникальный ключ (appointment_id, kind)
+            # входит в определение таблицы.
+            add_column("appointments", "booked_at", "TIMESTAMP"),
+        ),
+    ),
+    Migration(
+        version=4,
+        name="Нормализованный телефон — ключ клиента",
+        statements=(
+            # Запись находит или создаёт клиента одним
+            # INSERT ... ON CONFLICT (phone_normalized); NULL (номер
+            # не распознан или дубликат) ограничению не мешает
+            add_column("clients", "phone_normalized", "VARCHAR(32)"),
+            backfill_phone_normalized,
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_clients_phone_normalized "
+            "ON clients (phone_normalized)",
+            # Поиск клиента по ФИО и телефону больше не выполняется
+            "DROP INDEX IF EXISTS ix_clients_full_name_phone",
+        ),
+    ),
+    Migration(
+        version=5,
+        name="Продолжительность приёма по услуге",
+        statements=(
+            # Запись и перенос отклоняют время, пересекающее другую
+            # активную запись с учётом её продолжительности и перерыва
+            add_column("appointments", "busy_until", "TIMESTAMP"),
+            backfill_busy_until,
+        ),
+    ),
+    Migration(
+        version=6,
+        name="Несколько психологов",
+        # Таблицу psychologists создаёт create_all. Строки, созданные
+        # до миграции, получают psychologist_id = DEFAULT_PSYCHOLOGIST_ID.
+        statements=tenant_statements(
+            f"INTEGER NOT NULL DEFAULT {DEFAULT_PSYCHOLOGIST_ID} "
+            "REFERENCES psychologists (id)"
+        ),
+        dialect_statements={
+            # SQLite с PRAGMA foreign_keys=ON не добавляет столбец
+            # с REFERENCES и ненулевым значением по умолчанию; внешний
+            # ключ остаётся в модели (новые базы создаёт create_all)
+            "sqlite": tenant_statements(
+                f"INTEGER NOT NULL DEFAULT {DEFAULT_PSYCHOLOGIST_ID}"
+            ),
+        },
+    ),
+    Migration(
+        version=7,
+        name="Время захвата напоминания",
+        statements=(
+            # Неотправленное напоминание с устаревшим захватом снова
+            # захватывается догоняющей рассылкой; у строк, созданных
+            # до миграции, claimed_at = NULL, и они считаются устаревшими
+            add_column("reminder_log", "claimed_at", "TIMESTAMP"),
+        ),
+    ),
+]
+
+
+async def get_schema_version(conn: AsyncConnection) -> int:
+    """
+    Получить номер последней применённой миграции.
+    
+    Args:
+        conn: Асинхронное соединение с БД
+    
+    Returns:
+        int: Номер версии (0, если миграции ещё не применялись)
+    """
+    result = await conn.execute(select(SchemaMigration.version))
+    return max(result.scalars().all(), default=0)
+
+
+async def migrate(engine: AsyncEngine) -> List[int]:
+    """
+    Применить все ещё не применённые миграции.
+    
+    Args:
+        engine: Асинхронный движок SQLAlchemy
+    
+    Returns:
+        List[int]: Номера применённых в этом запуске миграций
+    
+    Raises:
+        Exception: При ошибке выполнения миграции (транзакция миграции
+                   откатывается, предыдущие миграции остаются применёнными)
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: SchemaMigration.__table__.create(
+                sync_conn,
+                checkfirst=True
+            )
+        )
+        current = await get_schema_version(conn)
+    
+    applied = []
+    dialect = engine.dialect.name
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version <= current:
+            continue
+        statements = migration.dialect_statements.get(
+            dialect,
+            migration.statements
+        )
+        async with engine.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    await conn.run_sync(statement)
+                else:
+                    await conn.execute(text(statement))
+            await conn.execute(
+                SchemaMigration.__table__.insert().values(
+                    version=migration.version,
+                    name=migration.name,
+                    applied_at=datetime.now()
+                )
+            )
+        logging.info(
+            f"Применена миграция {migration.version}: {migration.name}"
+        )
+        applied.append(migration.version)
+    return applied
@@ -1,8 +1,17 @@
 """
 Модели данных для работы с базой данных.
 
-Содержит ORM-модели SQLAlchemy для управления клиентами, записями на приём,
-рабочим расписанием психолога и недоступными временными слотами.
+Содержит ORM-модели SQLAlchemy для управления психологами, клиентами,
+записями на приём, рабочим расписанием и недоступными временными слотами
+психологов, а также журнал отправленных напоминаний, состояния FSM
+и журнал применённых миграций схемы.
+
+Записи, расписание и закрытые слоты принадлежат психологу
+(psychologist_id). Данные, созданные до появления нескольких психологов,
+относятся к психологу DEFAULT_PSYCHOLOGIST_ID — владельцу бота
+(PSYCHOLOGIST_ID в конфигурации).
+
+Индексы для горячих запросов создаются миграциями (database/migrations.py).
 """
 from sqlalchemy import (
     Column,
@@ -12,10 +21,16 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     Time,
-    BigInteger
+    BigInteger,
+    Text,
+    UniqueConstraint,
+    Index
 )
 from sqlalchemy.orm import DeclarativeBase, relationship
 
+# Психолог, к которому относятся данные без явно указанного психолога
+DEFAULT_PSYCHOLOGIST_ID = 1
+
 
 class Base(DeclarativeBase):
     """
@@ -27,6 +42,29 @@ class Base(DeclarativeBase):
     pass
 
 
+class Psychologist(Base):
+    """
+    Модель психолога, ведущего приём через бота.
+    
+    Attributes:
+        id (int): Уникальный идентификатор психолога
+        telegram_id (int): Telegram ID психолога (уникальный)
+        full_name (str): Имя психолога для клиентов
+        is_active (bool): Принимает ли психолог новые записи
+    """
+    __tablename__ = "psychologists"
+
+    id = Column(Integer, primary_key=True)
+    telegram_id = Column(
+        BigInteger,
+        nullable=False,
+        unique=True,
+        comment="Telegram ID психолога"
+    )
+    full_name = Column(String(128), nullable=False, comment="Имя психолога")
+    is_active = Column(Boolean, nullable=False, default=True, comment="Принимает записи")
+
+
 class Client(Base):
     """
     Модель клиента (пользователя бота).
@@ -35,15 +73,31 @@ class Client(Base):
         id (int): Уникальный идентификатор клиента
         full_name (str): Полное имя клиента (ФИО)
         phone_number (str): Номер телефона клиента
+        phone_normalized (str): Нормализованный телефон — ключ клиента
+            (уникальный, None — номер не распознан)
         telegram_id (int): Telegram ID клиента (уникальный, может быть None)
         notes (str): Дополнительные заметки психолога о клиенте
         appointments (list[Appointment]): Список всех записей клиента
     """
     __tablename__ = "clients"
+    __table_args__ = (
+        # Ключ клиента для INSERT ... ON CONFLICT при записи; в уже
+        # существующей базе индекс создаёт миграция 4
+        Index(
+            "ux_clients_phone_normalized",
+            "phone_normalized",
+            unique=True
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     full_name = Column(String(128), nullable=False, comment="ФИО клиента")
     phone_number = Column(String(32), nullable=False, comment="Телефон клиента")
+    phone_normalized = Column(
+        String(32),
+        nullable=True,
+        comment="Нормализованный телефон (только цифры)"
+    )
     telegram_id = Column(
         BigInteger,
         nullable=True,
@@ -61,16 +115,29 @@ class Appointment(Base):
     Attributes:
         id (int): Уникальный идентификатор записи
         client_id (int): ID клиента (внешний ключ)
+        psychologist_id (int): ID психолога, к которому запись (внешний ключ)
         date_time (datetime): Дата и время приёма
         service (str): Тип услуги ('consult', 'intro', 'supervision')
         status (str): Статус записи ('active', 'cancelled', 'completed')
         confirmed (bool): Подтверждена ли запись клиентом (None - не отвечено)
+        booked_at (datetime): Когда запись оформлена или перенесена на текущее
+                              время (None - для записей, созданных до миграции 3)
+        busy_until (datetime): Конец приёма вместе с перерывом после него
+                               (None - вычисляется по каталогу услуг)
         client (Client): Связанный объект клиента
     """
     __tablename__ = "appointments"
 
     id = Column(Integer, primary_key=True)
     client_id = Column(Integer, ForeignKey("clients.id"))
+    psychologist_id = Column(
+        Integer,
+        ForeignKey("psychologists.id"),
+        nullable=False,
+        default=DEFAULT_PSYCHOLOGIST_ID,
+        server_default=str(DEFAULT_PSYCHOLOGIST_ID),
+        comment="Психолог"
+    )
     date_time = Column(DateTime, nullable=False, comment="Дата и время записи")
     service = Column(String(64), nullable=False, comment="Услуга")
     status = Column(
@@ -79,6 +146,16 @@ class Appointment(Base):
         comment="Статус: active/cancelled/completed"
     )
     confirmed = Column(Boolean, default=None, comment="Подтверждена ли запись")
+    booked_at = Column(
+        DateTime,
+        nullable=True,
+        comment="Время оформления или последнего переноса записи"
+    )
+    busy_until = Column(
+        DateTime,
+        nullable=True,
+        comment="Конец приёма с учётом перерыва после него"
+    )
 
     client = relationship("Client", back_populates="appointments")
 
@@ -91,6 +168,7 @@ class UnavailableSlot(Base):
     
     Attributes:
         id (int): Уникальный идентификатор слота
+        psychologist_id (int): ID психолога (внешний ключ)
         date_time_start (datetime): Начало недоступного периода
         date_time_end (datetime): Конец недоступного периода
         reason (str): Причина недоступности
@@ -98,6 +176,14 @@ class UnavailableSlot(Base):
     __tablename__ = "unavailable_slots"
 
     id = Column(Integer, primary_key=True)
+    psychologist_id = Column(
+        Integer,
+        ForeignKey("psychologists.id"),
+        nullable=False,
+        default=DEFAULT_PSYCHOLOGIST_ID,
+        server_default=str(DEFAULT_PSYCHOLOGIST_ID),
+        comment="Психолог"
+    )
     date_time_start = Column(
         DateTime,
         nullable=False,
@@ -114,10 +200,11 @@ class WorkSchedule(Base):
     """
     Модель рабочего расписания психолога.
     
-    Определяет регулярное расписание работы по дням недели.
+    Определяет регулярное расписание работы психолога по дням недели.
     
     Attributes:
         id (int): Уникальный идентификатор записи расписания
+        psychologist_id (int): ID психолога (внешний ключ)
         weekday (int): День недели (0 = понедельник, 6 = воскресенье)
         start_time (time): Время начала рабочего дня
         end_time (time): Время окончания рабочего дня
@@ -125,6 +212,108 @@ class WorkSchedule(Base):
     __tablename__ = "work_schedule"
 
     id = Column(Integer, primary_key=True)
+    psychologist_id = Column(
+        Integer,
+        ForeignKey("psychologists.id"),
+        nullable=False,
+        default=DEFAULT_PSYCHOLOGIST_ID,
+        server_default=str(DEFAULT_PSYCHOLOGIST_ID),
+        comment="Психолог"
+    )
     weekday = Column(Integer, nullable=False, comment="0 = Пн, 6 = Вс")
     start_time = Column(Time, nullable=False, comment="Время начала работы")
     end_time = Column(Time, nullable=False, comment="Время окончания работы")
+
+
+class ReminderLog(Base):
+    """
+    Модель журнала напоминаний клиентам.
+    
+    Строка вставляется до отправки напоминания и служит «захватом»:
+    уникальность пары (запись, вид напоминания) гарантирует, что одно
+    и то же напоминание не будет отправлено дважды, даже если его
+    одновременно пытаются отправить задача планировщика и догоняющая
+    рассылка после перезапуска. Строка без sent_at снова доступна для
+    захвата, если отправка завершилась ошибкой или захват устарел
+    (процесс упал между захватом и записью результата).
+    
+    Attributes:
+        id (int): Уникальный идентификатор строки журнала
+        appointment_id (int): ID записи (внешний ключ)
+        kind (str): Вид напоминания ('24h' - за сутки, 'day' - утром в день приёма)
+        due_at (datetime): Когда напоминание должно было уйти
+        claimed_at (datetime): Когда напоминание захвачено для отправки
+        sent_at (datetime): Когда оно фактически отправлено (None - не отправлено)
+        lag_seconds (int): Опоздание отправки относительно due_at в секундах
+        error (str): Текст ошибки, если отправить не удалось
+    """
+    __tablename__ = "reminder_log"
+    __table_args__ = (
+        UniqueConstraint(
+            "appointment_id",
+            "kind",
+            name="ux_reminder_log_appointment_kind"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    appointment_id = Column(
+        Integer,
+        ForeignKey("appointments.id"),
+        nullable=False
+    )
+    kind = Column(String(16), nullable=False, comment="Вид напоминания: 24h/day")
+    due_at = Column(
+        DateTime,
+        nullable=False,
+        comment="Плановое время отправки"
+    )
+    claimed_at = Column(DateTime, nullable=True, comment="Время захвата для отправки")
+    sent_at = Column(DateTime, nullable=True, comment="Фактическое время отправки")
+    lag_seconds = Column(Integer, comment="Опоздание отправки, секунд")
+    error = Column(String(256), comment="Ошибка отправки")
+
+
+class FsmRecord(Base):
+    """
+    Модель записи хранилища состояний FSM (services/fsm_storage.py).
+    
+    Attributes:
+        key (str): Ключ «бот:чат:пользователь»
+        state (str): Текущее состояние сценария (None - нет состояния)
+        data (str): Данные состояния в компактном JSON (None - нет данных)
+        updated_at (datetime): Время последнего изменения
+    """
+    __tablename__ = "fsm_storage"
+
+    key = Column(String(128), primary_key=True)
+    state = Column(String(128), nullable=True, comment="Состояние FSM")
+    data = Column(Text, nullable=True, comment="Данные состояния (JSON)")
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        comment="Время последнего изменения"
+    )
+
+
+class SchemaMigration(Base):
+    """
+    Модель применённой миграции схемы базы данных.
+    
+    Каждая строка фиксирует версию миграции из database/migrations.py,
+    которая уже применена к этой базе.
+    
+    Attributes:
+        version (int): Номер версии миграции
+        name (str): Краткое описание миграции
+        applied_at (datetime): Когда миграция была применена
+    """
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(128), nullable=False, comment="Описание миграции")
+    applied_at = Column(
+        DateTime,
+        nullable=False,
+        comment="Время применения миграции"
+    )
@@ -2,33 +2,316 @@
 Модуль для управления соединениями с базой данных.
 
 Предоставляет асинхронный движок SQLAlchemy и фабрику сессий для работы
-с базой данных PostgreSQL.
+с базой данных PostgreSQL (asyncpg) или SQLite (aiosqlite), см. DB_BACKEND.
+
+Параметры пула соединений и драйвера asyncpg задаются в config.py
+(DB_POOL_*, DB_STATEMENT_CACHE_SIZE, DB_COMMAND_TIMEOUT). Пул
+считает время получения соединения; текущее состояние пула возвращает
+pool_stats().
+
+Файл SQLite открывается в режиме WAL: читатели не блокируют запись
+и друг друга, а писатель в каждый момент один. Транзакция драйвера
+начинается с первого изменяющего запроса, поэтому блокировка записи
+берётся только на время изменений, а конкурирующий писатель ждёт её
+до DB_SQLITE_BUSY_TIMEOUT секунд вместо немедленной ошибки.
+
+Пока обрабатывается обновление Telegram, get_session() отдаёт сессию
+этого обновления (UpdateSession, см. middlewares/db_session.py), поэтому
+сервисы, вызванные из обработчика, работают в той же сессии.
 """
-from typing import AsyncGenerator
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Optional
 
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     create_async_engine,
     async_sessionmaker,
     AsyncSession
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+from config import (
+    DB_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_POOL_WAIT_WARN,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_COMMAND_TIMEOUT,
+    DB_SQLITE_BUSY_TIMEOUT
+)
+
+# Настройки каждого нового соединения SQLite: журнал WAL, синхронизация
+# на диск при контрольной точке WAL, проверка внешних ключей (как в PostgreSQL)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+)
+
 
-from config import DB_URL
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, считающий время их получения.
+    
+    Время получения включает ожидание свободного соединения, открытие
+    нового (в пределах переполнения) и проверку pre-ping. Получение
+    дольше DB_POOL_WAIT_WARN секунд пишется в лог вместе с состоянием пула.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
 
+    def connect(self):
+        """Выдать соединение из пула, замерив время ожидания."""
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            logging.error(f"Не дождались соединения с БД: {self.stats()}")
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if waited > DB_POOL_WAIT_WARN:
+                logging.warning(
+                    f"Соединение с БД получено через {waited:.2f} с: {self.stats()}"
+                )
 
-engine = create_async_engine(DB_URL, echo=False)
+    def stats(self) -> Dict[str, Any]:
+        """
+        Получить состояние пула и статистику ожидания.
+        
+        Returns:
+            Dict[str, Any]: Размер пула, выданные и свободные соединения,
+                            переполнение, число выдач и таймаутов,
+                            среднее и максимальное ожидание в миллисекундах
+        """
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 2),
+        }
+
+
+def build_engine(url: str = DB_URL, **overrides: Any) -> AsyncEngine:
+    """
+    Создать асинхронный движок с настройками пула из config.py.
+    
+    Args:
+        url: Адрес базы данных
+        **overrides: Параметры create_async_engine, заменяющие настройки
+    
+    Returns:
+        AsyncEngine: Движок с пулом InstrumentedPool; для SQLite —
+                     с режимом WAL и таймаутом ожидания блокировки
+    """
+    options: Dict[str, Any] = {
+        "echo": False,
+        "poolclass": InstrumentedPool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": DB_COMMAND_TIMEOUT,
+        }
+    elif url.startswith("sqlite"):
+        # Таймаут драйвера sqlite3 — ожидание блокировки записи (busy timeout)
+        options["connect_args"] = {"timeout": DB_SQLITE_BUSY_TIMEOUT}
+    options.update(overrides)
+    new_engine = create_async_engine(url, **options)
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+def _set_sqlite_pragmas(dbapi_connection, record) -> None:
+    """Применить SQLITE_PRAGMAS к новому соединению SQLite."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+engine = build_engine()
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
 
+class UpdateSession:
+    """
+    Сессия одного обновления Telegram.
+    
+    Сессия создаётся при первом обращении, закрывается в finish().
+    Доступна только задаче, обрабатывающей обновление: задачи, порождённые
+    из обработчика (и унаследовавшие контекст), открывают свои сессии,
+    так как одну AsyncSession нельзя использовать конкурентно.
+    
+    Attributes:
+        opened (bool): Сессия создавалась во время обновления
+        checked_out (int): Соединения пула, взятые во время обновления
+                           и ещё не возвращённые
+    """
+
+    def __init__(self) -> None:
+        self._session: Optional[AsyncSession] = None
+        self._task = asyncio.current_task()
+        self.finished = False
+        self.opened = False
+        self.checked_out = 0
+
+    def owns_current_task(self) -> bool:
+        """Выполняется ли код в задаче, обрабатывающей обновление."""
+        return not self.finished and asyncio.current_task() is self._task
+
+    def get(self) -> AsyncSession:
+        """Получить сессию обновления, создав её при первом обращении."""
+        if self._session is None:
+            self._session = SessionLocal()
+            self.opened = True
+        return self._session
+
+    async def finish(self, failed: bool) -> None:
+        """
+        Завершить транзакцию и закрыть сессию.
+        
+        Args:
+            failed: Обработка завершилась исключением — откатить транзакцию
+        """
+        self.finished = True
+        session, self._session = self._session, None
+        if session is None:
+            return
+        try:
+            if failed:
+                await session.rollback()
+            elif session.in_transaction():
+                await session.commit()
+        except Exception as e:
+            # Обработчик перехватил ошибку БД сам, транзакция не фиксируется
+            logging.error(f"Не удалось зафиксировать транзакцию обновления: {e}")
+            await session.rollback()
+        finally:
+            await session.close()
+
+
+_update_session: ContextVar[Optional[UpdateSession]] = ContextVar(
+    "update_session",
+    default=None
+)
+
+
+def current_update_session() -> Optional[UpdateSession]:
+    """
+    Получить сессию обновления, которое обрабатывает текущая задача.
+    
+    Returns:
+        Optional[UpdateSession]: Сессия обновления или None вне обработки
+    """
+    scope = _update_session.get()
+    if scope is not None and scope.owns_current_task():
+        return scope
+    return None
+
+
+@asynccontextmanager
+async def update_session_scope() -> AsyncIterator[UpdateSession]:
+    """
+    Открыть область сессии обновления.
+    
+    Внутри области get_session() отдаёт одну и ту же сессию. На выходе
+    транзакция фиксируется, а при исключении — откатывается; сессия
+    закрывается в любом случае.
+    
+    Yields:
+        UpdateSession: Сессия обновления
+    """
+    scope = UpdateSession()
+    token = _update_session.set(scope)
+    failed = True
+    try:
+        yield scope
+        failed = False
+    finally:
+        try:
+            await scope.finish(failed)
+        finally:
+            _update_session.reset(token)
+
+
+@event.listens_for(Pool, "checkout")
+def _track_checkout(dbapi_connection, record, proxy) -> None:
+    """Запомнить, что соединение взято во время обработки обновления."""
+    scope = current_update_session()
+    if scope is not None:
+        scope.checked_out += 1
+        record.info["update_session"] = scope
+
+
+@event.listens_for(Pool, "checkin")
+def _track_checkin(dbapi_connection, record) -> None:
+    """Отметить возврат соединения, взятого во время обработки обновления."""
+    scope = record.info.pop("update_session", None)
+    if scope is not None:
+        scope.checked_out -= 1
+
+
+def pool_stats(target: Optional[AsyncEngine] = None) -> Dict[str, Any]:
+    """
+    Получить состояние пула соединений движка.
+    
+    Args:
+        target: Движок (по умолчанию — основной движок проекта)
+    
+    Returns:
+        Dict[str, Any]: Статистика InstrumentedPool; для пулов других
+                        классов — только описание пула
+    """
+    pool = (target or engine).pool
+    if isinstance(pool, InstrumentedPool):
+        return pool.stats()
+    return {"pool": pool.status()}
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Асинхронный генератор сессий базы данных.
     
     Создаёт и предоставляет асинхронную сессию SQLAlchemy для выполнения
     запросов к базе данных. Автоматически закрывает сессию после использования.
+    Внутри обработки обновления отдаёт сессию обновления: её фиксирует
+    и закрывает middleware.
     
     Yields:
         AsyncSession: Асинхронная сессия SQLAlchemy
-        
+    
     Example:
         ```python
         async for session in get_session():
@@ -36,5 +319,9 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             clients = result.scalars().all()
         ```
     """
+    scope = current_update_session()
+    if scope is not None:
+        yield scope.get()
+        return
     async with SessionLocal() as session:
         yield session
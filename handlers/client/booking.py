@@ -2,78 +2,127 @@
 Обработчики процесса записи клиента к психологу.
 
 Реализует FSM (конечный автомат) для пошагового процесса записи:
-ФИО → Телефон → Услуга → Дата → Время → Подтверждение.
+ФИО → Телефон → Психолог → Услуга → Дата → Время → Подтверждение.
 
-Для существующих клиентов пропускает шаги ФИО и телефона.
+Для существующих клиентов пропускает шаги ФИО и телефона. Шаг выбора
+психолога показывается, только если в справочнике больше одного
+психолога; иначе запись идёт к единственному психологу.
 """
 import logging
 from datetime import datetime
 
-from aiogram import Dispatcher, types, F
+from aiogram import Dispatcher, types
 from aiogram.fsm.context import FSMContext
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
 from aiogram.exceptions import TelegramBadRequest
-from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from states.client_states import BookingStates
-from keyboards.inline import service_keyboard, confirm_keyboard
+from keyboards.inline import (
+    service_keyboard,
+    confirm_keyboard,
+    dates_keyboard,
+    times_keyboard,
+    psychologists_keyboard
+)
+from keyboards.callbacks import (
+    BOOKING_CONFIRM,
+    BOOKING_DATE,
+    BOOKING_PSYCHOLOGIST,
+    BOOKING_SERVICE,
+    BOOKING_TIME,
+    DayChoice,
+    PsychologistChoice,
+    ServiceChoice,
+    TimeChoice
+)
 from keyboards.reply import client_main_keyboard, schedule_main_keyboard
-from config import PSYCHOLOGIST_ID
-from database.session import get_session
-from database.models import Appointment, Client
-from services.slots import get_available_slots, get_available_days
+from database.models import DEFAULT_PSYCHOLOGIST_ID
+from services.psychologists import get_psychologist, is_psychologist, list_psychologists
+from services.clients import get_client, get_client_by_telegram_id
+from services.booking import (
+    BookingBusyError,
+    PhoneTakenError,
+    SlotTakenError,
+    book_appointment,
+    book_client_appointment
+)
+from services.scheduler import schedule_appointment_reminders
+from services.slots import (
+    get_available_slots,
+    get_available_days,
+    invalidate_dates
+)
 
 BLOCKED_INPUTS = ["📅 Записаться", "🗓 Мои записи", "📋 О боте", "🔙 Назад"]
 
 
-async def start_handler(message: types.Message, state: FSMContext) -> None:
+async def ask_psychologist_or_service(message: types.Message, state: FSMContext) -> None:
+    """
+    Предложить выбрать психолога или, если он один, сразу услугу.
+    
+    Args:
+        message: Сообщение, на которое отвечает бот
+        state: Контекст состояния FSM
+    """
+    psychologists = list_psychologists()
+    if len(psychologists) > 1:
+        await message.answer(
+            "👤 Выберите психолога:",
+            reply_markup=psychologists_keyboard(psychologists)
+        )
+        await state.set_state(BookingStates.psychologist)
+        return
+    await state.update_data(psychologist_id=psychologists[0].id)
+    await message.answer(
+        "🛎 Выберите услугу:",
+        reply_markup=service_keyboard()
+    )
+    await state.set_state(BookingStates.service)
+
+
+async def start_handler(message: types.Message, state: FSMContext, session: AsyncSession) -> None:
     """
     Начать процесс записи клиента.
     
     Проверяет, является ли пользователь психологом (запрещено записываться к себе).
-    Для существующих клиентов сразу переходит к выбору услуги.
+    Для существующих клиентов сразу переходит к выбору психолога или услуги.
     Для новых клиентов запрашивает ФИО.
     
     Args:
         message: Сообщение от пользователя с командой /start
         state: Контекст состояния FSM
+        session: Сессия БД текущего обновления
     """
     user_id = message.from_user.id
     
     # Психологу нельзя записываться к себе
-    if user_id == PSYCHOLOGIST_ID:
+    if is_psychologist(user_id):
         await message.answer(
             "🚫 Вы — психолог. Записываться к себе нельзя 🙂",
             reply_markup=schedule_main_keyboard()
         )
         return
     
-    # Проверяем, существует ли клиент в базе данных
-    async for session in get_session():
-        client_q = await session.execute(
-            select(Client).where(Client.telegram_id == user_id)
+    # Проверяем, существует ли клиент (кэш по Telegram ID или база данных)
+    client = await get_client_by_telegram_id(session, user_id)
+    
+    if client:
+        # Клиент уже есть — сохраняем его данные и переходим к выбору
+        # психолога или услуги
+        await state.update_data(
+            client_id=client.id,
+            full_name=client.full_name,
+            phone=client.phone_number
         )
-        client = client_q.scalar()
-        
-        if client:
-            # Клиент уже есть — сохраняем его данные и переходим к выбору услуги
-            await state.update_data(
-                full_name=client.full_name,
-                phone=client.phone_number
-            )
-            await message.answer(
-                "🛎 Выберите услугу:",
-                reply_markup=service_keyboard()
-            )
-            await state.set_state(BookingStates.service)
-        else:
-            # Новый клиент — запрашиваем ФИО
-            await message.answer(
-                "👋 Добро пожаловать! Чтобы записаться, укажите ваше <b>ФИО</b>:",
-                parse_mode="HTML"
-            )
-            await state.set_state(BookingStates.full_name)
+        await ask_psychologist_or_service(message, state)
+    else:
+        # Новый клиент — запрашиваем ФИО
+        await message.answer(
+            "👋 Добро пожаловать! Чтобы записаться, укажите ваше <b>ФИО</b>:",
+            parse_mode="HTML"
+        )
+        await state.set_state(BookingStates.full_name)
 
 
 def register_client_handlers(dp: Dispatcher) -> None:
@@ -84,6 +133,7 @@ def register_client_handlers(dp: Dispatcher) -> None:
     - Команда /start
     - Ввод ФИО
     - Ввод телефона
+    - Выбор психолога (callback)
     - Выбор услуги (callback)
     - Выбор даты (callback)
     - Выбор времени (callback)
@@ -115,7 +165,8 @@ def register_client_handlers(dp: Dispatcher) -> None:
     @dp.message(BookingStates.phone)
     async def get_phone(message: types.Message, state: FSMContext) -> None:
         """
-        Получить номер телефона клиента и перейти к выбору услуги.
+        Получить номер телефона клиента и перейти к выбору психолога
+        или услуги.
         
         Блокирует ввод через кнопки меню, требует ручной ввод.
         """
@@ -124,25 +175,56 @@ def register_client_handlers(dp: Dispatcher) -> None:
             return
         
         await state.update_data(phone=message.text)
-        await message.answer(
-            "🛎 Выберите услугу:",
-            reply_markup=service_keyboard()
-        )
+        await ask_psychologist_or_service(message, state)
+
+    @dp.callback_query(BookingStates.psychologist, BOOKING_PSYCHOLOGIST.filter())
+    async def select_psychologist(
+        callback: types.CallbackQuery,
+        state: FSMContext,
+        callback_data: PsychologistChoice
+    ) -> None:
+        """
+        Обработать выбор психолога и показать выбор услуги.
+        
+        Если психолог за это время перестал принимать, просит начать
+        запись заново.
+        """
+        psychologist = get_psychologist(callback_data.psychologist_id)
+        if psychologist is None:
+            await callback.answer("Психолог больше не принимает записи. Начните заново: /start")
+            return
+        await state.update_data(psychologist_id=psychologist.id)
+        try:
+            await callback.message.edit_text(
+                f"👤 {psychologist.full_name}\n🛎 Выберите услугу:",
+                reply_markup=service_keyboard()
+            )
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
         await state.set_state(BookingStates.service)
 
-    @dp.callback_query(BookingStates.service, F.data.startswith("service_"))
-    async def select_service(callback: types.CallbackQuery, state: FSMContext) -> None:
+    @dp.callback_query(BookingStates.service, BOOKING_SERVICE.filter())
+    async def select_service(
+        callback: types.CallbackQuery,
+        state: FSMContext,
+        callback_data: ServiceChoice
+    ) -> None:
         """
         Обработать выбор услуги и показать доступные даты.
         
-        Загружает список дней с доступными слотами на ближайшие 10 дней.
-        Если свободных дней нет, сообщает об этом и завершает процесс.
+        Загружает список дней, где у выбранного психолога есть время
+        для выбранной услуги (с учётом её продолжительности), на ближайшие
+        10 дней. Если свободных дней нет, сообщает об этом и завершает процесс.
         """
-        service = callback.data.replace("service_", "")
-        await state.update_data(service=service)
+        data = await state.update_data(service=callback_data.code)
         
         # Получаем список доступных дней
-        available_dates = await get_available_days(10)
+        available_dates = await get_available_days(
+            10,
+            service=callback_data.code,
+            psychologist_id=data.get("psychologist_id", DEFAULT_PSYCHOLOGIST_ID)
+        )
         if not available_dates:
             try:
                 await callback.message.edit_text(
@@ -153,16 +235,7 @@ def register_client_handlers(dp: Dispatcher) -> None:
                     raise
             return
         
-        # Создаём клавиатуру с датами
-        kb = InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(
-                    text=label,
-                    callback_data=f"date_{date.strftime('%Y-%m-%d')}"
-                )]
-                for label, date in available_dates
-            ]
-        )
+        kb = dates_keyboard(BOOKING_DATE, available_dates)
         
         try:
             await callback.message.edit_text(
@@ -175,27 +248,27 @@ def register_client_handlers(dp: Dispatcher) -> None:
         
         await state.set_state(BookingStates.date)
 
-    @dp.callback_query(BookingStates.date, F.data.startswith("date_"))
-    async def select_date(callback: types.CallbackQuery, state: FSMContext) -> None:
+    @dp.callback_query(BookingStates.date, BOOKING_DATE.filter())
+    async def select_date(
+        callback: types.CallbackQuery,
+        state: FSMContext,
+        callback_data: DayChoice
+    ) -> None:
         """
         Обработать выбор даты и показать доступные временные слоты.
         
-        Парсит дату из callback_data, загружает свободные слоты на эту дату
-        и предлагает выбрать время.
+        Дату из callback_data декодирует фильтр кодека; загружает свободные
+        слоты на эту дату и предлагает выбрать время.
         """
-        date_str = callback.data.replace("date_", "")
+        chosen_date = callback_data.day
+        data = await state.update_data(date=chosen_date)
         
-        try:
-            chosen_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        except Exception as e:
-            logging.error(f"Ошибка парсинга даты: {e}")
-            await callback.message.answer("Ошибка даты. Попробуйте снова.")
-            return
-        
-        await state.update_data(date=chosen_date)
-        
-        # Получаем свободные слоты на выбранную дату
-        slots = await get_available_slots(chosen_date)
+        # Получаем свободные слоты на выбранную дату для выбранной услуги
+        slots = await get_available_slots(
+            chosen_date,
+            service=data["service"],
+            psychologist_id=data.get("psychologist_id", DEFAULT_PSYCHOLOGIST_ID)
+        )
         if not slots:
             try:
                 await callback.message.edit_text(
@@ -206,13 +279,7 @@ def register_client_handlers(dp: Dispatcher) -> None:
                     raise
             return
         
-        # Создаём клавиатуру с временными слотами
-        kb = InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(text=time, callback_data=f"time_{time}")]
-                for time in slots
-            ]
-        )
+        kb = times_keyboard(BOOKING_TIME, chosen_date, slots)
         
         try:
             await callback.message.edit_text(
@@ -225,23 +292,19 @@ def register_client_handlers(dp: Dispatcher) -> None:
         
         await state.set_state(BookingStates.time)
 
-    @dp.callback_query(BookingStates.time, F.data.startswith("time_"))
-    async def select_time(callback: types.CallbackQuery, state: FSMContext) -> None:
+    @dp.callback_query(BookingStates.time, BOOKING_TIME.filter())
+    async def select_time(
+        callback: types.CallbackQuery,
+        state: FSMContext,
+        callback_data: TimeChoice
+    ) -> None:
         """
         Обработать выбор времени и показать окончательное подтверждение.
         
-        Парсит время, формирует полную дату/время записи и запрашивает
-        финальное подтверждение у клиента.
+        Формирует полную дату/время записи из декодированного времени
+        и запрашивает финальное подтверждение у клиента.
         """
-        time_str = callback.data.replace("time_", "")
-        
-        try:
-            chosen_time = datetime.strptime(time_str, "%H:%M").time()
-        except Exception as e:
-            logging.error(f"Ошибка парсинга времени: {e}")
-            await callback.message.answer("Ошибка времени. Попробуйте снова.")
-            return
-        
+        chosen_time = callback_data.at
         await state.update_data(time=chosen_time)
         data = await state.get_data()
         
@@ -267,13 +330,19 @@ def register_client_handlers(dp: Dispatcher) -> None:
         
         await state.set_state(BookingStates.confirm)
 
-    @dp.callback_query(BookingStates.confirm, F.data == "confirm_yes")
-    async def confirm_booking(callback: types.CallbackQuery, state: FSMContext) -> None:
+    @dp.callback_query(BookingStates.confirm, BOOKING_CONFIRM.filter(accept=True))
+    async def confirm_booking(
+        callback: types.CallbackQuery,
+        state: FSMContext,
+        session: AsyncSession
+    ) -> None:
         """
         Подтвердить запись и сохранить в базу данных.
         
-        Создаёт или обновляет клиента в БД, создаёт запись на приём.
-        Отправляет подтверждение клиенту.
+        Для клиента, найденного на шаге /start, берёт его из кэша
+        и создаёт запись одним INSERT; иначе находит клиента
+        по телефону или создаёт его в той же транзакции, что и запись
+        (book_client_appointment). Отправляет подтверждение клиенту.
         """
         data = await state.get_data()
         
@@ -286,44 +355,73 @@ def register_client_handlers(dp: Dispatcher) -> None:
             )
             return
         
-        # Сохраняем запись в базу данных
-        async for session in get_session():
-            # Ищем или создаём клиента
-            client_q = await session.execute(
-                select(Client).where(
-                    and_(
-                        Client.full_name == data["full_name"],
-                        Client.phone_number == data["phone"]
-                    )
+        # Сохраняем запись в базу данных одной транзакцией
+        psychologist_id = data.get("psychologist_id", DEFAULT_PSYCHOLOGIST_ID)
+        slot_taken = False
+        # Клиент, известный с шага /start, — из кэша
+        client = None
+        if data.get("client_id"):
+            client = await get_client(session, data["client_id"])
+            if client and client.telegram_id != callback.from_user.id:
+                client = None
+        
+        # Занятость слота проверяет БД
+        try:
+            if client:
+                appointment_id = await book_appointment(
+                    session,
+                    client.id,
+                    appointment_dt,
+                    data["service"],
+                    psychologist_id
                 )
-            )
-            client = client_q.scalar()
-            
-            if not client:
-                # Создаём нового клиента
-                client = Client(
-                    full_name=data["full_name"],
-                    phone_number=data["phone"],
-                    telegram_id=callback.from_user.id
+            else:
+                # Клиент находится по телефону или создаётся
+                # в той же транзакции, что и запись
+                appointment_id, client = await book_client_appointment(
+                    session,
+                    data["full_name"],
+                    data["phone"],
+                    appointment_dt,
+                    data["service"],
+                    telegram_id=callback.from_user.id,
+                    psychologist_id=psychologist_id
                 )
-                session.add(client)
-                await session.commit()
-                await session.refresh(client)
-            elif client.telegram_id is None:
-                # Обновляем telegram_id для существующего клиента
-                client.telegram_id = callback.from_user.id
-                await session.commit()
-            
-            # Создаём запись на приём
-            appointment = Appointment(
-                client_id=client.id,
-                date_time=appointment_dt,
-                service=data["service"],
-                status="active",
-                confirmed=None
+            await schedule_appointment_reminders(appointment_id, appointment_dt)
+        except SlotTakenError:
+            slot_taken = True
+        except PhoneTakenError:
+            # Номер уже привязан к другому пользователю Telegram
+            try:
+                await callback.message.edit_text(
+                    "⚠️ Этот номер телефона уже указан другим пользователем. "
+                    "Начните запись заново (/start) и укажите свой номер."
+                )
+            except TelegramBadRequest as e:
+                if "message is not modified" not in str(e):
+                    raise
+            await state.clear()
+            return
+        except BookingBusyError:
+            # Состояние и кнопки подтверждения остаются: можно нажать ещё раз
+            await callback.answer(
+                "⏳ Сервис записи сейчас занят. Нажмите «Подтвердить» ещё раз.",
+                show_alert=True
             )
-            session.add(appointment)
-            await session.commit()
+            return
+        invalidate_dates(appointment_dt.date(), psychologist_id=psychologist_id)
+        
+        if slot_taken:
+            try:
+                await callback.message.edit_text(
+                    "⚠️ Это время уже занято. Начните запись заново "
+                    "и выберите другое время."
+                )
+            except TelegramBadRequest as e:
+                if "message is not modified" not in str(e):
+                    raise
+            await state.clear()
+            return
         
         try:
             await callback.message.edit_text(
@@ -335,7 +433,7 @@ def register_client_handlers(dp: Dispatcher) -> None:
         
         await state.clear()
 
-    @dp.callback_query(BookingStates.confirm, F.data == "confirm_no")
+    @dp.callback_query(BookingStates.confirm, BOOKING_CONFIRM.filter(accept=False))
     async def cancel_booking(callback: types.CallbackQuery, state: FSMContext) -> None:
         """
         Отменить процесс записи на финальном этапе.
@@ -2,22 +2,29 @@
 Обработчики отмены записи клиентом или психологом.
 
 Позволяет клиентам просматривать свои записи и отменять их.
-Психолог может отменять записи с указанием причины для уведомления клиента.
+Психолог может отменять свои записи с указанием причины для уведомления
+клиента.
 Использует FSM для ввода причины отмены психологом.
 """
-import logging
 from datetime import datetime
 
-from aiogram import Dispatcher, types, F, Bot
+from aiogram import Dispatcher, types
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from database.session import get_session
 from database.models import Appointment, Client
-from config import PSYCHOLOGIST_ID
+from keyboards.callbacks import CANCEL_APPOINTMENT, RESCHEDULE_START, AppointmentRef
+from services.psychologists import is_psychologist, psychologist_by_telegram_id
+from services.catalog import service_label
+from services.clients import get_client_by_telegram_id
+from services.slots import invalidate_dates
+from services.scheduler import cancel_appointment_reminders
+from services.outbound import outbound
 
 
 class CancelState(StatesGroup):
@@ -30,17 +37,29 @@ class CancelState(StatesGroup):
     reason = State()
 
 
-# Временное хранилище ID записи для процесса отмены (по пользователю)
-cancel_context = {}
-
-SERVICE_LABELS = {
-    "consult": "Консультация",
-    "intro": "Первая встреча",
-    "supervision": "Супервизия"
-}
+def upcoming_appointments_query(client_id: int, now: datetime) -> Select:
+    """
+    Построить запрос будущих активных записей клиента.
+    
+    Использует индекс ix_appointments_client_date_time.
+    
+    Args:
+        client_id: ID клиента
+        now: Текущий момент
+    
+    Returns:
+        Select: Запрос записей, упорядоченных по времени
+    """
+    return select(Appointment).where(
+        and_(
+            Appointment.client_id == client_id,
+            Appointment.date_time >= now,
+            Appointment.status == "active"
+        )
+    ).order_by(Appointment.date_time)
 
 
-async def my_appointments(message: Message):
+async def my_appointments(message: Message, session: AsyncSession):
     """
     Показать клиенту список его активных записей.
     
@@ -49,6 +68,7 @@ async def my_appointments(message: Message):
     
     Args:
         message: Сообщение от клиента с командой или кнопкой "Мои записи"
+        session: Сессия БД текущего обновления
     """
     if message is None or getattr(message, 'answer', None) is None:
         return
@@ -56,40 +76,35 @@ async def my_appointments(message: Message):
     if user_id is None:
         await message.answer("Ошибка: не удалось определить пользователя.")
         return
-    async for session in get_session():
-        client_q = await session.execute(select(Client).where(Client.telegram_id == user_id))
-        client = client_q.scalar()
-        if not client:
-            await message.answer("❌ Вы ещё не записывались. Я вас не узнаю 🤷‍♂️")
-            return
-        now = datetime.now()
-        query = await session.execute(
-            select(Appointment).where(
-                and_(
-                    Appointment.client_id == client.id,
-                    Appointment.date_time >= now,
-                    Appointment.status == "active"
-                )
-            ).order_by(Appointment.date_time)
-        )
-        appointments = query.scalars().all()
-        if not appointments:
-            await message.answer("📭 У вас нет активных записей.")
-            return
-        text = "📋 Ваши записи:\n\n"
-        kb = InlineKeyboardMarkup(inline_keyboard=[])
-        for a in appointments:
-            dt = a.date_time.strftime("%d.%m.%Y %H:%M")
-            service_code = str(a.service)
-            service_label = SERVICE_LABELS.get(service_code, service_code)
-            text += f"• {dt} — {service_label}\n"
-            kb.inline_keyboard.append([
-                InlineKeyboardButton(text=f"❌ Отменить {dt}", callback_data=f"cancel_{a.id}"),
-                InlineKeyboardButton(text=f"🔁 Перенести {dt}", callback_data=f"reschedule_{a.id}")
-            ])
-        await message.answer(text.strip(), reply_markup=kb)
+    client = await get_client_by_telegram_id(session, user_id)
+    if not client:
+        await message.answer("❌ Вы ещё не записывались. Я вас не узнаю 🤷‍♂️")
+        return
+    now = datetime.now()
+    query = await session.execute(
+        upcoming_appointments_query(client.id, now)
+    )
+    appointments = query.scalars().all()
+    if not appointments:
+        await message.answer("📭 У вас нет активных записей.")
+        return
+    text = "📋 Ваши записи:\n\n"
+    kb = InlineKeyboardMarkup(inline_keyboard=[])
+    for a in appointments:
+        dt = a.date_time.strftime("%d.%m.%Y %H:%M")
+        text += f"• {dt} — {service_label(a.service)}\n"
+        kb.inline_keyboard.append([
+            InlineKeyboardButton(text=f"❌ Отменить {dt}", callback_data=CANCEL_APPOINTMENT.pack(a.id)),
+            InlineKeyboardButton(text=f"🔁 Перенести {dt}", callback_data=RESCHEDULE_START.pack(a.id))
+        ])
+    await message.answer(text.strip(), reply_markup=kb)
 
-async def start_cancel(callback: CallbackQuery, state: FSMContext):
+async def start_cancel(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    callback_data: AppointmentRef
+):
     """
     Начать процесс отмены записи.
     
@@ -99,6 +114,8 @@ async def start_cancel(callback: CallbackQuery, state: FSMContext):
     Args:
         callback: Callback от нажатия кнопки "Отменить"
         state: Контекст состояния FSM
+        session: Сессия БД текущего обновления
+        callback_data: ID отменяемой записи
     """
     if callback is None or getattr(callback.message, 'answer', None) is None:
         return
@@ -106,36 +123,37 @@ async def start_cancel(callback: CallbackQuery, state: FSMContext):
     if user_id is None:
         await callback.message.answer("Ошибка: не удалось определить пользователя.")
         return
-    appointment_id = callback.data.replace("cancel_", "") if callback.data else None
-    if not appointment_id or not appointment_id.isdigit():
-        await callback.message.answer("Ошибка: некорректный ID записи.")
-        return
-    appointment_id = int(appointment_id)
-    cancel_context[user_id] = appointment_id
-    if user_id == PSYCHOLOGIST_ID:
+    appointment_id = callback_data.appointment_id
+    if is_psychologist(user_id):
+        # ID записи хранится в данных FSM и переживает перезапуск бота
+        await state.update_data(cancel_appointment_id=appointment_id)
         await callback.message.answer("💬 Введите причину отмены для клиента:")
         await state.set_state(CancelState.reason)
     else:
-        async for session in get_session():
-            appointment = await session.get(Appointment, appointment_id)
-            if appointment and getattr(appointment, 'status', None) == "active":
-                setattr(appointment, 'status', "cancelled")
-                setattr(appointment, 'confirmed', False)
-                await session.commit()
+        appointment = await session.get(Appointment, appointment_id)
+        if appointment and getattr(appointment, 'status', None) == "active":
+            setattr(appointment, 'status', "cancelled")
+            setattr(appointment, 'confirmed', False)
+            await session.commit()
+            invalidate_dates(
+                appointment.date_time.date(),
+                psychologist_id=appointment.psychologist_id
+            )
+            await cancel_appointment_reminders(appointment_id)
         if getattr(callback.message, 'edit_text', None):
             await callback.message.edit_text("❌ Запись успешно отменена.")
 
-async def receive_cancel_reason(message: Message, state: FSMContext, bot: Bot):
+async def receive_cancel_reason(message: Message, state: FSMContext, session: AsyncSession):
     """
     Получить причину отмены от психолога и уведомить клиента.
     
     Сохраняет статус отмены в БД, отправляет клиенту уведомление
-    с указанной причиной.
+    с указанной причиной через очередь исходящих сообщений.
     
     Args:
         message: Сообщение с текстом причины отмены
         state: Контекст состояния FSM
-        bot: Экземпляр бота для отправки уведомления клиенту
+        session: Сессия БД текущего обновления
     """
     if message is None or getattr(message, 'answer', None) is None:
         return
@@ -146,37 +164,46 @@ async def receive_cancel_reason(message: Message, state: FSMContext, bot: Bot):
         await message.answer("Ошибка: не удалось определить пользователя.")
         await state.clear()
         return
-    appointment_id = cancel_context.get(user_id)
+    data = await state.get_data()
+    appointment_id = data.get("cancel_appointment_id")
     if not appointment_id:
         await message.answer("❌ Не удалось найти запись.")
         await state.clear()
         return
-    async for session in get_session():
-        appointment = await session.get(Appointment, appointment_id)
-        client = await session.get(Client, appointment.client_id) if appointment else None
-        if not appointment or not client:
-            await message.answer("❌ Ошибка при получении данных.")
-            await state.clear()
-            return
-        setattr(appointment, 'status', "cancelled")
-        setattr(appointment, 'confirmed', False)
-        await session.commit()
-        client_telegram_id = getattr(client, 'telegram_id', None)
-        if client_telegram_id is not None and isinstance(client_telegram_id, int):
-            try:
-                await bot.send_message(
-                    chat_id=client_telegram_id,
-                    text=(
-                        f"❌ Ваша запись <b>{appointment.service}</b> на {appointment.date_time.strftime('%d.%m.%Y %H:%M')} отменена.\n\n"
-                        f"💬 Причина: {reason}"
-                    ),
-                    parse_mode="HTML"
-                )
-            except Exception as e:
-                logging.error(f"Ошибка при отправке уведомления клиенту: {e}")
-        await message.answer("✅ Запись отменена. Клиент уведомлён.")
-        cancel_context.pop(user_id, None)
+    appointment = await session.get(
+        Appointment,
+        appointment_id,
+        options=[joinedload(Appointment.client)]
+    )
+    client = appointment.client if appointment else None
+    psychologist = psychologist_by_telegram_id(user_id)
+    if psychologist is None or (appointment and appointment.psychologist_id != psychologist.id):
+        # Психолог отменяет только свои записи
+        appointment = None
+    if not appointment or not client:
+        await message.answer("❌ Ошибка при получении данных.")
         await state.clear()
+        return
+    setattr(appointment, 'status', "cancelled")
+    setattr(appointment, 'confirmed', False)
+    await session.commit()
+    invalidate_dates(
+        appointment.date_time.date(),
+        psychologist_id=appointment.psychologist_id
+    )
+    await cancel_appointment_reminders(appointment_id)
+    client_telegram_id = getattr(client, 'telegram_id', None)
+    if client_telegram_id is not None and isinstance(client_telegram_id, int):
+        outbound.enqueue(
+            client_telegram_id,
+            (
+                f"❌ Ваша запись <b>{service_label(appointment.service)}</b> на {appointment.date_time.strftime('%d.%m.%Y %H:%M')} отменена.\n\n"
+                f"💬 Причина: {reason}"
+            ),
+            parse_mode="HTML"
+        )
+    await message.answer("✅ Запись отменена. Клиент уведомлён.")
+    await state.clear()
 
 def register_cancel_handlers(dp: Dispatcher):
     """
@@ -186,5 +213,5 @@ def register_cancel_handlers(dp: Dispatcher):
         dp: Диспетчер aiogram для регистрации обработчиков
     """
     dp.message.register(my_appointments, Command("my"))
-    dp.callback_query.register(start_cancel, F.data.startswith("cancel_"))
+    dp.callback_query.register(start_cancel, CANCEL_APPOINTMENT.filter())
     dp.message.register(receive_cancel_reason, CancelState.reason)
@@ -2,16 +2,21 @@
 Обработчики подтверждения записей через inline-кнопки.
 
 Обрабатывает ответы клиентов на напоминания (подтверждение или отказ от записи).
-Уведомляет психолога о решении клиента.
+Уведомляет психолога, к которому запись, о решении клиента.
 """
 import logging
 
-from aiogram import Dispatcher, types, F
-from sqlalchemy import select
+from aiogram import Dispatcher, types
+from aiogram.filters import or_f
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from database.session import get_session
-from database.models import Appointment, Client
-from config import PSYCHOLOGIST_ID
+from database.models import Appointment
+from keyboards.callbacks import REMINDER_ANSWER, LegacyReminderAnswerFilter, ReminderAnswer
+from services.scheduler import cancel_appointment_reminders
+from services.outbound import outbound
+from services.psychologists import psychologist_telegram_id
+from services.clients import get_client, peek_client_by_telegram_id, remember_client
 
 
 def register_reminder_handlers(dp: Dispatcher) -> None:
@@ -23,43 +28,51 @@ def register_reminder_handlers(dp: Dispatcher) -> None:
     Args:
         dp: Диспетчер aiogram для регистрации обработчиков
     """
-    @dp.callback_query(F.data.startswith("confirm_"))
-    async def handle_confirmation(callback: types.CallbackQuery) -> None:
+    @dp.callback_query(or_f(REMINDER_ANSWER.filter(), LegacyReminderAnswerFilter()))
+    async def handle_confirmation(
+        callback: types.CallbackQuery,
+        session: AsyncSession,
+        callback_data: ReminderAnswer
+    ) -> None:
         """
         Обработать ответ клиента на напоминание.
         
-        Парсит callback_data, обновляет статус подтверждения записи в БД,
-        отправляет уведомление психологу о решении клиента.
+        Обновляет статус подтверждения записи в БД по декодированному
+        ответу, отправляет уведомление психологу записи о решении клиента.
+        Данные клиента для уведомления берутся из кэша клиентов; при
+        промахе клиент загружается вместе с записью.
         """
         try:
-            if not callback.data:
-                await callback.message.answer("Ошибка: некорректные данные.")
+            appointment_id = callback_data.appointment_id
+            accepted = callback_data.accept
+            client = peek_client_by_telegram_id(callback.from_user.id)
+            appointment = await session.get(
+                Appointment,
+                appointment_id,
+                options=[] if client else [joinedload(Appointment.client)]
+            )
+            if not appointment or appointment.confirmed is not None:
+                await callback.message.edit_text("✅ Ответ уже получен.")
                 return
-            parts = callback.data.split("_")  # confirm_{appointment_id}_{yes/no}
-            if len(parts) < 3 or not parts[1].isdigit():
-                await callback.message.answer("Ошибка: некорректные данные.")
-                return
-            appointment_id = int(parts[1])
-            decision = parts[2]
-            async for session in get_session():
-                appointment = await session.get(Appointment, appointment_id)
-                if not appointment or appointment.confirmed is not None:
-                    await callback.message.edit_text("✅ Ответ уже получен.")
-                    return
-                appointment.confirmed = True if decision == "yes" else False
-                await session.commit()
-                client = await session.get(Client, appointment.client_id)
-                if decision == "yes":
-                    await callback.message.edit_text("👍 Спасибо, приём подтверждён!")
-                else:
-                    await callback.message.edit_text("🚫 Запись отменена.")
-                psych_text = (
-                    f"🧍 Клиент: {getattr(client, 'full_name', '-') if client else '-'}\n"
-                    f"📞 Телефон: {getattr(client, 'phone_number', '-') if client else '-'}\n"
-                    f"📅 Дата: {appointment.date_time.strftime('%d.%m.%Y %H:%M')}\n"
-                    f"📌 Статус: {'подтвердил запись' if decision == 'yes' else 'отменил запись'}"
-                )
-                await callback.bot.send_message(PSYCHOLOGIST_ID, psych_text)
+            appointment.confirmed = accepted
+            await session.commit()
+            # Клиент ответил — оставшиеся напоминания больше не нужны
+            await cancel_appointment_reminders(appointment_id)
+            if client is None:
+                client = remember_client(appointment.client) if appointment.client else None
+            elif client.id != appointment.client_id:
+                client = await get_client(session, appointment.client_id)
+            if accepted:
+                await callback.message.edit_text("👍 Спасибо, приём подтверждён!")
+            else:
+                await callback.message.edit_text("🚫 Запись отменена.")
+            psych_text = (
+                f"🧍 Клиент: {getattr(client, 'full_name', '-') if client else '-'}\n"
+                f"📞 Телефон: {getattr(client, 'phone_number', '-') if client else '-'}\n"
+                f"📅 Дата: {appointment.date_time.strftime('%d.%m.%Y %H:%M')}\n"
+                f"📌 Статус: {'подтвердил запись' if accepted else 'отменил запись'}"
+            )
+            outbound.enqueue(psychologist_telegram_id(appointment.psychologist_id), psych_text)
         except Exception as e:
             logging.error(f"Ошибка при обработке ответа: {e}")
             await callback.message.answer(f"Ошибка при обработке ответа: {str(e)}")
@@ -4,38 +4,72 @@
 Позволяет клиентам переносить существующие записи на новую дату и время.
 Использует FSM для пошагового выбора новой даты и времени.
 """
-import logging
 from datetime import datetime
 
-from aiogram import Dispatcher, types, F
+from aiogram import Dispatcher, types
 from aiogram.fsm.context import FSMContext
 from aiogram.exceptions import TelegramBadRequest
-from sqlalchemy import select
-
-from database.session import get_session
-from database.models import Appointment
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import DEFAULT_PSYCHOLOGIST_ID, Appointment
 from states.client_states import BookingStates
-from services.slots import get_available_days, get_available_slots
+from keyboards.inline import dates_keyboard, times_keyboard
+from keyboards.callbacks import (
+    RESCHEDULE_DATE,
+    RESCHEDULE_START,
+    RESCHEDULE_TIME,
+    AppointmentRef,
+    DayChoice,
+    TimeChoice
+)
+from services.booking import reschedule_appointment, BookingBusyError, SlotTakenError
+from services.catalog import DEFAULT_SERVICE
+from services.scheduler import schedule_appointment_reminders
+from services.slots import (
+    get_available_days,
+    get_available_slots,
+    invalidate_dates
+)
 
 
-async def reschedule_start(callback: types.CallbackQuery, state: FSMContext) -> None:
+async def reschedule_start(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    callback_data: AppointmentRef
+) -> None:
     """
     Начать процесс переноса записи.
     
-    Сохраняет ID записи и показывает доступные даты для переноса.
+    Сохраняет ID записи и показывает даты, когда у психолога записи
+    есть время для переноса.
     
     Args:
         callback: Callback от нажатия кнопки "Перенести"
         state: Контекст состояния FSM
+        session: Сессия БД текущего обновления
+        callback_data: ID переносимой записи
     """
-    appointment_id = callback.data.replace("reschedule_", "") if callback.data else None
-    if not appointment_id or not appointment_id.isdigit():
-        await callback.message.answer("Ошибка: некорректный ID записи.")
+    appointment_id = callback_data.appointment_id
+    appointment = await session.get(Appointment, appointment_id)
+    if not appointment or appointment.status != "active":
+        try:
+            await callback.message.edit_text("⚠️ Запись недействительна для переноса.")
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
         return
-    appointment_id = int(appointment_id)
     await state.set_state(BookingStates.reschedule)
-    await state.update_data(old_appointment_id=appointment_id)
-    available_dates = await get_available_days(10)
+    await state.update_data(
+        old_appointment_id=appointment_id,
+        old_date=appointment.date_time.date(),
+        service=appointment.service,
+        psychologist_id=appointment.psychologist_id
+    )
+    available_dates = await get_available_days(
+        10,
+        service=appointment.service,
+        psychologist_id=appointment.psychologist_id
+    )
     if not available_dates:
         try:
             await callback.message.edit_text("🗓 Нет доступных дат для переноса.")
@@ -43,38 +77,29 @@ async def reschedule_start(callback: types.CallbackQuery, state: FSMContext) ->
             if "message is not modified" not in str(e):
                 raise
         return
-    kb = types.InlineKeyboardMarkup(
-        inline_keyboard=[
-            [types.InlineKeyboardButton(text=label, callback_data=f"resched_date_{date.strftime('%Y-%m-%d')}")]
-            for label, date in available_dates
-        ]
-    )
+    kb = dates_keyboard(RESCHEDULE_DATE, available_dates)
     try:
         await callback.message.edit_text("📅 Выберите новую дату:", reply_markup=kb)
     except TelegramBadRequest as e:
         if "message is not modified" not in str(e):
             raise
 
-async def reschedule_date(callback: types.CallbackQuery, state: FSMContext) -> None:
+async def reschedule_date(callback: types.CallbackQuery, state: FSMContext, callback_data: DayChoice) -> None:
     """
     Обработать выбор новой даты и показать доступные слоты.
     
     Args:
         callback: Callback с выбранной датой
         state: Контекст состояния FSM
+        callback_data: Выбранная дата
     """
-    date_str = callback.data.replace("resched_date_", "") if callback.data else None
-    if not date_str:
-        await callback.message.answer("Ошибка: некорректная дата.")
-        return
-    try:
-        new_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-    except Exception as e:
-        logging.error(f"Ошибка парсинга даты: {e}")
-        await callback.message.answer("Ошибка даты. Попробуйте снова.")
-        return
-    await state.update_data(new_date=new_date)
-    slots = await get_available_slots(new_date)
+    new_date = callback_data.day
+    data = await state.update_data(new_date=new_date)
+    slots = await get_available_slots(
+        new_date,
+        service=data.get("service", DEFAULT_SERVICE),
+        psychologist_id=data.get("psychologist_id", DEFAULT_PSYCHOLOGIST_ID)
+    )
     if not slots:
         try:
             await callback.message.edit_text("⚠️ Нет доступного времени на эту дату.")
@@ -82,19 +107,19 @@ async def reschedule_date(callback: types.CallbackQuery, state: FSMContext) -> N
             if "message is not modified" not in str(e):
                 raise
         return
-    kb = types.InlineKeyboardMarkup(
-        inline_keyboard=[
-            [types.InlineKeyboardButton(text=time, callback_data=f"resched_time_{time}")]
-            for time in slots
-        ]
-    )
+    kb = times_keyboard(RESCHEDULE_TIME, new_date, slots)
     try:
         await callback.message.edit_text("⏰ Выберите новое время:", reply_markup=kb)
     except TelegramBadRequest as e:
         if "message is not modified" not in str(e):
             raise
 
-async def reschedule_time(callback: types.CallbackQuery, state: FSMContext) -> None:
+async def reschedule_time(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    callback_data: TimeChoice
+) -> None:
     """
     Обработать выбор нового времени и сохранить перенос.
     
@@ -103,44 +128,50 @@ async def reschedule_time(callback: types.CallbackQuery, state: FSMContext) -> N
     Args:
         callback: Callback с выбранным временем
         state: Контекст состояния FSM
+        session: Сессия БД текущего обновления
+        callback_data: Выбранное время
     """
-    time_str = callback.data.replace("resched_time_", "") if callback.data else None
-    if not time_str:
-        await callback.message.answer("Ошибка: некорректное время.")
-        return
-    try:
-        new_time = datetime.strptime(time_str, "%H:%M").time()
-    except Exception as e:
-        logging.error(f"Ошибка парсинга времени: {e}")
-        await callback.message.answer("Ошибка времени. Попробуйте снова.")
-        return
+    new_time = callback_data.at
     data = await state.get_data()
     if "new_date" not in data or "old_appointment_id" not in data:
         await callback.message.answer("Ошибка: не выбрана дата или запись.")
         return
     new_dt = datetime.combine(data["new_date"], new_time)
-    async for session in get_session():
-        query = await session.execute(
-            select(Appointment).where(Appointment.id == data["old_appointment_id"])
+    moved = False
+    slot_taken = False
+    try:
+        moved = await reschedule_appointment(
+            session,
+            data["old_appointment_id"],
+            new_dt,
+            data.get("service", DEFAULT_SERVICE)
+        )
+    except SlotTakenError:
+        slot_taken = True
+    except BookingBusyError:
+        # Клавиатура времени и состояние остаются: можно выбрать ещё раз
+        await callback.answer(
+            "⏳ Сервис записи сейчас занят. Выберите время ещё раз.",
+            show_alert=True
         )
-        appointment = query.scalar()
-        if appointment and getattr(appointment, 'status', None) == "active":
-            setattr(appointment, 'date_time', new_dt)
-            setattr(appointment, 'confirmed', None)
-            await session.commit()
-            try:
-                await callback.message.edit_text(
-                    f"✅ Запись перенесена на {new_dt.strftime('%d.%m.%Y %H:%M')}."
-                )
-            except TelegramBadRequest as e:
-                if "message is not modified" not in str(e):
-                    raise
-        else:
-            try:
-                await callback.message.edit_text("⚠️ Запись недействительна для переноса.")
-            except TelegramBadRequest as e:
-                if "message is not modified" not in str(e):
-                    raise
+        return
+    invalidate_dates(
+        data.get("old_date", new_dt.date()),
+        new_dt.date(),
+        psychologist_id=data.get("psychologist_id", DEFAULT_PSYCHOLOGIST_ID)
+    )
+    if moved:
+        await schedule_appointment_reminders(data["old_appointment_id"], new_dt)
+        text = f"✅ Запись перенесена на {new_dt.strftime('%d.%m.%Y %H:%M')}."
+    elif slot_taken:
+        text = "⚠️ Это время уже занято. Попробуйте перенести запись ещё раз."
+    else:
+        text = "⚠️ Запись недействительна для переноса."
+    try:
+        await callback.message.edit_text(text)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
     await state.clear()
 
 def register_reschedule_handlers(dp: Dispatcher) -> None:
@@ -150,6 +181,6 @@ def register_reschedule_handlers(dp: Dispatcher) -> None:
     Args:
         dp: Диспетчер aiogram для регистрации обработчиков
     """
-    dp.callback_query.register(reschedule_start, F.data.startswith("reschedule_"))
-    dp.callback_query.register(reschedule_date, F.data.startswith("resched_date_"), BookingStates.reschedule)
-    dp.callback_query.register(reschedule_time, F.data.startswith("resched_time_"), BookingStates.reschedule)
+    dp.callback_query.register(reschedule_start, RESCHEDULE_START.filter())
+    dp.callback_query.register(reschedule_date, RESCHEDULE_DATE.filter(), BookingStates.reschedule)
+    dp.callback_query.register(reschedule_time, RESCHEDULE_TIME.filter(), BookingStates.reschedule)
@@ -10,32 +10,34 @@ from datetime import datetime
 from aiogram import Dispatcher, types, F
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from config import PSYCHOLOGIST_ID
+from services.psychologists import is_psychologist, psychologist_by_telegram_id
 from keyboards.reply import schedule_main_keyboard
 from states.psychologist_states import ManualBookingStates
-from services.slots import get_available_slots
-from database.session import get_session
-from database.models import Client, Appointment
+from keyboards.callbacks import MANUAL_TIME, TimeChoice
+from keyboards.inline import times_keyboard
+from services.slots import get_available_slots, invalidate_dates
+from database.models import DEFAULT_PSYCHOLOGIST_ID
+from services.booking import (
+    BookingBusyError,
+    ClientNameMismatchError,
+    SlotTakenError,
+    book_client_appointment
+)
+from services.catalog import DEFAULT_SERVICE
+from services.scheduler import schedule_appointment_reminders
+from services.outbound import outbound
 from handlers.psychologist.records import choose_records_filter
 from handlers.psychologist.schedule import view_schedule
 from handlers.psychologist.work_hours import edit_work_schedule
-from aiogram.fsm.context import FSMContext
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from datetime import datetime
-from states.psychologist_states import ManualBookingStates
-from services.slots import get_available_slots
-from database.session import get_session
-from database.models import Client, Appointment
-from sqlalchemy import select
+
 
 async def open_psychologist_menu(message: types.Message) -> None:
     """
     Открыть главное меню психолога.
     
-    Проверяет права доступа (только для PSYCHOLOGIST_ID).
+    Проверяет права доступа (только для психологов из справочника).
     
     Args:
         message: Сообщение с командой /psych
@@ -43,7 +45,7 @@ async def open_psychologist_menu(message: types.Message) -> None:
     if not message or not getattr(message, 'from_user', None) or getattr(message.from_user, 'id', 0) == 0:
         logging.error("Пустое сообщение или не определён пользователь.")
         return
-    if getattr(message.from_user, 'id', 0) != PSYCHOLOGIST_ID:
+    if not is_psychologist(getattr(message.from_user, 'id', 0)):
         await message.answer("🚫 Доступ запрещён. Это меню только для психолога.")
         return
     await message.answer("📋 Меню психолога:", reply_markup=schedule_main_keyboard())
@@ -60,7 +62,7 @@ async def view_free_slots(message: types.Message, state: FSMContext) -> None:
     if not message or not getattr(message, 'from_user', None) or getattr(message.from_user, 'id', 0) == 0:
         logging.error("Пустое сообщение или не определён пользователь.")
         return
-    if getattr(message.from_user, 'id', 0) != PSYCHOLOGIST_ID:
+    if not is_psychologist(getattr(message.from_user, 'id', 0)):
         await message.answer("🚫 Доступ запрещён. Это меню только для психолога.")
         return
     await message.answer("📅 Введите дату (ДД.ММ.ГГГГ):")
@@ -77,40 +79,27 @@ async def manual_date(message: types.Message, state: FSMContext) -> None:
             await message.answer("❌ Не получен текст сообщения. Попробуйте снова.")
             return
         selected = datetime.strptime(date_text.strip(), "%d.%m.%Y").date()
-        slots = await get_available_slots(selected)
+        psychologist = psychologist_by_telegram_id(message.from_user.id)
+        if psychologist is None:
+            await state.clear()
+            return
+        slots = await get_available_slots(selected, psychologist_id=psychologist.id)
         if not slots:
             await message.answer("❌ Нет свободных слотов на эту дату. Попробуйте другую дату.")
             return
-        kb = InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(text=time, callback_data=f"manual_time_{time}")] for time in slots
-            ]
-        )
-        await state.update_data(date=selected)
+        kb = times_keyboard(MANUAL_TIME, selected, slots)
+        await state.update_data(date=selected, psychologist_id=psychologist.id)
         await message.answer("⏰ Выберите время:", reply_markup=kb)
         await state.set_state(ManualBookingStates.time)
     except Exception as e:
         logging.error(f"Ошибка парсинга даты: {e}")
         await message.answer("❌ Неверный формат. Попробуйте ДД.ММ.ГГГГ.")
 
-async def manual_time(callback: types.CallbackQuery, state: FSMContext) -> None:
+async def manual_time(callback: types.CallbackQuery, state: FSMContext, callback_data: TimeChoice) -> None:
     """Получить время, запросить ФИО клиента."""
-    if not callback or not getattr(callback, 'data', None) or not getattr(callback, 'message', None) or not getattr(callback.message, 'answer', None):
-        return
-    time_data = callback.data
-    if not time_data:
-        if getattr(callback, 'message', None) and getattr(callback.message, 'answer', None):
-            await callback.message.answer("Ошибка: не получены данные слота.")
-        return
-    time_str = time_data.replace("manual_time_", "")
-    try:
-        chosen_time = datetime.strptime(time_str, "%H:%M").time()
-    except Exception as e:
-        logging.error(f"Ошибка парсинга времени: {e}")
-        if getattr(callback, 'message', None) and getattr(callback.message, 'answer', None):
-            await callback.message.answer("Ошибка времени. Попробуйте снова.")
+    if not callback or not getattr(callback, 'message', None) or not getattr(callback.message, 'answer', None):
         return
-    await state.update_data(time=chosen_time)
+    await state.update_data(time=callback_data.at)
     if getattr(callback, 'message', None) and getattr(callback.message, 'answer', None):
         await callback.message.answer("👤 Введите ФИО клиента:")
     await state.set_state(ManualBookingStates.full_name)
@@ -144,7 +133,7 @@ async def manual_phone(message: types.Message, state: FSMContext) -> None:
     await message.answer("Напишите 'Да' для подтверждения или 'Нет' для отмены.")
     await state.set_state(ManualBookingStates.confirm)
 
-async def manual_confirm(message: types.Message, state: FSMContext) -> None:
+async def manual_confirm(message: types.Message, state: FSMContext, session: AsyncSession) -> None:
     """Создать запись, если подтверждено. Отправить уведомление клиенту, если есть telegram_id."""
     if not message or not getattr(message, 'text', None):
         await message.answer("❌ Не получен ответ. Попробуйте снова.")
@@ -161,58 +150,61 @@ async def manual_confirm(message: types.Message, state: FSMContext) -> None:
         return
     data = await state.get_data()
     appointment_dt = datetime.combine(data["date"], data["time"])
-    client = None
-    async for session in get_session():
-        client_q = await session.execute(
-            select(Client).where(
-                Client.full_name == data["full_name"],
-                Client.phone_number == data["phone"]
-            )
+    psychologist_id = data.get("psychologist_id", DEFAULT_PSYCHOLOGIST_ID)
+    try:
+        # Клиент находится по телефону или создаётся в той же
+        # транзакции, что и запись; клиент с тем же телефоном, но другим
+        # ФИО без подтверждения психолога не присваивается
+        appointment_id, client = await book_client_appointment(
+            session,
+            data["full_name"],
+            data["phone"],
+            appointment_dt,
+            DEFAULT_SERVICE,
+            psychologist_id=psychologist_id,
+            check_name=True
         )
-        client = client_q.scalar()
-        if not client:
-            client = Client(
-                full_name=data["full_name"],
-                phone_number=data["phone"]
-            )
-            session.add(client)
-            await session.commit()
-            await session.refresh(client)
-        appointment = Appointment(
-            client_id=client.id,
-            date_time=appointment_dt,
-            service="consult",
-            status="active",
-            confirmed=None
+    except ClientNameMismatchError as e:
+        # Повторное «Да» записывает уже известного клиента под его ФИО
+        await state.update_data(full_name=e.client.full_name)
+        await message.answer(
+            f"⚠️ Телефон {e.client.phone_number} уже записан за клиентом "
+            f"«{e.client.full_name}», а не «{data['full_name']}».\n"
+            f"Напишите 'Да', чтобы записать этого клиента, или 'Нет' для отмены."
         )
-        session.add(appointment)
-        await session.commit()
+        return
+    except SlotTakenError:
+        invalidate_dates(appointment_dt.date(), psychologist_id=psychologist_id)
+        await message.answer("⚠️ Это время уже занято. Выберите другое время.")
+        await state.clear()
+        return
+    except BookingBusyError:
+        await message.answer("⏳ База данных занята. Напишите 'Да' ещё раз.")
+        return
+    invalidate_dates(appointment_dt.date(), psychologist_id=psychologist_id)
+    await schedule_appointment_reminders(appointment_id, appointment_dt)
     await message.answer("✅ Запись добавлена! Клиенту будет отправлено напоминание.")
     # Отправить уведомление клиенту, если есть telegram_id
-    if client and getattr(client, 'telegram_id', None):
-        try:
-            notify_text = (
-                f"Вы записаны на приём к психологу\n"
-                f"Дата: <b>{appointment_dt.strftime('%d.%m.%Y')}</b>\n"
-                f"Время: <b>{appointment_dt.strftime('%H:%M')}</b>\n"
-                f"Если вы не записывались — проигнорируйте это сообщение."
-            )
-            telegram_id = int(getattr(client, 'telegram_id'))
-            await message.bot.send_message(telegram_id, notify_text, parse_mode="HTML")
-        except Exception as e:
-            logging.error(f"Ошибка при отправке уведомления клиенту: {e}")
+    if client.telegram_id:
+        notify_text = (
+            f"Вы записаны на приём к психологу\n"
+            f"Дата: <b>{appointment_dt.strftime('%d.%m.%Y')}</b>\n"
+            f"Время: <b>{appointment_dt.strftime('%H:%M')}</b>\n"
+            f"Если вы не записывались — проигнорируйте это сообщение."
+        )
+        outbound.enqueue(client.telegram_id, notify_text, parse_mode="HTML")
     await state.clear()
 
 def register_psychologist_menu(dp: Dispatcher) -> None:
     """Регистрация хэндлеров меню психолога."""
     dp.message.register(open_psychologist_menu, Command("psych"))
-    dp.message.register(back_to_psychologist_menu, F.text == "🔙 Назад", lambda msg: getattr(getattr(msg, 'from_user', None), 'id', 0) == PSYCHOLOGIST_ID)
+    dp.message.register(back_to_psychologist_menu, F.text == "🔙 Назад", lambda msg: is_psychologist(getattr(getattr(msg, 'from_user', None), 'id', 0)))
     dp.message.register(choose_records_filter, F.text == "📋 Показать записи")
     dp.message.register(view_schedule, F.text == "📆 Расписание")
     dp.message.register(edit_work_schedule, F.text == "🗰 Редактировать рабочее расписание")
     dp.message.register(view_free_slots, F.text == "🔎 Посмотреть свободные слоты")
     dp.message.register(manual_date, ManualBookingStates.date)
-    dp.callback_query.register(manual_time, F.data.startswith("manual_time_"), ManualBookingStates.time)
+    dp.callback_query.register(manual_time, MANUAL_TIME.filter(), ManualBookingStates.time)
     dp.message.register(manual_full_name, ManualBookingStates.full_name)
     dp.message.register(manual_phone, ManualBookingStates.phone)
     dp.message.register(manual_confirm, ManualBookingStates.confirm)
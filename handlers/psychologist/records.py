@@ -1,28 +1,55 @@
 """
 Обработчики просмотра записей психолога.
 
-Позволяет психологу фильтровать и просматривать записи по различным периодам:
-сегодня, завтра, неделя, произвольная дата.
+Позволяет психологу фильтровать и просматривать свои записи по различным
+периодам: сегодня, завтра, неделя, произвольная дата.
+
+Записи периода выводятся одним сообщением, разбитым на страницы: кнопки
+«◀️»/«▶️» заменяют текст того же сообщения (edit_text), поэтому число
+запросов к Telegram API не зависит от количества записей.
 """
 import logging
 from datetime import datetime, timedelta, date
+from typing import Tuple
 
 from aiogram import Dispatcher, types, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
+from sqlalchemy import func, select, Select
+from sqlalchemy.orm import aliased, joinedload
 
-from database.models import Appointment, Client
+from database.models import Appointment
 from database.session import get_session
 from states.psychologist_states import DateQueryState
-from config import PSYCHOLOGIST_ID
+from services.psychologists import is_psychologist, psychologist_by_telegram_id
 from keyboards.reply import schedule_main_keyboard
+from keyboards.callbacks import CANCEL_APPOINTMENT, RECORDS_PAGE, RecordsPage
+from services.catalog import service_label
+
+# Записей на одной странице списка
+RECORDS_PAGE_SIZE = 8
+
 
-SERVICE_LABELS = {
-    "consult": "Консультация",
-    "intro": "Первая встреча",
-    "supervision": "Супервизия"
-}
+def appointments_between_query(start: date, end: date, psychologist_id: int) -> Select:
+    """
+    Построить запрос записей психолога с даты start по дату end включительно.
+    
+    Использует индекс ix_appointments_tenant_date_time_status.
+    
+    Args:
+        start: Первая дата периода
+        end: Последняя дата периода
+        psychologist_id: ID психолога
+    
+    Returns:
+        Select: Запрос записей, упорядоченных по времени
+    """
+    return select(Appointment).where(
+        Appointment.psychologist_id == psychologist_id,
+        Appointment.date_time >= datetime.combine(start, datetime.min.time()),
+        Appointment.date_time <= datetime.combine(end, datetime.max.time())
+    ).order_by(Appointment.date_time)
 
 
 async def choose_records_filter(message: Message) -> None:
@@ -34,7 +61,7 @@ async def choose_records_filter(message: Message) -> None:
     Args:
         message: Сообщение с кнопкой "Показать записи"
     """
-    if not message or not getattr(message, 'from_user', None) or getattr(message.from_user, 'id', None) != PSYCHOLOGIST_ID:
+    if not message or not getattr(message, 'from_user', None) or not is_psychologist(getattr(message.from_user, 'id', None)):
         return
     kb = InlineKeyboardMarkup(
         inline_keyboard=[
@@ -49,109 +76,219 @@ async def choose_records_filter(message: Message) -> None:
 
 async def records_back(callback: CallbackQuery) -> None:
     """Обработка возврата к меню психолога."""
-    if not callback or not getattr(callback, 'from_user', None) or getattr(callback.from_user, 'id', None) != PSYCHOLOGIST_ID:
+    if not callback or not getattr(callback, 'from_user', None) or not is_psychologist(getattr(callback.from_user, 'id', None)):
         return
     await callback.message.delete()
     await callback.message.answer("↩️ Вы вернулись в меню психолога.", reply_markup=schedule_main_keyboard())
 
+def records_page_query(
+    start: date,
+    end: date,
+    now: datetime,
+    page: int,
+    psychologist_id: int
+) -> Select:
+    """
+    Построить запрос одной страницы актуальных записей периода.
+    
+    Вместе с каждой записью возвращается общее число записей периода
+    (оконная функция), а клиент записи присоединяется через связь
+    Appointment.client, поэтому страница, счётчик страниц и данные
+    клиентов получаются одним запросом.
+    
+    Args:
+        start: Первая дата периода
+        end: Последняя дата периода
+        now: Текущее время (прошедшие записи не показываются)
+        page: Номер страницы, начиная с 0
+        psychologist_id: ID психолога
+    
+    Returns:
+        Select: Запрос строк (Appointment, total)
+    """
+    period = appointments_between_query(start, end, psychologist_id).where(
+        Appointment.status.in_(["active", "confirmed"]),
+        Appointment.date_time >= now
+    ).subquery()
+    record = aliased(Appointment, period)
+    return (
+        select(record, func.count().over().label("total"))
+        .options(joinedload(record.client))
+        .order_by(record.date_time)
+        .limit(RECORDS_PAGE_SIZE)
+        .offset(page * RECORDS_PAGE_SIZE)
+    )
+
+
+def records_period(view: str) -> Tuple[date, date, str]:
+    """
+    Определить период просмотра записей по его коду.
+    
+    Args:
+        view: 'today', 'tomorrow', 'week' или дата в формате ГГГГ-ММ-ДД
+    
+    Returns:
+        Tuple[date, date, str]: Первая и последняя дата периода и заголовок
+    
+    Raises:
+        ValueError: Если код периода некорректен
+    """
+    today = datetime.now().date()
+    if view == "today":
+        return today, today, f"на сегодня ({today.strftime('%d.%m.%Y')})"
+    if view == "tomorrow":
+        tomorrow = today + timedelta(days=1)
+        return tomorrow, tomorrow, f"на завтра ({tomorrow.strftime('%d.%m.%Y')})"
+    if view == "week":
+        return today, today + timedelta(days=6), "на неделю"
+    selected = date.fromisoformat(view)
+    return selected, selected, f"на {selected.strftime('%d.%m.%Y')}"
+
+
+async def render_records_page(
+    view: str,
+    page: int,
+    psychologist_id: int
+) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Сформировать одну страницу списка записей психолога.
+    
+    Текст содержит записи страницы, сгруппированные по датам; клавиатура —
+    кнопку отмены для каждой записи и переключатели страниц.
+    
+    Args:
+        view: Код периода (см. records_period)
+        page: Номер страницы, начиная с 0
+        psychologist_id: ID психолога
+    
+    Returns:
+        Tuple[str, InlineKeyboardMarkup]: Текст сообщения и клавиатура
+    """
+    start, end, title = records_period(view)
+    now = datetime.now()
+    rows = []
+    async for session in get_session():
+        query = await session.execute(records_page_query(start, end, now, page, psychologist_id))
+        rows = query.all()
+        if not rows and page > 0:
+            # Страница опустела (например, после отмены) — показываем первую
+            page = 0
+            query = await session.execute(records_page_query(start, end, now, page, psychologist_id))
+            rows = query.all()
+        lines = []
+        buttons = []
+        last_day = None
+        for a, _ in rows:
+            client = a.client
+            name = getattr(client, 'full_name', 'Неизвестный') if client else 'Неизвестный'
+            phone = getattr(client, "phone_number", "—")
+            day = a.date_time.date()
+            if day != last_day:
+                if lines:
+                    lines.append("")
+                lines.append(f"📅 <b>{day.strftime('%d.%m.%Y')}</b>")
+                last_day = day
+            time = a.date_time.strftime('%H:%M')
+            lines.append(f"• {time} — {name} ({phone}) — {service_label(a.service)}")
+            label = time if start == end else f"{day.strftime('%d.%m')} {time}"
+            buttons.append(InlineKeyboardButton(
+                text=f"❌ Отменить {label}",
+                callback_data=CANCEL_APPOINTMENT.pack(a.id)
+            ))
+    
+    kb = InlineKeyboardMarkup(inline_keyboard=[])
+    if not rows:
+        kb.inline_keyboard.append([
+            InlineKeyboardButton(text="🔙 Назад", callback_data="records_back")
+        ])
+        return f"📭 Нет актуальных записей {title}.", kb
+    
+    total = rows[0][1]
+    pages = (total + RECORDS_PAGE_SIZE - 1) // RECORDS_PAGE_SIZE
+    for i in range(0, len(buttons), 2):
+        kb.inline_keyboard.append(buttons[i:i + 2])
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton(
+            text="◀️",
+            callback_data=RECORDS_PAGE.pack(view, page - 1)
+        ))
+    if pages > 1:
+        nav.append(InlineKeyboardButton(
+            text=f"{page + 1}/{pages}",
+            callback_data=RECORDS_PAGE.pack(view, page)
+        ))
+    if page + 1 < pages:
+        nav.append(InlineKeyboardButton(
+            text="▶️",
+            callback_data=RECORDS_PAGE.pack(view, page + 1)
+        ))
+    if nav:
+        kb.inline_keyboard.append(nav)
+    kb.inline_keyboard.append([
+        InlineKeyboardButton(text="🔙 Назад", callback_data="records_back")
+    ])
+    header = f"📋 <b>Записи {title}</b> — {total}"
+    return header + "\n\n" + "\n".join(lines), kb
+
+
+async def show_records_page(callback: CallbackQuery, view: str, page: int = 0) -> None:
+    """
+    Показать страницу записей, заменив текст сообщения с кнопками.
+    
+    Args:
+        callback: Callback от кнопки периода или переключателя страниц
+        view: Код периода
+        page: Номер страницы
+    """
+    psychologist = psychologist_by_telegram_id(callback.from_user.id)
+    text, kb = await render_records_page(view, page, psychologist.id)
+    try:
+        await callback.message.edit_text(text, reply_markup=kb, parse_mode="HTML")
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer()
+
 async def show_today(callback: CallbackQuery) -> None:
     """Показать записи на сегодня (только для психолога)."""
-    if not callback or not getattr(callback, 'from_user', None) or getattr(callback.from_user, 'id', None) != PSYCHOLOGIST_ID:
+    if not callback or not getattr(callback, 'from_user', None) or not is_psychologist(getattr(callback.from_user, 'id', None)):
         return
-    await callback.message.delete()
-    await show_grouped_appointments(callback.message, datetime.now().date())
+    await show_records_page(callback, "today")
 
 async def show_records_tomorrow(callback: CallbackQuery) -> None:
     """Показать записи на завтра (только для психолога)."""
-    if not callback or not getattr(callback, 'from_user', None) or getattr(callback.from_user, 'id', None) != PSYCHOLOGIST_ID:
+    if not callback or not getattr(callback, 'from_user', None) or not is_psychologist(getattr(callback.from_user, 'id', None)):
         return
-    await callback.message.delete()
-    tomorrow = datetime.now().date() + timedelta(days=1)
-    now = datetime.now()
-    async for session in get_session():
-        query = await session.execute(
-            select(Appointment).where(
-                Appointment.date_time >= datetime.combine(tomorrow, datetime.min.time()),
-                Appointment.date_time <= datetime.combine(tomorrow, datetime.max.time())
-            ).order_by(Appointment.date_time)
-        )
-        appointments = query.scalars().all()
-        filtered = [
-            a for a in appointments
-            if a.status in ["active", "confirmed"] and a.date_time >= now
-        ]
-        if not filtered:
-            await callback.message.answer("📭 На завтра нет активных записей.")
-            return
-        for a in filtered:
-            client = await session.get(Client, a.client_id)
-            name = getattr(client, 'full_name', 'Неизвестный') if client else 'Неизвестный'
-            phone = getattr(client, "phone_number", "—")
-            time = a.date_time.strftime('%H:%M')
-            date_str = tomorrow.strftime('%d.%m.%Y')
-            service_code = str(a.service)
-            service_label = SERVICE_LABELS.get(service_code, service_code)
-            text = f"📅 <b>{date_str}</b>\n• {time} — {name} ({phone}) — {service_label}"
-            kb = InlineKeyboardMarkup(
-                inline_keyboard=[[InlineKeyboardButton(
-                    text=f"❌ Отменить {time}",
-                    callback_data=f"cancel_{a.id}"
-                )]]
-            )
-            await callback.message.answer(text, reply_markup=kb, parse_mode="HTML")
+    await show_records_page(callback, "tomorrow")
 
 async def show_week_grouped(callback: CallbackQuery) -> None:
     """Показать записи на неделю (только для психолога)."""
-    if not callback or not getattr(callback, 'from_user', None) or getattr(callback.from_user, 'id', None) != PSYCHOLOGIST_ID:
+    if not callback or not getattr(callback, 'from_user', None) or not is_psychologist(getattr(callback.from_user, 'id', None)):
         return
-    await callback.message.delete()
-    today = datetime.now().date()
-    now = datetime.now()
-    async for session in get_session():
-        has_records = False
-        for i in range(7):
-            date_ = today + timedelta(days=i)
-            query = await session.execute(
-                select(Appointment).where(
-                    Appointment.date_time >= datetime.combine(date_, datetime.min.time()),
-                    Appointment.date_time <= datetime.combine(date_, datetime.max.time())
-                ).order_by(Appointment.date_time)
-            )
-            appointments = query.scalars().all()
-            for a in appointments:
-                if a.status not in ["confirmed", "active"]:
-                    continue
-                if a.date_time < now:
-                    continue
-                client = await session.get(Client, a.client_id)
-                name = getattr(client, 'full_name', 'Неизвестный') if client else 'Неизвестный'
-                phone = getattr(client, "phone_number", "—")
-                time = a.date_time.strftime('%H:%M')
-                date_str = date_.strftime('%d.%m.%Y')
-                service_code = str(a.service)
-                service_label = SERVICE_LABELS.get(service_code, service_code)
-                text = f"📅 <b>{date_str}</b>\n• {time} — {name} ({phone}) — {service_label}"
-                kb = InlineKeyboardMarkup(
-                    inline_keyboard=[[InlineKeyboardButton(
-                        text=f"❌ Отменить {time}",
-                        callback_data=f"cancel_{a.id}"
-                    )]]
-                )
-                await callback.message.answer(text, reply_markup=kb, parse_mode="HTML")
-                has_records = True
-        if not has_records:
-            await callback.message.answer("📭 На этой неделе нет активных записей.")
+    await show_records_page(callback, "week")
+
+async def switch_records_page(callback: CallbackQuery, callback_data: RecordsPage) -> None:
+    """Переключить страницу списка записей (только для психолога)."""
+    if not callback or not getattr(callback, 'from_user', None) or not is_psychologist(getattr(callback.from_user, 'id', None)):
+        return
+    try:
+        records_period(callback_data.view)
+    except ValueError:
+        await callback.answer("Некорректная страница.")
+        return
+    await show_records_page(callback, callback_data.view, callback_data.page)
 
 async def start_date_query(callback: CallbackQuery, state: FSMContext) -> None:
     """Старт FSM для выбора даты (только для психолога)."""
-    if not callback or not getattr(callback, 'from_user', None) or getattr(callback.from_user, 'id', None) != PSYCHOLOGIST_ID:
+    if not callback or not getattr(callback, 'from_user', None) or not is_psychologist(getattr(callback.from_user, 'id', None)):
         return
     await callback.message.edit_text("📅 Введите дату (ДД.ММ.ГГГГ):")
     await state.set_state(DateQueryState.date)
 
 async def receive_date(message: Message, state: FSMContext) -> None:
     """Получить дату от психолога и показать записи на эту дату."""
-    if not message or not getattr(message, 'from_user', None) or getattr(message.from_user, 'id', None) != PSYCHOLOGIST_ID:
+    if not message or not getattr(message, 'from_user', None) or not is_psychologist(getattr(message.from_user, 'id', None)):
         return
     try:
         selected = datetime.strptime(message.text.strip(), "%d.%m.%Y").date()
@@ -163,37 +300,9 @@ async def receive_date(message: Message, state: FSMContext) -> None:
 
 async def show_grouped_appointments(message: Message, date_: date) -> None:
     """Показать записи на выбранную дату (только для психолога)."""
-    async for session in get_session():
-        query = await session.execute(
-            select(Appointment).where(
-                Appointment.date_time >= datetime.combine(date_, datetime.min.time()),
-                Appointment.date_time <= datetime.combine(date_, datetime.max.time())
-            ).order_by(Appointment.date_time)
-        )
-        appointments = query.scalars().all()
-        now = datetime.now()
-        found = False
-        for a in appointments:
-            if a.status not in ["confirmed", "active"]:
-                continue
-            if a.date_time < now:
-                continue
-            client = await session.get(Client, a.client_id)
-            name = getattr(client, 'full_name', 'Неизвестный') if client else 'Неизвестный'
-            phone = getattr(client, "phone_number", "—")
-            time = a.date_time.strftime('%H:%M')
-            service_code = str(a.service)
-            service_label = SERVICE_LABELS.get(service_code, service_code)
-            line = f"• {time} — {name} ({phone}) — {service_label}"
-            kb = InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [InlineKeyboardButton(text=f"❌ Отменить {time}", callback_data=f"cancel_{a.id}")]
-                ]
-            )
-            await message.answer(line, reply_markup=kb)
-            found = True
-        if not found:
-            await message.answer(f"📭 Нет актуальных записей на {date_.strftime('%d.%m.%Y')}")
+    psychologist = psychologist_by_telegram_id(message.from_user.id)
+    text, kb = await render_records_page(date_.isoformat(), 0, psychologist.id)
+    await message.answer(text, reply_markup=kb, parse_mode="HTML")
 
 def register_records_handlers(dp: Dispatcher) -> None:
     """Регистрация хэндлеров для работы с записями психолога."""
@@ -203,4 +312,5 @@ def register_records_handlers(dp: Dispatcher) -> None:
     dp.callback_query.register(show_week_grouped, F.data == "records_week")
     dp.callback_query.register(start_date_query, F.data == "records_date")
     dp.callback_query.register(records_back, F.data == "records_back")
+    dp.callback_query.register(switch_records_page, RECORDS_PAGE.filter())
     dp.message.register(receive_date, DateQueryState.date)
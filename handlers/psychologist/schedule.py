@@ -11,16 +11,18 @@ from aiogram import Dispatcher, types, F
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.session import get_session
 from database.models import WorkSchedule, UnavailableSlot
 from states.psychologist_states import ScheduleStates
 from keyboards.reply import schedule_main_keyboard
 from utils.decorators import psychologist_only
+from services.slots import invalidate_range
+from services.psychologists import psychologist_by_telegram_id
 
 
 @psychologist_only
-async def view_schedule(message: types.Message) -> None:
+async def view_schedule(message: types.Message, session: AsyncSession) -> None:
     """
     Показать текущее рабочее расписание психолога.
     
@@ -28,20 +30,25 @@ async def view_schedule(message: types.Message) -> None:
     
     Args:
         message: Сообщение с командой /schedule
+        session: Сессия БД текущего обновления
     """
-    async for session in get_session():
-        query = await session.execute(select(WorkSchedule))
-        slots = query.scalars().all()
-        if not slots:
-            await message.answer("📭 Расписание пусто. Рабочих часов не найдено.")
-            return
-        text = "🗓 Текущее расписание:\n\n"
-        for slot in slots:
-            weekday = slot.weekday
-            start = slot.start_time.strftime("%H:%M")
-            end = slot.end_time.strftime("%H:%M")
-            text += f"• День: {weekday} — {start} до {end}\n"
-        await message.answer(text)
+    psychologist = psychologist_by_telegram_id(message.from_user.id)
+    query = await session.execute(
+        select(WorkSchedule)
+        .where(WorkSchedule.psychologist_id == psychologist.id)
+        .order_by(WorkSchedule.weekday)
+    )
+    slots = query.scalars().all()
+    if not slots:
+        await message.answer("📭 Расписание пусто. Рабочих часов не найдено.")
+        return
+    text = "🗓 Текущее расписание:\n\n"
+    for slot in slots:
+        weekday = slot.weekday
+        start = slot.start_time.strftime("%H:%M")
+        end = slot.end_time.strftime("%H:%M")
+        text += f"• День: {weekday} — {start} до {end}\n"
+    await message.answer(text)
 
 @psychologist_only
 async def choose_date(message: types.Message, state: FSMContext) -> None:
@@ -74,21 +81,23 @@ async def get_start_time(message: types.Message, state: FSMContext) -> None:
         await message.answer("❌ Некорректное время. Используйте формат ЧЧ:ММ.")
 
 @psychologist_only
-async def get_end_time(message: types.Message, state: FSMContext) -> None:
+async def get_end_time(message: types.Message, state: FSMContext, session: AsyncSession) -> None:
     """Получить время окончания недоступности и сохранить слот."""
     try:
         end = datetime.strptime(message.text.strip(), "%H:%M").time()
         data = await state.get_data()
         start_dt = datetime.combine(data["date"], data["start"])
         end_dt = datetime.combine(data["date"], end)
-        async for session in get_session():
-            slot = UnavailableSlot(
-                date_time_start=start_dt,
-                date_time_end=end_dt,
-                reason="Ручное закрытие"
-            )
-            session.add(slot)
-            await session.commit()
+        psychologist = psychologist_by_telegram_id(message.from_user.id)
+        slot = UnavailableSlot(
+            psychologist_id=psychologist.id,
+            date_time_start=start_dt,
+            date_time_end=end_dt,
+            reason="Ручное закрытие"
+        )
+        session.add(slot)
+        await session.commit()
+        invalidate_range(start_dt, end_dt, psychologist_id=psychologist.id)
         await message.answer("✅ Слот закрыт для записи.")
         await state.clear()
     except Exception as e:
@@ -0,0 +1,121 @@
+"""
+Обработчики управления составом психологов.
+
+Владелец бота (PSYCHOLOGIST_ID) добавляет психологов по Telegram ID
+и отключает их. У каждого психолога своё рабочее расписание, закрытые
+слоты и записи; клиенты выбирают психолога при записи. Отключённый
+психолог перестаёт получать новые записи и теряет доступ к меню
+психолога, его записи остаются в базе.
+"""
+from aiogram import Dispatcher, types
+from aiogram.filters import Command, CommandObject
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import DEFAULT_PSYCHOLOGIST_ID, Psychologist
+from services.psychologists import is_owner, list_psychologists, refresh_psychologists
+
+USAGE_ADD = "Использование: /add_psychologist <Telegram ID> <Имя>"
+USAGE_REMOVE = "Использование: /remove_psychologist <ID психолога>"
+
+
+async def show_team(message: types.Message) -> None:
+    """
+    Показать активных психологов (только для владельца бота).
+    
+    Args:
+        message: Сообщение с командой /team
+    """
+    if not is_owner(getattr(message.from_user, 'id', None)):
+        await message.answer("🚫 Доступ запрещён. Только владелец бота управляет психологами.")
+        return
+    lines = [
+        f"• {p.id}. {p.full_name} (Telegram ID {p.telegram_id})"
+        for p in list_psychologists()
+    ]
+    await message.answer(
+        "👥 Психологи:\n\n" + "\n".join(lines) + f"\n\n{USAGE_ADD}\n{USAGE_REMOVE}"
+    )
+
+
+async def add_psychologist(
+    message: types.Message,
+    session: AsyncSession,
+    command: CommandObject
+) -> None:
+    """
+    Добавить психолога или снова включить отключённого.
+    
+    Args:
+        message: Сообщение с командой /add_psychologist
+        session: Сессия БД текущего обновления
+        command: Аргументы команды: Telegram ID и имя
+    """
+    if not is_owner(getattr(message.from_user, 'id', None)):
+        await message.answer("🚫 Доступ запрещён. Только владелец бота управляет психологами.")
+        return
+    parts = (command.args or "").split(maxsplit=1)
+    if len(parts) != 2 or not parts[0].isdigit():
+        await message.answer(USAGE_ADD)
+        return
+    telegram_id, full_name = int(parts[0]), parts[1].strip()[:128]
+    if is_owner(telegram_id):
+        await message.answer("ℹ️ Владелец бота уже психолог.")
+        return
+    query = await session.execute(
+        select(Psychologist).where(Psychologist.telegram_id == telegram_id)
+    )
+    psychologist = query.scalar()
+    if psychologist:
+        psychologist.full_name = full_name
+        psychologist.is_active = True
+    else:
+        psychologist = Psychologist(telegram_id=telegram_id, full_name=full_name)
+        session.add(psychologist)
+    await session.commit()
+    await refresh_psychologists()
+    await message.answer(
+        f"✅ Психолог {full_name} добавлен (ID {psychologist.id}). "
+        "Ему нужно задать рабочее расписание в меню /psych."
+    )
+
+
+async def remove_psychologist(
+    message: types.Message,
+    session: AsyncSession,
+    command: CommandObject
+) -> None:
+    """
+    Отключить психолога: он больше не принимает новые записи.
+    
+    Args:
+        message: Сообщение с командой /remove_psychologist
+        session: Сессия БД текущего обновления
+        command: Аргумент команды: ID психолога
+    """
+    if not is_owner(getattr(message.from_user, 'id', None)):
+        await message.answer("🚫 Доступ запрещён. Только владелец бота управляет психологами.")
+        return
+    arg = (command.args or "").strip()
+    if not arg.isdigit():
+        await message.answer(USAGE_REMOVE)
+        return
+    psychologist_id = int(arg)
+    if psychologist_id == DEFAULT_PSYCHOLOGIST_ID:
+        await message.answer("❌ Владельца бота отключить нельзя.")
+        return
+    psychologist = await session.get(Psychologist, psychologist_id)
+    if not psychologist or not psychologist.is_active:
+        await message.answer("❌ Психолог не найден.")
+        return
+    psychologist.is_active = False
+    await session.commit()
+    await refresh_psychologists()
+    await message.answer(f"✅ Психолог {psychologist.full_name} отключён.")
+
+
+def register_team_handlers(dp: Dispatcher) -> None:
+    """Регистрация хэндлеров управления составом психологов."""
+    dp.message.register(show_team, Command("team"))
+    dp.message.register(add_psychologist, Command("add_psychologist"))
+    dp.message.register(remove_psychologist, Command("remove_psychologist"))
@@ -11,12 +11,16 @@ from aiogram import Dispatcher, types, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from states.psychologist_states import WorkScheduleStates
 from keyboards.reply import weekdays_keyboard, schedule_main_keyboard
-from database.session import get_session
+from keyboards.callbacks import DELETE_WORK_DAY, WeekdayRef
 from database.models import WorkSchedule
 from utils.decorators import psychologist_only
+from services.slots import invalidate_all
+from services.work_schedule import refresh_schedule_snapshot
+from services.psychologists import psychologist_by_telegram_id
 
 WEEKDAYS = {
     "Понедельник": 0,
@@ -44,7 +48,7 @@ def get_day_label(index: int) -> str:
 
 
 @psychologist_only
-async def edit_work_schedule(message: Message, state: FSMContext) -> None:
+async def edit_work_schedule(message: Message, state: FSMContext, session: AsyncSession) -> None:
     """
     Показать текущее расписание с возможностью редактирования.
     
@@ -53,27 +57,30 @@ async def edit_work_schedule(message: Message, state: FSMContext) -> None:
     Args:
         message: Сообщение с кнопкой "Редактировать рабочее расписание"
         state: Контекст состояния FSM
+        session: Сессия БД текущего обновления
     """
-    async for session in get_session():
-        query = await session.execute(select(WorkSchedule))
-        slots = sorted(query.scalars().all(), key=lambda s: s.weekday)
-        msg = "📅 <b>Ваше рабочее расписание:</b>\n"
-        if slots:
-            msg += "\n".join([
-                f"• <b>{get_day_label(s.weekday)}</b>: {s.start_time.strftime('%H:%M')} — {s.end_time.strftime('%H:%M')}"
-                for s in slots
-            ])
-        else:
-            msg += "📭 Пока ничего не задано."
-        kb = types.InlineKeyboardMarkup(
-            inline_keyboard=[
-                                [types.InlineKeyboardButton(text="➕ Добавить / Изменить", callback_data="add_schedule")]
-                            ] + [
-                                [types.InlineKeyboardButton(text=f"🗑 Удалить {get_day_label(s.weekday)}", callback_data=f"delete_{s.weekday}")]
-                                for s in slots
-                            ]
-        )
-        await message.answer(msg, parse_mode="HTML", reply_markup=kb)
+    psychologist = psychologist_by_telegram_id(message.from_user.id)
+    query = await session.execute(
+        select(WorkSchedule).where(WorkSchedule.psychologist_id == psychologist.id)
+    )
+    slots = sorted(query.scalars().all(), key=lambda s: s.weekday)
+    msg = "📅 <b>Ваше рабочее расписание:</b>\n"
+    if slots:
+        msg += "\n".join([
+            f"• <b>{get_day_label(s.weekday)}</b>: {s.start_time.strftime('%H:%M')} — {s.end_time.strftime('%H:%M')}"
+            for s in slots
+        ])
+    else:
+        msg += "📭 Пока ничего не задано."
+    kb = types.InlineKeyboardMarkup(
+        inline_keyboard=[
+                            [types.InlineKeyboardButton(text="➕ Добавить / Изменить", callback_data="add_schedule")]
+                        ] + [
+                            [types.InlineKeyboardButton(text=f"🗑 Удалить {get_day_label(s.weekday)}", callback_data=DELETE_WORK_DAY.pack(s.weekday))]
+                            for s in slots
+                        ]
+    )
+    await message.answer(msg, parse_mode="HTML", reply_markup=kb)
 
 @psychologist_only
 async def start_schedule_fsm(callback: CallbackQuery, state: FSMContext) -> None:
@@ -105,30 +112,39 @@ async def get_start_time(message: Message, state: FSMContext) -> None:
         await message.answer("❌ Неверный формат времени. Попробуйте HH:MM.")
 
 @psychologist_only
-async def get_end_time(message: Message, state: FSMContext) -> None:
+async def get_end_time(message: Message, state: FSMContext, session: AsyncSession) -> None:
     """Получить время окончания работы и сохранить расписание."""
     try:
         end = datetime.strptime(message.text.strip(), "%H:%M").time()
         data = await state.get_data()
-        async for session in get_session():
-            query = await session.execute(
-                select(WorkSchedule).where(WorkSchedule.weekday == data["day"])
+        psychologist = psychologist_by_telegram_id(message.from_user.id)
+        query = await session.execute(
+            select(WorkSchedule).where(
+                WorkSchedule.psychologist_id == psychologist.id,
+                WorkSchedule.weekday == data["day"]
             )
-            existing = query.scalar()
-            if existing:
-                await session.execute(
-                    update(WorkSchedule)
-                    .where(WorkSchedule.weekday == data["day"])
-                    .values(start_time=data["start"], end_time=end)
-                )
-            else:
-                slot = WorkSchedule(
-                    weekday=data["day"],
-                    start_time=data["start"],
-                    end_time=end
+        )
+        existing = query.scalar()
+        if existing:
+            await session.execute(
+                update(WorkSchedule)
+                .where(
+                    WorkSchedule.psychologist_id == psychologist.id,
+                    WorkSchedule.weekday == data["day"]
                 )
-                session.add(slot)
-            await session.commit()
+                .values(start_time=data["start"], end_time=end)
+            )
+        else:
+            slot = WorkSchedule(
+                psychologist_id=psychologist.id,
+                weekday=data["day"],
+                start_time=data["start"],
+                end_time=end
+            )
+            session.add(slot)
+        await session.commit()
+        await refresh_schedule_snapshot(psychologist.id)
+        invalidate_all(psychologist.id)
         await message.answer(
             f"✅ Добавлено: {data['day_label']} — с {data['start'].strftime('%H:%M')} до {end.strftime('%H:%M')}"
         )
@@ -144,15 +160,19 @@ async def cancel_schedule_fsm(message: Message, state: FSMContext) -> None:
     await message.answer("↩️ Вы вернулись в меню психолога.", reply_markup=schedule_main_keyboard())
 
 @psychologist_only
-async def delete_schedule(callback: CallbackQuery) -> None:
+async def delete_schedule(callback: CallbackQuery, session: AsyncSession, callback_data: WeekdayRef) -> None:
     """Удалить рабочий день из расписания."""
-    day_index = int(callback.data.replace("delete_", "")) if callback.data else None
-    if day_index is None:
-        await callback.message.answer("Ошибка: некорректный день.")
-        return
-    async for session in get_session():
-        await session.execute(delete(WorkSchedule).where(WorkSchedule.weekday == day_index))
-        await session.commit()
+    day_index = callback_data.weekday
+    psychologist = psychologist_by_telegram_id(callback.from_user.id)
+    await session.execute(
+        delete(WorkSchedule).where(
+            WorkSchedule.psychologist_id == psychologist.id,
+            WorkSchedule.weekday == day_index
+        )
+    )
+    await session.commit()
+    await refresh_schedule_snapshot(psychologist.id)
+    invalidate_all(psychologist.id)
     await callback.message.edit_text(f"❌ Расписание для <b>{get_day_label(day_index)}</b> удалено.", parse_mode="HTML")
 
 def register_work_hours_handlers(dp: Dispatcher) -> None:
@@ -163,4 +183,4 @@ def register_work_hours_handlers(dp: Dispatcher) -> None:
     dp.message.register(get_start_time, WorkScheduleStates.start_time)
     dp.message.register(get_end_time, WorkScheduleStates.end_time)
     dp.message.register(cancel_schedule_fsm, F.text == "🔙 Назад")
-    dp.callback_query.register(delete_schedule, F.data.startswith("delete_"))
+    dp.callback_query.register(delete_schedule, DELETE_WORK_DAY.filter())
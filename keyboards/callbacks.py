@@ -0,0 +1,292 @@
+"""
+Типизированные данные inline-кнопок (callback_data).
+
+Каждый вид кнопки описывается кодеком CallbackCodec: уникальный короткий
+префикс и NamedTuple с полями. Данные упаковываются компактно:
+префикс и поля разделяются двоеточием, числа (ID, номера страниц)
+записываются в base36, дата — числом дней от DATE_EPOCH в base36,
+время — числом минут от полуночи в base36. Например, выбор даты
+2025-11-05 — «bd:1nb» вместо «date_2025-11-05».
+
+Префикс отделён от полей двоеточием, поэтому префиксы разных кодеков
+не могут совпасть частично (как «confirm_yes» записи и «confirm_{id}_yes»
+напоминания раньше). Фильтр кодека (codec.filter()) проверяет префикс,
+один раз декодирует данные и передаёт результат обработчику
+в параметре callback_data.
+"""
+import re
+from datetime import date, time
+from typing import Any, Callable, Dict, Generic, NamedTuple, Tuple, Type, TypeVar, Union
+
+from aiogram.filters import Filter
+from aiogram.types import CallbackQuery
+
+# Ограничение Telegram на длину callback_data, байт
+MAX_CALLBACK_DATA = 64
+SEPARATOR = ":"
+DATE_EPOCH = date(2020, 1, 1).toordinal()
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+P = TypeVar("P", bound=tuple)
+
+_prefixes: Dict[str, "CallbackCodec"] = {}
+
+
+def to_base36(value: int) -> str:
+    """
+    Записать неотрицательное целое в base36.
+    
+    Args:
+        value: Число
+    
+    Returns:
+        str: Запись числа в base36
+    
+    Raises:
+        ValueError: Если число отрицательное
+    """
+    if value < 0:
+        raise ValueError(f"Отрицательное значение в callback_data: {value}")
+    if value < 36:
+        return _DIGITS[value]
+    digits = []
+    while value:
+        value, rest = divmod(value, 36)
+        digits.append(_DIGITS[rest])
+    return "".join(reversed(digits))
+
+
+def _encode_time(value: Union[time, str]) -> str:
+    """Время (или строка ЧЧ:ММ слота) — минуты от полуночи в base36."""
+    if isinstance(value, str):
+        return to_base36(int(value[:2]) * 60 + int(value[3:5]))
+    return to_base36(value.hour * 60 + value.minute)
+
+
+def _decode_time(value: str) -> time:
+    """Минуты от полуночи в base36 — время."""
+    hour, minute = divmod(int(value, 36), 60)
+    return time(hour, minute)
+
+
+def _encode_str(value: str) -> str:
+    """Строка без разделителя."""
+    if SEPARATOR in value:
+        raise ValueError(f"Разделитель в значении callback_data: {value}")
+    return value
+
+
+# Кодирование и декодирование полей по типу аннотации NamedTuple
+_ENCODERS: Dict[type, Tuple[Callable[[Any], str], Callable[[str], Any]]] = {
+    int: (to_base36, lambda value: int(value, 36)),
+    bool: (lambda value: "1" if value else "0", lambda value: value == "1"),
+    str: (_encode_str, str),
+    date: (
+        lambda value: to_base36(value.toordinal() - DATE_EPOCH),
+        lambda value: date.fromordinal(int(value, 36) + DATE_EPOCH)
+    ),
+    time: (_encode_time, _decode_time),
+}
+
+
+class CallbackCodec(Generic[P]):
+    """
+    Кодек данных одного вида inline-кнопок.
+    
+    Attributes:
+        prefix (str): Уникальный префикс
+        payload (Type[P]): NamedTuple с полями данных
+    """
+
+    def __init__(self, prefix: str, payload: Type[P]) -> None:
+        """
+        Args:
+            prefix: Уникальный префикс без разделителя
+            payload: NamedTuple; поддерживаются поля int, bool, str, date, time
+        
+        Raises:
+            ValueError: Если префикс уже занят или содержит разделитель
+            TypeError: Если тип поля не поддерживается
+        """
+        if SEPARATOR in prefix or prefix in _prefixes:
+            raise ValueError(f"Недопустимый или занятый префикс callback_data: {prefix}")
+        self.prefix = prefix
+        self.payload = payload
+        self._head = prefix + SEPARATOR
+        self._encoders = []
+        self._decoders = []
+        for name, kind in payload.__annotations__.items():
+            if kind not in _ENCODERS:
+                raise TypeError(f"Неподдерживаемый тип поля {name}: {kind}")
+            encode, decode = _ENCODERS[kind]
+            self._encoders.append(encode)
+            self._decoders.append(decode)
+        _prefixes[prefix] = self
+
+    def pack(self, *values: Any) -> str:
+        """
+        Упаковать значения полей в callback_data.
+        
+        Args:
+            *values: Значения полей в порядке NamedTuple
+        
+        Returns:
+            str: Строка callback_data
+        
+        Raises:
+            ValueError: Если результат длиннее MAX_CALLBACK_DATA байт
+        
+        Example:
+            >>> BOOKING_DATE.pack(date(2025, 11, 5))
+            'bd:1nb'
+        """
+        data = self._head + SEPARATOR.join(
+            encode(value) for encode, value in zip(self._encoders, values)
+        )
+        if len(data.encode()) > MAX_CALLBACK_DATA:
+            raise ValueError(f"callback_data длиннее {MAX_CALLBACK_DATA} байт: {data}")
+        return data
+
+    def matches(self, data: str) -> bool:
+        """Относятся ли данные к этому кодеку."""
+        return data.startswith(self._head)
+
+    def unpack(self, data: str) -> P:
+        """
+        Декодировать callback_data.
+        
+        Args:
+            data: Строка callback_data этого кодека
+        
+        Returns:
+            P: Значения полей
+        
+        Raises:
+            ValueError: Если данные не относятся к кодеку или повреждены
+        """
+        if not data.startswith(self._head):
+            raise ValueError(f"callback_data другого вида: {data}")
+        parts = data[len(self._head):].split(SEPARATOR)
+        if len(parts) != len(self._decoders):
+            raise ValueError(f"Неверное число полей в callback_data: {data}")
+        return self.payload(*[decode(part) for decode, part in zip(self._decoders, parts)])
+
+    def filter(self, **expected: Any) -> "CallbackCodecFilter":
+        """
+        Фильтр обработчика: данные этого вида с заданными значениями полей.
+        
+        Args:
+            **expected: Значения полей, которым должны соответствовать данные
+        """
+        return CallbackCodecFilter(self, expected)
+
+
+def registered_prefixes() -> Tuple[str, ...]:
+    """Префиксы всех объявленных кодеков."""
+    return tuple(_prefixes)
+
+
+class CallbackCodecFilter(Filter):
+    """Фильтр callback-запросов по кодеку с передачей декодированных данных."""
+
+    def __init__(self, codec: CallbackCodec, expected: Dict[str, Any]) -> None:
+        self.codec = codec
+        self.expected = expected
+
+    async def __call__(self, callback: CallbackQuery) -> Union[bool, Dict[str, Any]]:
+        data = callback.data
+        if not data or not self.codec.matches(data):
+            return False
+        try:
+            payload = self.codec.unpack(data)
+        except ValueError:
+            return False
+        for name, value in self.expected.items():
+            if getattr(payload, name) != value:
+                return False
+        return {"callback_data": payload}
+
+
+class PsychologistChoice(NamedTuple):
+    """Выбор психолога."""
+    psychologist_id: int
+
+
+class ServiceChoice(NamedTuple):
+    """Выбор услуги."""
+    code: str
+
+
+class DayChoice(NamedTuple):
+    """Выбор даты."""
+    day: date
+
+
+class TimeChoice(NamedTuple):
+    """Выбор времени."""
+    at: time
+
+
+class Decision(NamedTuple):
+    """Подтверждение или отказ."""
+    accept: bool
+
+
+class AppointmentRef(NamedTuple):
+    """Действие с записью."""
+    appointment_id: int
+
+
+class ReminderAnswer(NamedTuple):
+    """Ответ клиента на напоминание."""
+    appointment_id: int
+    accept: bool
+
+
+class RecordsPage(NamedTuple):
+    """Страница списка записей психолога."""
+    view: str
+    page: int
+
+
+class WeekdayRef(NamedTuple):
+    """День недели рабочего расписания."""
+    weekday: int
+
+
+# Запись клиента
+BOOKING_PSYCHOLOGIST = CallbackCodec("bp", PsychologistChoice)
+BOOKING_SERVICE = CallbackCodec("bs", ServiceChoice)
+BOOKING_DATE = CallbackCodec("bd", DayChoice)
+BOOKING_TIME = CallbackCodec("bt", TimeChoice)
+BOOKING_CONFIRM = CallbackCodec("bc", Decision)
+# Ответ на напоминание
+REMINDER_ANSWER = CallbackCodec("ra", ReminderAnswer)
+
+
+class LegacyReminderAnswerFilter(Filter):
+    """
+    Ответ на напоминание в прежнем формате «confirm_{id}_yes|no».
+    
+    Напоминания, отправленные до перехода на кодек, остаются в чатах
+    клиентов; их кнопки декодируются в тот же ReminderAnswer.
+    """
+    
+    pattern = re.compile(r"^confirm_(\d+)_(yes|no)$")
+
+    async def __call__(self, callback: CallbackQuery) -> Union[bool, Dict[str, Any]]:
+        match = self.pattern.match(callback.data or "")
+        if not match:
+            return False
+        return {"callback_data": ReminderAnswer(int(match.group(1)), match.group(2) == "yes")}
+
+
+# Отмена и перенос записи
+CANCEL_APPOINTMENT = CallbackCodec("ca", AppointmentRef)
+RESCHEDULE_START = CallbackCodec("rs", AppointmentRef)
+RESCHEDULE_DATE = CallbackCodec("rd", DayChoice)
+RESCHEDULE_TIME = CallbackCodec("rt", TimeChoice)
+# Функции психолога
+MANUAL_TIME = CallbackCodec("mt", TimeChoice)
+RECORDS_PAGE = CallbackCodec("rp", RecordsPage)
+DELETE_WORK_DAY = CallbackCodec("wd", WeekdayRef)
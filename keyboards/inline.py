@@ -3,52 +3,177 @@ Inline-клавиатуры для интерактивного взаимоде
 
 Содержит функции для создания inline-клавиатур, которые отображаются
 под сообщениями бота и позволяют пользователю выбирать опции.
+
+Статические клавиатуры (выбор услуги, подтверждение) строятся один раз
+при импорте, и функции возвращают один и тот же объект. Клавиатуры
+выбора даты и времени кэшируются: кэш сбрасывается при смене версии
+доступности (services.slots.availability_version), поэтому повторные
+нажатия до изменения записей не создают и не валидируют новые объекты.
+Возвращаемые клавиатуры общие — изменять их нельзя.
 """
+from datetime import date
+from typing import Callable, Dict, Hashable, List, Sequence, Tuple
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from keyboards.callbacks import BOOKING_CONFIRM, BOOKING_PSYCHOLOGIST, BOOKING_SERVICE, CallbackCodec
+from services.catalog import list_services
+from services.psychologists import PsychologistIdentity
+from services.slots import availability_version
+
+# Наибольшее число клавиатур дат и времени в кэше одной версии
+KEYBOARD_CACHE_SIZE = 256
+
+_SERVICE_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(
+        text=service.button_text,
+        callback_data=BOOKING_SERVICE.pack(service.code)
+    )]
+    for service in list_services()
+])
+
+_CONFIRM_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(
+        text="✅ Подтвердить",
+        callback_data=BOOKING_CONFIRM.pack(True)
+    )],
+    [InlineKeyboardButton(
+        text="❌ Отменить",
+        callback_data=BOOKING_CONFIRM.pack(False)
+    )],
+])
+
+_keyboards: Dict[Hashable, InlineKeyboardMarkup] = {}
+_keyboards_version = -1
+_keyboard_stats = {"hits": 0, "misses": 0}
+
 
 def service_keyboard() -> InlineKeyboardMarkup:
     """
-    Создать клавиатуру выбора типа услуги.
+    Получить клавиатуру выбора типа услуги.
     
     Returns:
-        InlineKeyboardMarkup: Клавиатура с кнопками для выбора услуги:
-            - Консультация (service_consult)
-            - Первая встреча (service_intro)
-            - Супервизия (service_supervision)
-    """
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(
-            text="🧠 Консультация",
-            callback_data="service_consult"
-        )],
-        [InlineKeyboardButton(
-            text="💬 Первая встреча",
-            callback_data="service_intro"
-        )],
-        [InlineKeyboardButton(
-            text="📌 Супервизия",
-            callback_data="service_supervision"
-        )],
-    ])
+        InlineKeyboardMarkup: Клавиатура с кнопкой на каждую услугу
+            каталога (services/catalog.py)
+    """
+    return _SERVICE_KEYBOARD
 
 
 def confirm_keyboard() -> InlineKeyboardMarkup:
     """
-    Создать клавиатуру подтверждения действия.
+    Получить клавиатуру подтверждения действия.
     
     Returns:
         InlineKeyboardMarkup: Клавиатура с кнопками:
-            - Подтвердить (confirm_yes)
-            - Отменить (confirm_no)
-    """
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(
-            text="✅ Подтвердить",
-            callback_data="confirm_yes"
-        )],
-        [InlineKeyboardButton(
-            text="❌ Отменить",
-            callback_data="confirm_no"
-        )],
+            - Подтвердить
+            - Отменить
+    """
+    return _CONFIRM_KEYBOARD
+
+
+def _cached_keyboard(
+    key: Hashable,
+    rows: Callable[[], List[Tuple[str, str]]]
+) -> InlineKeyboardMarkup:
+    """
+    Получить клавиатуру из кэша или построить её при промахе.
+    
+    Args:
+        key: Ключ клавиатуры в пределах версии доступности
+        rows: Построитель пар (текст, callback_data) кнопок, по одной в строке
+    
+    Returns:
+        InlineKeyboardMarkup: Общая (неизменяемая) клавиатура
+    """
+    global _keyboards_version
+    version = availability_version()
+    if version != _keyboards_version or len(_keyboards) >= KEYBOARD_CACHE_SIZE:
+        _keyboards.clear()
+        _keyboards_version = version
+    keyboard = _keyboards.get(key)
+    if keyboard is not None:
+        _keyboard_stats["hits"] += 1
+        return keyboard
+    _keyboard_stats["misses"] += 1
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=text, callback_data=data)]
+        for text, data in rows()
     ])
+    _keyboards[key] = keyboard
+    return keyboard
+
+
+def dates_keyboard(
+    codec: CallbackCodec,
+    available_dates: Sequence[Tuple[str, date]]
+) -> InlineKeyboardMarkup:
+    """
+    Получить клавиатуру выбора дня.
+    
+    Args:
+        codec: Кодек кнопок (запись или перенос)
+        available_dates: Пары (метка, дата) из get_available_days
+    
+    Returns:
+        InlineKeyboardMarkup: Кнопка на каждый день
+    """
+    return _cached_keyboard(
+        (codec.prefix, tuple(available_dates)),
+        lambda: [(label, codec.pack(day)) for label, day in available_dates]
+    )
+
+
+def times_keyboard(
+    codec: CallbackCodec,
+    day: date,
+    slots: Sequence[str]
+) -> InlineKeyboardMarkup:
+    """
+    Получить клавиатуру выбора времени на дату.
+    
+    Слоты входят в ключ: в течение сегодняшнего дня прошедшие слоты
+    исчезают из списка без смены версии доступности.
+    
+    Args:
+        codec: Кодек кнопок (запись, перенос или ручная запись)
+        day: Дата слотов
+        slots: Свободные слоты в формате "HH:MM"
+    
+    Returns:
+        InlineKeyboardMarkup: Кнопка на каждый слот
+    """
+    return _cached_keyboard(
+        (codec.prefix, day, tuple(slots)),
+        lambda: [(slot, codec.pack(slot)) for slot in slots]
+    )
+
+
+def psychologists_keyboard(
+    psychologists: Sequence[PsychologistIdentity]
+) -> InlineKeyboardMarkup:
+    """
+    Получить клавиатуру выбора психолога.
+    
+    Args:
+        psychologists: Активные психологи из справочника
+    
+    Returns:
+        InlineKeyboardMarkup: Кнопка на каждого психолога
+    """
+    return _cached_keyboard(
+        (BOOKING_PSYCHOLOGIST.prefix, tuple(psychologists)),
+        lambda: [
+            (f"👤 {p.full_name}", BOOKING_PSYCHOLOGIST.pack(p.id))
+            for p in psychologists
+        ]
+    )
+
+
+def keyboard_cache_stats() -> Dict[str, int]:
+    """
+    Получить статистику кэша клавиатур дат и времени.
+    
+    Returns:
+        Dict[str, int]: Попадания, промахи и число клавиатур в кэше
+    """
+    return {**_keyboard_stats, "size": len(_keyboards)}
@@ -3,13 +3,47 @@ Reply-клавиатуры для постоянного меню.
 
 Содержит функции для создания reply-клавиатур, которые отображаются
 внизу экрана и заменяют стандартную клавиатуру Telegram.
+
+Клавиатуры постоянные, поэтому строятся один раз при импорте; функции
+возвращают общий объект, изменять его нельзя.
 """
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
+_SCHEDULE_MAIN_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="🗰 Редактировать рабочее расписание")],
+        [KeyboardButton(text="🗓 Указать недоступное время")],
+        [KeyboardButton(text="📋 Показать записи")],
+        [KeyboardButton(text="🔎 Посмотреть свободные слоты")],
+        [KeyboardButton(text="ℹ️ О боте"), KeyboardButton(text="🔙 Назад")]
+    ],
+    resize_keyboard=True
+)
+
+_WEEKDAYS_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="Понедельник"), KeyboardButton(text="Вторник")],
+        [KeyboardButton(text="Среда"), KeyboardButton(text="Четверг")],
+        [KeyboardButton(text="Пятница"), KeyboardButton(text="Суббота")],
+        [KeyboardButton(text="Воскресенье")],
+        [KeyboardButton(text="🔙 Назад")]
+    ],
+    resize_keyboard=True
+)
+
+_CLIENT_MAIN_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="📅 Записаться"),
+         KeyboardButton(text="🗓 Мои записи")],
+        [KeyboardButton(text="ℹ️ О боте")]
+    ],
+    resize_keyboard=True
+)
+
 
 def schedule_main_keyboard() -> ReplyKeyboardMarkup:
     """
-    Создать главное меню для психолога.
+    Получить главное меню для психолога.
     
     Returns:
         ReplyKeyboardMarkup: Клавиатура с кнопками управления:
@@ -20,21 +54,12 @@ def schedule_main_keyboard() -> ReplyKeyboardMarkup:
             - О боте
             - Назад
     """
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🗰 Редактировать рабочее расписание")],
-            [KeyboardButton(text="🗓 Указать недоступное время")],
-            [KeyboardButton(text="📋 Показать записи")],
-            [KeyboardButton(text="🔎 Посмотреть свободные слоты")],
-            [KeyboardButton(text="ℹ️ О боте"), KeyboardButton(text="🔙 Назад")]
-        ],
-        resize_keyboard=True
-    )
+    return _SCHEDULE_MAIN_KEYBOARD
 
 
 def weekdays_keyboard() -> ReplyKeyboardMarkup:
     """
-    Создать клавиатуру выбора дня недели.
+    Получить клавиатуру выбора дня недели.
     
     Используется в FSM для настройки рабочего расписания.
     
@@ -42,21 +67,12 @@ def weekdays_keyboard() -> ReplyKeyboardMarkup:
         ReplyKeyboardMarkup: Клавиатура с кнопками дней недели
                             (Понедельник-Воскресенье) и кнопкой "Назад"
     """
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="Понедельник"), KeyboardButton(text="Вторник")],
-            [KeyboardButton(text="Среда"), KeyboardButton(text="Четверг")],
-            [KeyboardButton(text="Пятница"), KeyboardButton(text="Суббота")],
-            [KeyboardButton(text="Воскресенье")],
-            [KeyboardButton(text="🔙 Назад")]
-        ],
-        resize_keyboard=True
-    )
+    return _WEEKDAYS_KEYBOARD
 
 
 def client_main_keyboard() -> ReplyKeyboardMarkup:
     """
-    Создать главное меню для клиента.
+    Получить главное меню для клиента.
     
     Returns:
         ReplyKeyboardMarkup: Клавиатура с кнопками:
@@ -64,11 +80,4 @@ def client_main_keyboard() -> ReplyKeyboardMarkup:
             - Мои записи (просмотр активных записей)
             - О боте (информация о боте)
     """
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="📅 Записаться"),
-             KeyboardButton(text="🗓 Мои записи")],
-            [KeyboardButton(text="ℹ️ О боте")]
-        ],
-        resize_keyboard=True
-    )
+    return _CLIENT_MAIN_KEYBOARD
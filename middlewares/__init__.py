@@ -0,0 +1,3 @@
+"""
+Пакет middlewares: промежуточные обработчики диспетчера aiogram.
+"""
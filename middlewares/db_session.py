@@ -0,0 +1,96 @@
+"""
+Сессия базы данных на одно обновление Telegram.
+
+DbSessionMiddleware открывает для каждого обновления область сессии
+(database.session.update_session_scope): сама сессия создаётся при первом
+обращении, одна на всё обновление — её получают и обработчики (параметр
+session), и сервисы через get_session(). После обработки транзакция
+фиксируется, а при исключении откатывается.
+
+Детектор утечек: если после завершения обновления какое-то соединение,
+взятое во время его обработки, так и не вернулось в пул (сессия, открытая
+в обход get_session() и не закрытая), это пишется в лог и учитывается
+в session_stats().
+"""
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+from database.session import current_update_session, update_session_scope
+
+_session_stats = {"updates": 0, "sessions": 0, "leaks": 0}
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Внешний middleware обновлений: область сессии и поиск утечек.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        _session_stats["updates"] += 1
+        scope = None
+        try:
+            async with update_session_scope() as scope:
+                return await handler(event, data)
+        finally:
+            if scope is not None:
+                if scope.opened:
+                    _session_stats["sessions"] += 1
+                if scope.checked_out > 0:
+                    _session_stats["leaks"] += 1
+                    logging.warning(
+                        f"Утечка сессии БД: после обновления {event.update_id} "
+                        f"не возвращено соединений — {scope.checked_out}"
+                    )
+
+
+class SessionArgumentMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: передаёт сессию обновления обработчику.
+    
+    Сессия передаётся (и создаётся) только обработчикам с параметром
+    session, поэтому обновления без обращения к БД её не открывают.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        target = data.get("handler")
+        scope = current_update_session()
+        if scope is not None and target is not None and "session" in target.params:
+            data["session"] = scope.get()
+        return await handler(event, data)
+
+
+def register_db_session_middleware(dp: Dispatcher) -> None:
+    """
+    Подключить сессию на обновление к диспетчеру.
+    
+    Args:
+        dp: Диспетчер aiogram
+    """
+    dp.update.outer_middleware(DbSessionMiddleware())
+    argument_middleware = SessionArgumentMiddleware()
+    dp.message.middleware(argument_middleware)
+    dp.callback_query.middleware(argument_middleware)
+
+
+def session_stats() -> Dict[str, int]:
+    """
+    Получить статистику сессий обновлений.
+    
+    Returns:
+        Dict[str, int]: Обработанные обновления (updates), обновления,
+                        открывшие сессию (sessions), и утечки (leaks)
+    """
+    return dict(_session_stats)
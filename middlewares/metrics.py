@@ -0,0 +1,98 @@
+"""
+Замер длительности обработчиков и вызовов Telegram Bot API.
+
+HandlerMetricsMiddleware — внутренний middleware сообщений и callback-запросов:
+пишет длительность выбранного обработчика в psybot_handler_duration_seconds
+с меткой модуль.функция (например, booking.select_service) и результатом
+(ok/error).
+
+ApiMetricsMiddleware — middleware сессии бота: пишет длительность каждого
+вызова Bot API по методу и считает ошибки по типу исключения.
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType
+)
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject
+
+from services.metrics import (
+    HANDLER_DURATION,
+    TELEGRAM_ERRORS,
+    TELEGRAM_REQUEST_DURATION
+)
+
+
+def handler_name(callback: Callable) -> str:
+    """
+    Имя обработчика для метки: последняя часть модуля и имя функции.
+    
+    Args:
+        callback: Функция-обработчик
+    
+    Returns:
+        str: Например, 'booking.select_service'
+    """
+    module = getattr(callback, "__module__", "") or ""
+    name = getattr(callback, "__name__", type(callback).__name__)
+    return f"{module.rsplit('.', 1)[-1]}.{name}" if module else name
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Внутренний middleware: длительность обработчиков обновлений."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        target = data.get("handler")
+        name = handler_name(target.callback) if target is not None else "unknown"
+        status = "error"
+        started = time.perf_counter()
+        try:
+            result = await handler(event, data)
+            status = "ok"
+            return result
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, name, status)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: длительность и ошибки вызовов Bot API."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_ERRORS.inc(name, type(e).__name__)
+            raise
+        finally:
+            TELEGRAM_REQUEST_DURATION.observe(time.perf_counter() - started, name)
+
+
+def register_metrics_middleware(dp: Dispatcher, bot: Bot) -> None:
+    """
+    Подключить замеры к диспетчеру и сессии бота.
+    
+    Args:
+        dp: Диспетчер aiogram
+        bot: Экземпляр бота
+    """
+    handler_middleware = HandlerMetricsMiddleware()
+    dp.message.middleware(handler_middleware)
+    dp.callback_query.middleware(handler_middleware)
+    bot.session.middleware(ApiMetricsMiddleware())
@@ -0,0 +1,489 @@
+"""
+Атомарная запись и перенос приёмов.
+
+Занятость слота контролирует сама база данных: уникальный частичный индекс
+ux_appointments_tenant_active_slot не допускает двух активных записей
+к одному психологу на одно и то же время. Поэтому запись и перенос
+выполняются одним INSERT/UPDATE без предварительной проверки свободных
+слотов, а конфликт с другим клиентом распознаётся по нарушению ограничения.
+
+Услуги длятся разное время (services.catalog), поэтому записи с разным
+началом тоже могут пересекаться. INSERT и UPDATE сохраняют конец приёма
+с перерывом (busy_until) и выполняются только при отсутствии (NOT EXISTS)
+активной записи того же психолога, пересекающей новое время. Это условие
+проверяется в том же операторе; одинаковое начало одновременных записей
+по-прежнему исключает уникальный индекс.
+
+Запись с данными клиента (book_client_appointment) выполняется одной
+транзакцией: клиент находится или создаётся одним INSERT ... ON CONFLICT
+по нормализованному телефону с RETURNING, затем вставляется запись
+и транзакция фиксируется один раз. Клиент с тем же телефоном, но другим
+Telegram ID не присваивается: такая запись отклоняется (PhoneTakenError).
+Ручная запись психологом не присваивается клиенту с тем же телефоном,
+но другим ФИО, без подтверждения (ClientNameMismatchError).
+
+Обе операции записывают booked_at — время, с которого запись существует
+в текущем виде: напоминания, срок которых наступил раньше, не положены.
+
+Если база не дождалась блокировки записи (SQLite: database is locked,
+PostgreSQL: взаимоблокировка), операция откатывается с исключением
+BookingBusyError: обработчик предлагает клиенту повторить действие.
+"""
+from datetime import datetime
+from typing import Optional, Tuple, Union
+
+from sqlalchemy import (
+    ColumnElement,
+    DateTime,
+    Integer,
+    String,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    update
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import DEFAULT_PSYCHOLOGIST_ID, Appointment, Client, ReminderLog
+from services.catalog import DEFAULT_SERVICE, MAX_BUSY, get_service
+from services.clients import ClientIdentity, get_client_by_telegram_id, remember_client
+from utils.phone import normalize_phone
+
+SLOT_INDEX = "ux_appointments_tenant_active_slot"
+# Фрагменты сообщений о конкуренции за блокировку: SQLite, PostgreSQL
+BUSY_MESSAGES = (
+    "database is locked",
+    "database is busy",
+    "deadlock detected",
+    "could not obtain lock",
+)
+
+
+class SlotTakenError(Exception):
+    """Выбранное время уже занято другой активной записью."""
+
+
+class PhoneTakenError(Exception):
+    """Телефон принадлежит клиенту, привязанному к другому Telegram ID."""
+
+
+class BookingBusyError(Exception):
+    """База данных занята конкурирующей транзакцией; операцию можно повторить."""
+
+
+class ClientNameMismatchError(Exception):
+    """
+    Телефон уже записан за клиентом с другим ФИО.
+    
+    Attributes:
+        client (ClientIdentity): Клиент, за которым записан телефон
+    """
+
+    def __init__(self, client: ClientIdentity) -> None:
+        super().__init__(client.phone_number)
+        self.client = client
+
+
+def _same_name(stored: str, entered: str) -> bool:
+    """Сравнить ФИО без учёта регистра и лишних пробелов."""
+    return " ".join(stored.split()).casefold() == " ".join(entered.split()).casefold()
+
+
+def _is_slot_conflict(error: IntegrityError) -> bool:
+    """
+    Проверить, вызвано ли нарушение целостности занятым слотом.
+    
+    PostgreSQL сообщает имя индекса, SQLite — список столбцов.
+    
+    Args:
+        error: Исключение SQLAlchemy
+    
+    Returns:
+        bool: True, если нарушен индекс уникальности слота
+    """
+    message = str(error.orig)
+    return SLOT_INDEX in message or "appointments.date_time" in message
+
+
+def _is_busy(error: OperationalError) -> bool:
+    """
+    Проверить, вызвана ли ошибка ожиданием блокировки другой транзакции.
+    
+    Args:
+        error: Исключение SQLAlchemy
+    
+    Returns:
+        bool: True, если операцию можно повторить
+    """
+    message = str(error.orig).lower()
+    return any(fragment in message for fragment in BUSY_MESSAGES)
+
+
+# INSERT с поддержкой ON CONFLICT для каждого диалекта
+_UPSERT_INSERT = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _overlapping_appointment(
+    start: datetime,
+    busy_until: datetime,
+    psychologist_id: Union[int, ColumnElement],
+    exclude_id: Optional[int] = None
+):
+    """
+    Построить условие EXISTS активной записи, пересекающей [start, busy_until).
+    
+    Нижняя граница начала (start - MAX_BUSY) ограничивает просмотр
+    индекса ux_appointments_tenant_active_slot психолога: более ранняя
+    запись закончилась бы до start.
+    
+    Args:
+        start: Начало нового приёма
+        busy_until: Конец нового приёма с перерывом
+        psychologist_id: ID психолога или столбец Appointment.psychologist_id
+                         (в UPDATE — психолог переносимой записи)
+        exclude_id: ID переносимой записи, которая не мешает сама себе
+    
+    Returns:
+        Exists: Условие для WHERE
+    """
+    other = Appointment.__table__.alias("other")
+    conditions = [
+        other.c.psychologist_id == psychologist_id,
+        other.c.status == "active",
+        other.c.date_time > start - MAX_BUSY,
+        other.c.date_time < busy_until,
+        other.c.busy_until > start,
+    ]
+    if exclude_id is not None:
+        conditions.append(other.c.id != exclude_id)
+    return exists().where(*conditions)
+
+
+def _appointment_insert(
+    client_id: int,
+    date_time: datetime,
+    service: str,
+    psychologist_id: int
+):
+    """
+    Построить INSERT активной записи, возвращающий её ID.
+    
+    Запись вставляется, только если время не пересекает другую активную
+    запись психолога; иначе INSERT не возвращает строк.
+    
+    Args:
+        client_id: ID клиента
+        date_time: Дата и время приёма
+        service: Код услуги
+        psychologist_id: ID психолога
+    
+    Returns:
+        Insert: INSERT ... SELECT ... WHERE NOT EXISTS ... RETURNING id
+    """
+    busy_until = date_time + get_service(service).busy
+    values = select(
+        literal(client_id, Integer),
+        literal(psychologist_id, Integer),
+        literal(date_time, DateTime),
+        literal(service, String),
+        literal("active", String),
+        literal(datetime.now(), DateTime),
+        literal(busy_until, DateTime)
+    ).where(~_overlapping_appointment(date_time, busy_until, psychologist_id))
+    return (
+        insert(Appointment)
+        .from_select(
+            [
+                "client_id",
+                "psychologist_id",
+                "date_time",
+                "service",
+                "status",
+                "booked_at",
+                "busy_until"
+            ],
+            values
+        )
+        .returning(Appointment.id)
+    )
+
+
+def client_upsert_query(
+    dialect: str,
+    full_name: str,
+    phone: str,
+    telegram_id: Optional[int] = None
+):
+    """
+    Построить INSERT ... ON CONFLICT клиента по нормализованному телефону.
+    
+    Если клиент с таким номером уже есть, его ФИО и телефон не меняются,
+    а Telegram ID записывается, только если его ещё не было. Клиент
+    с другим Telegram ID не обновляется, и RETURNING не отдаёт строк:
+    номер принадлежит другому пользователю. Без Telegram ID (клиента
+    записывает психолог) найденный клиент отдаётся всегда.
+    
+    Args:
+        dialect: Имя диалекта SQLAlchemy ('postgresql', 'sqlite')
+        full_name: ФИО клиента
+        phone: Телефон в том виде, в каком его ввели
+        telegram_id: Telegram ID (None — клиента записывает психолог)
+    
+    Returns:
+        Insert: Запрос, возвращающий id, full_name, phone_number, telegram_id
+                (или ничего, если номер принадлежит другому Telegram ID)
+    """
+    stmt = _UPSERT_INSERT[dialect](Client).values(
+        full_name=full_name,
+        phone_number=phone,
+        phone_normalized=normalize_phone(phone),
+        telegram_id=telegram_id
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Client.phone_normalized],
+        set_={
+            "telegram_id": func.coalesce(Client.telegram_id, stmt.excluded.telegram_id),
+        },
+        where=or_(
+            stmt.excluded.telegram_id.is_(None),
+            Client.telegram_id.is_(None),
+            Client.telegram_id == stmt.excluded.telegram_id
+        )
+    )
+    return stmt.returning(
+        Client.id,
+        Client.full_name,
+        Client.phone_number,
+        Client.telegram_id
+    )
+
+
+async def book_appointment(
+    session: AsyncSession,
+    client_id: int,
+    date_time: datetime,
+    service: str,
+    psychologist_id: int = DEFAULT_PSYCHOLOGIST_ID
+) -> int:
+    """
+    Создать активную запись одним INSERT и зафиксировать транзакцию.
+    
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        client_id: ID клиента
+        date_time: Дата и время приёма
+        service: Код услуги
+        psychologist_id: ID психолога
+    
+    Returns:
+        int: ID созданной записи
+    
+    Raises:
+        SlotTakenError: Если время пересекает другую активную запись
+        BookingBusyError: Если база не дождалась блокировки записи
+    """
+    try:
+        result = await session.execute(
+            _appointment_insert(client_id, date_time, service, psychologist_id)
+        )
+        appointment_id = result.scalar()
+        if appointment_id is None:
+            await session.rollback()
+            raise SlotTakenError(date_time)
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        if _is_slot_conflict(e):
+            raise SlotTakenError(date_time) from e
+        raise
+    except OperationalError as e:
+        await session.rollback()
+        if _is_busy(e):
+            raise BookingBusyError(date_time) from e
+        raise
+    return appointment_id
+
+
+async def book_client_appointment(
+    session: AsyncSession,
+    full_name: str,
+    phone: str,
+    date_time: datetime,
+    service: str,
+    telegram_id: Optional[int] = None,
+    psychologist_id: int = DEFAULT_PSYCHOLOGIST_ID,
+    check_name: bool = False
+) -> Tuple[int, ClientIdentity]:
+    """
+    Найти или создать клиента и записать его одной транзакцией.
+    
+    Выполняет два оператора — upsert клиента (client_upsert_query)
+    и INSERT записи — и одну фиксацию. Кэш клиентов обновляется
+    снимком из RETURNING.
+    
+    Если Telegram ID уже принадлежит клиенту с другим телефоном
+    (например, клиент ввёл новый номер), транзакция откатывается
+    и запись создаётся на найденного по Telegram ID клиента. Если телефон
+    принадлежит клиенту с другим Telegram ID, запись не создаётся.
+    
+    С check_name запись не создаётся и тогда, когда телефон уже записан
+    за клиентом с другим ФИО: upsert не меняет ФИО найденного клиента,
+    поэтому расхождение видно по RETURNING, и транзакция откатывается
+    до фиксации. Так психолог, записывающий клиента вручную, не присвоит
+    запись чужому клиенту незаметно.
+    
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        full_name: ФИО клиента
+        phone: Телефон в том виде, в каком его ввели
+        date_time: Дата и время приёма
+        service: Код услуги
+        telegram_id: Telegram ID (None — клиента записывает психолог)
+        psychologist_id: ID психолога
+        check_name: Отклонить запись, если ФИО найденного клиента другое
+    
+    Returns:
+        Tuple[int, ClientIdentity]: ID созданной записи и клиент
+    
+    Raises:
+        SlotTakenError: Если время пересекает другую активную запись
+        PhoneTakenError: Если телефон принадлежит клиенту с другим Telegram ID
+        ClientNameMismatchError: Если check_name и телефон записан
+            за клиентом с другим ФИО
+        BookingBusyError: Если база не дождалась блокировки записи
+    """
+    try:
+        row = (await session.execute(client_upsert_query(
+            session.bind.dialect.name,
+            full_name,
+            phone,
+            telegram_id
+        ))).first()
+        if row is None:
+            await session.rollback()
+            raise PhoneTakenError(phone)
+        client = ClientIdentity(*row)
+        if check_name and not _same_name(client.full_name, full_name):
+            await session.rollback()
+            raise ClientNameMismatchError(client)
+        result = await session.execute(
+            _appointment_insert(client.id, date_time, service, psychologist_id)
+        )
+        appointment_id = result.scalar()
+        if appointment_id is None:
+            await session.rollback()
+            raise SlotTakenError(date_time)
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        if _is_slot_conflict(e):
+            raise SlotTakenError(date_time) from e
+        if telegram_id is None:
+            raise
+        client = await get_client_by_telegram_id(session, telegram_id)
+        if client is None:
+            raise
+        appointment_id = await book_appointment(
+            session,
+            client.id,
+            date_time,
+            service,
+            psychologist_id
+        )
+    except OperationalError as e:
+        await session.rollback()
+        if _is_busy(e):
+            raise BookingBusyError(date_time) from e
+        raise
+    return appointment_id, remember_client(client)
+
+
+async def reschedule_appointment(
+    session: AsyncSession,
+    appointment_id: int,
+    new_date_time: datetime,
+    service: str = DEFAULT_SERVICE
+) -> bool:
+    """
+    Перенести активную запись одним UPDATE и зафиксировать транзакцию.
+    
+    Подтверждение клиента и журнал напоминаний по записи сбрасываются,
+    так как время приёма изменилось. Пересечение проверяется с записями
+    того же психолога, к которому относится переносимая запись.
+    
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        appointment_id: ID переносимой записи
+        new_date_time: Новые дата и время приёма
+        service: Код услуги записи (определяет продолжительность)
+    
+    Returns:
+        bool: True, если запись перенесена; False, если запись не найдена
+              или уже не активна
+    
+    Raises:
+        SlotTakenError: Если новое время пересекает другую активную запись
+        BookingBusyError: Если база не дождалась блокировки записи
+    """
+    busy_until = new_date_time + get_service(service).busy
+    try:
+        result = await session.execute(
+            update(Appointment)
+            .where(
+                Appointment.id == appointment_id,
+                Appointment.status == "active",
+                ~_overlapping_appointment(
+                    new_date_time,
+                    busy_until,
+                    Appointment.psychologist_id,
+                    appointment_id
+                )
+            )
+            .values(
+                date_time=new_date_time,
+                confirmed=None,
+                booked_at=datetime.now(),
+                busy_until=busy_until
+            )
+            .returning(Appointment.id)
+        )
+        moved = result.scalar() is not None
+        if moved:
+            await session.execute(
+                delete(ReminderLog).where(
+                    ReminderLog.appointment_id == appointment_id
+                )
+            )
+        else:
+            # Запись не перенесена: не активна или время пересекается
+            # с другой записью — различаем одним запросом
+            active = (await session.execute(
+                select(Appointment.id).where(
+                    Appointment.id == appointment_id,
+                    Appointment.status == "active"
+                )
+            )).scalar()
+            if active is not None:
+                await session.rollback()
+                raise SlotTakenError(new_date_time)
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        if _is_slot_conflict(e):
+            raise SlotTakenError(new_date_time) from e
+        raise
+    except OperationalError as e:
+        await session.rollback()
+        if _is_busy(e):
+            raise BookingBusyError(new_date_time) from e
+        raise
+    return moved
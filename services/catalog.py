@@ -0,0 +1,104 @@
+"""
+Каталог услуг: названия, продолжительность и перерывы.
+
+Единый источник данных об услугах для клавиатуры выбора услуги, списков
+записей и расчёта свободного времени. Приём занимает время услуги
+(duration), после него психологу нужен перерыв (buffer): следующий приём
+может начаться не раньше окончания перерыва.
+
+Коды услуг хранятся в appointments.service. Записи с кодом, которого нет
+в каталоге (например, удалённая услуга), показываются под своим кодом
+и занимают один шаг сетки слотов.
+"""
+from datetime import timedelta
+from typing import Dict, List, NamedTuple
+
+
+class Service(NamedTuple):
+    """
+    Услуга каталога.
+    
+    Attributes:
+        code (str): Код услуги (appointments.service, данные кнопок)
+        label (str): Название для клиента и психолога
+        emoji (str): Значок на кнопке выбора услуги
+        duration (timedelta): Продолжительность приёма
+        buffer (timedelta): Перерыв после приёма
+    """
+    code: str
+    label: str
+    emoji: str
+    duration: timedelta
+    buffer: timedelta
+
+    @property
+    def busy(self) -> timedelta:
+        """Время, которое приём занимает в расписании вместе с перерывом."""
+        return self.duration + self.buffer
+
+    @property
+    def button_text(self) -> str:
+        """Текст кнопки выбора услуги."""
+        return f"{self.emoji} {self.label}"
+
+
+SERVICES: Dict[str, Service] = {
+    service.code: service
+    for service in (
+        Service("consult", "Консультация", "🧠", timedelta(minutes=50), timedelta(minutes=10)),
+        Service("intro", "Первая встреча", "💬", timedelta(minutes=45), timedelta(minutes=15)),
+        Service("supervision", "Супервизия", "📌", timedelta(minutes=90), timedelta(minutes=10)),
+    )
+}
+
+# Услуга ручной записи психологом и расчёта слотов по умолчанию
+DEFAULT_SERVICE = "consult"
+
+# Продолжительность записи с неизвестным кодом услуги
+UNKNOWN_SERVICE_DURATION = timedelta(minutes=60)
+
+# Наибольшее время, которое занимает одна запись (с перерывом)
+MAX_BUSY = max(
+    max(service.busy for service in SERVICES.values()),
+    UNKNOWN_SERVICE_DURATION
+)
+
+
+def get_service(code: str) -> Service:
+    """
+    Получить услугу по коду.
+    
+    Args:
+        code: Код услуги
+    
+    Returns:
+        Service: Услуга каталога; для неизвестного кода — услуга
+                 с названием, равным коду, без перерыва
+    """
+    service = SERVICES.get(code)
+    if service is None:
+        return Service(code, code, "", UNKNOWN_SERVICE_DURATION, timedelta(0))
+    return service
+
+
+def service_label(code: str) -> str:
+    """
+    Получить название услуги для вывода.
+    
+    Args:
+        code: Код услуги
+    
+    Returns:
+        str: Название услуги или сам код, если услуги нет в каталоге
+    """
+    return get_service(str(code)).label
+
+
+def list_services() -> List[Service]:
+    """
+    Получить услуги в порядке показа клиенту.
+    
+    Returns:
+        List[Service]: Услуги каталога
+    """
+    return list(SERVICES.values())
@@ -0,0 +1,209 @@
+"""
+Кэш данных клиентов по Telegram ID и ID клиента.
+
+Обработчики /start, «Мои записи», подтверждения записи и ответа
+на напоминание получают клиента через get_client_by_telegram_id /
+get_client вместо запроса к таблице clients на каждое нажатие.
+В кэше хранятся неизменяемые снимки ClientIdentity, а не объекты ORM,
+привязанные к сессии.
+
+Кэш ограничен по размеру (CLIENT_CACHE_SIZE, вытесняются давно
+не использованные записи) и по времени жизни записи (CLIENT_CACHE_TTL):
+срок жизни ограничивает расхождение с базой, если клиента изменил
+другой процесс. Обработчики, создающие или изменяющие клиента
+(подтверждение записи, ручная запись психологом), обновляют кэш
+через remember_client или сбрасывают его через invalidate_client.
+Отсутствие клиента не кэшируется.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import CLIENT_CACHE_SIZE, CLIENT_CACHE_TTL
+from database.models import Client
+
+
+class ClientIdentity(NamedTuple):
+    """
+    Снимок данных клиента.
+    
+    Attributes:
+        id (int): ID клиента
+        full_name (str): ФИО
+        phone_number (str): Телефон
+        telegram_id (Optional[int]): Telegram ID (None — записан психологом)
+    """
+    id: int
+    full_name: str
+    phone_number: str
+    telegram_id: Optional[int]
+
+
+# ID клиента -> (снимок, момент истечения); порядок — от давно
+# использованных к недавним
+_by_id: "OrderedDict[int, tuple]" = OrderedDict()
+# Telegram ID -> ID клиента
+_by_telegram_id: Dict[int, int] = {}
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+
+def _lookup(client_id: int) -> Optional[ClientIdentity]:
+    """Найти снимок в кэше, учитывая срок жизни и порядок использования."""
+    entry = _by_id.get(client_id)
+    if entry is None:
+        return None
+    identity, expires = entry
+    if expires < time.monotonic():
+        _drop(client_id)
+        return None
+    _by_id.move_to_end(client_id)
+    return identity
+
+
+def _drop(client_id: int) -> None:
+    """Удалить клиента из обоих индексов."""
+    entry = _by_id.pop(client_id, None)
+    if entry and entry[0].telegram_id is not None:
+        _by_telegram_id.pop(entry[0].telegram_id, None)
+
+
+def remember_client(client: Union[Client, ClientIdentity]) -> ClientIdentity:
+    """
+    Положить клиента в кэш (или обновить его снимок).
+    
+    Args:
+        client: Объект ORM или готовый снимок
+    
+    Returns:
+        ClientIdentity: Снимок данных клиента
+    """
+    identity = ClientIdentity(
+        client.id,
+        client.full_name,
+        client.phone_number,
+        client.telegram_id
+    )
+    _drop(identity.id)
+    _by_id[identity.id] = (identity, time.monotonic() + CLIENT_CACHE_TTL)
+    if identity.telegram_id is not None:
+        _by_telegram_id[identity.telegram_id] = identity.id
+    while len(_by_id) > CLIENT_CACHE_SIZE:
+        oldest = next(iter(_by_id))
+        _drop(oldest)
+        _stats["evictions"] += 1
+    return identity
+
+
+def invalidate_client(client_id: Optional[int] = None, telegram_id: Optional[int] = None) -> None:
+    """
+    Сбросить кэш клиента по ID и/или Telegram ID.
+    
+    Args:
+        client_id: ID клиента
+        telegram_id: Telegram ID клиента
+    """
+    if telegram_id is not None and client_id is None:
+        client_id = _by_telegram_id.get(telegram_id)
+    if client_id is not None:
+        _drop(client_id)
+    if telegram_id is not None:
+        _by_telegram_id.pop(telegram_id, None)
+    _stats["invalidations"] += 1
+
+
+def peek_client(client_id: int) -> Optional[ClientIdentity]:
+    """
+    Получить клиента из кэша без обращения к базе.
+    
+    Args:
+        client_id: ID клиента
+    
+    Returns:
+        Optional[ClientIdentity]: Снимок или None, если его нет в кэше
+    """
+    identity = _lookup(client_id)
+    _stats["hits" if identity else "misses"] += 1
+    return identity
+
+
+def peek_client_by_telegram_id(telegram_id: int) -> Optional[ClientIdentity]:
+    """
+    Получить клиента по Telegram ID из кэша без обращения к базе.
+    
+    Args:
+        telegram_id: Telegram ID пользователя
+    
+    Returns:
+        Optional[ClientIdentity]: Снимок или None, если его нет в кэше
+    """
+    client_id = _by_telegram_id.get(telegram_id)
+    identity = _lookup(client_id) if client_id is not None else None
+    _stats["hits" if identity else "misses"] += 1
+    return identity
+
+
+async def get_client(session: AsyncSession, client_id: int) -> Optional[ClientIdentity]:
+    """
+    Получить клиента по ID: из кэша или из базы.
+    
+    Args:
+        session: Сессия БД текущего обновления
+        client_id: ID клиента
+    
+    Returns:
+        Optional[ClientIdentity]: Снимок или None, если клиента нет
+    """
+    identity = peek_client(client_id)
+    if identity:
+        return identity
+    client = await session.get(Client, client_id)
+    return remember_client(client) if client else None
+
+
+async def get_client_by_telegram_id(
+    session: AsyncSession,
+    telegram_id: int
+) -> Optional[ClientIdentity]:
+    """
+    Получить клиента по Telegram ID: из кэша или из базы.
+    
+    Args:
+        session: Сессия БД текущего обновления
+        telegram_id: Telegram ID пользователя
+    
+    Returns:
+        Optional[ClientIdentity]: Снимок или None, если пользователь
+                                  ещё не записывался
+    """
+    identity = peek_client_by_telegram_id(telegram_id)
+    if identity:
+        return identity
+    client = (await session.execute(
+        select(Client).where(Client.telegram_id == telegram_id)
+    )).scalar()
+    return remember_client(client) if client else None
+
+
+def client_cache_stats() -> Dict[str, float]:
+    """
+    Получить статистику кэша клиентов.
+    
+    Returns:
+        Dict[str, float]: Попадания, промахи, доля попаданий, вытеснения,
+                          сбросы и число клиентов в кэше
+    """
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+        "size": len(_by_id),
+    }
+
+
+def clear_client_cache() -> None:
+    """Полностью очистить кэш клиентов."""
+    _by_id.clear()
+    _by_telegram_id.clear()
@@ -0,0 +1,229 @@
+"""
+Постоянные хранилища состояний FSM.
+
+MemoryStorage теряет незавершённые сценарии (запись, перенос, ручная запись,
+ввод причины отмены) при перезапуске и не может быть общим для нескольких
+процессов бота. Модуль предоставляет два постоянных хранилища:
+
+- Redis (любой сервер, совместимый с протоколом Redis) — стандартный
+  RedisStorage из aiogram;
+- таблица fsm_storage в основной базе данных — DatabaseStorage.
+
+Хранилище выбирается переменной FSM_STORAGE ('memory', 'redis', 'db').
+Данные состояния сериализуются компактно: объекты date, time и datetime,
+которые сценарии кладут в данные FSM, превращаются в короткие строки
+с префиксом и восстанавливаются при чтении.
+"""
+import json
+from datetime import date, datetime, time
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    DEFAULT_DESTINY,
+    BaseStorage,
+    StateType,
+    StorageKey
+)
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import database.session as db_session
+from database.models import FsmRecord
+from config import FSM_STORAGE, FSM_TTL, REDIS_URL
+
+# Префиксы компактной сериализации; строки, начинающиеся с '~',
+# экранируются удвоением префикса
+_DATETIME = "~T"
+_DATE = "~d"
+_TIME = "~t"
+_ESCAPE = "~"
+
+
+def _encode(value: Any) -> Any:
+    """Заменить date/time/datetime строками с префиксом (рекурсивно)."""
+    if isinstance(value, datetime):
+        return _DATETIME + value.isoformat()
+    if isinstance(value, date):
+        return _DATE + value.isoformat()
+    if isinstance(value, time):
+        return _TIME + value.isoformat()
+    if isinstance(value, str) and value.startswith(_ESCAPE):
+        return _ESCAPE + value
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value: Any) -> Any:
+    """Восстановить date/time/datetime из строк с префиксом (рекурсивно)."""
+    if isinstance(value, str) and value.startswith(_ESCAPE):
+        if value.startswith(_DATETIME):
+            return datetime.fromisoformat(value[len(_DATETIME):])
+        if value.startswith(_DATE):
+            return date.fromisoformat(value[len(_DATE):])
+        if value.startswith(_TIME):
+            return time.fromisoformat(value[len(_TIME):])
+        return value[len(_ESCAPE):]
+    if isinstance(value, dict):
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def dumps_state_data(data: Dict[str, Any]) -> str:
+    """
+    Сериализовать данные FSM в компактный JSON.
+    
+    Args:
+        data: Данные состояния
+    
+    Returns:
+        str: JSON без пробелов, даты и время — строки с префиксом
+    """
+    return json.dumps(_encode(data), ensure_ascii=False, separators=(",", ":"))
+
+
+def loads_state_data(raw: str) -> Dict[str, Any]:
+    """
+    Восстановить данные FSM из строки dumps_state_data.
+    
+    Args:
+        raw: Сериализованные данные
+    
+    Returns:
+        Dict[str, Any]: Данные состояния с объектами date/time/datetime
+    """
+    return _decode(json.loads(raw))
+
+
+def build_key(key: StorageKey) -> str:
+    """
+    Построить строковый ключ записи FSM.
+    
+    Формат совпадает с DefaultKeyBuilder из aiogram (без префикса и части):
+    бот, чат, [тема,] пользователь, [назначение].
+    
+    Args:
+        key: Ключ хранилища aiogram
+    
+    Returns:
+        str: Строковый ключ
+    """
+    parts = [str(key.bot_id), str(key.chat_id)]
+    if key.thread_id:
+        parts.append(str(key.thread_id))
+    parts.append(str(key.user_id))
+    if key.destiny != DEFAULT_DESTINY:
+        parts.append(key.destiny)
+    return ":".join(parts)
+
+
+class DatabaseStorage(BaseStorage):
+    """
+    Хранилище состояний FSM в таблице fsm_storage.
+    
+    Каждая операция выполняется в собственной короткой транзакции
+    (установка — одним INSERT ... ON CONFLICT DO UPDATE); запись
+    удаляется, когда у пользователя не остаётся ни состояния, ни данных.
+    """
+
+    def _upsert(self, dialect: str, key: str, values: Dict[str, Any]):
+        """Построить INSERT ... ON CONFLICT DO UPDATE для нужного диалекта."""
+        insert = pg_insert if dialect == "postgresql" else sqlite_insert
+        statement = insert(FsmRecord).values(key=key, **values)
+        return statement.on_conflict_do_update(
+            index_elements=[FsmRecord.key],
+            set_=values
+        )
+
+    async def _write(self, key: StorageKey, **values: Any) -> None:
+        """
+        Записать столбцы строки ключа; пустую строку удалить.
+        
+        Args:
+            key: Ключ хранилища aiogram
+            **values: Значения столбцов state и/или data
+        """
+        record_key = build_key(key)
+        values["updated_at"] = datetime.now()
+        async with db_session.SessionLocal() as session:
+            if all(values.get(column) is None for column in ("state", "data")):
+                await session.execute(
+                    update(FsmRecord)
+                    .where(FsmRecord.key == record_key)
+                    .values(**values)
+                )
+                await session.execute(
+                    delete(FsmRecord).where(
+                        FsmRecord.key == record_key,
+                        FsmRecord.state == None,
+                        FsmRecord.data == None
+                    )
+                )
+            else:
+                dialect = session.bind.dialect.name
+                await session.execute(self._upsert(dialect, record_key, values))
+            await session.commit()
+
+    async def _read(self, key: StorageKey, column) -> Optional[str]:
+        """Прочитать один столбец строки ключа."""
+        async with db_session.SessionLocal() as session:
+            return await session.scalar(
+                select(column).where(FsmRecord.key == build_key(key))
+            )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """Установить состояние пользователя (None — сбросить)."""
+        value = state.state if isinstance(state, State) else state
+        await self._write(key, state=value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """Получить текущее состояние пользователя."""
+        return await self._read(key, FsmRecord.state)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        """Заменить данные состояния пользователя."""
+        await self._write(key, data=dumps_state_data(data) if data else None)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """Получить данные состояния пользователя."""
+        raw = await self._read(key, FsmRecord.data)
+        return loads_state_data(raw) if raw else {}
+
+    async def close(self) -> None:
+        """Соединения принадлежат общему движку БД — закрывать нечего."""
+
+
+def create_fsm_storage(backend: str = FSM_STORAGE) -> BaseStorage:
+    """
+    Создать хранилище состояний FSM по настройке FSM_STORAGE.
+    
+    Args:
+        backend: 'memory', 'redis' или 'db'
+    
+    Returns:
+        BaseStorage: Хранилище для Dispatcher
+    
+    Raises:
+        ValueError: Если указан неизвестный тип хранилища
+    """
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+        return RedisStorage.from_url(
+            REDIS_URL,
+            state_ttl=FSM_TTL,
+            data_ttl=FSM_TTL,
+            json_dumps=dumps_state_data,
+            json_loads=loads_state_data
+        )
+    if backend == "db":
+        return DatabaseStorage()
+    raise ValueError(f"Неизвестное хранилище FSM: {backend}")
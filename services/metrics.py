@@ -0,0 +1,358 @@
+"""
+Метрики бота в текстовом формате Prometheus.
+
+Процесс бота отдаёт метрики по HTTP (METRICS_HOST:METRICS_PORT/metrics):
+
+- psybot_handler_duration_seconds — длительность обработчиков обновлений
+  (middlewares/metrics.py);
+- psybot_db_query_duration_seconds, psybot_db_errors_total — SQL-запросы
+  по виду (SELECT/INSERT/...), по событиям движка SQLAlchemy;
+- psybot_telegram_request_duration_seconds, psybot_telegram_errors_total —
+  вызовы Bot API по методам (middleware сессии бота);
+- psybot_job_duration_seconds, psybot_job_lag_seconds, psybot_job_runs_total —
+  задачи APScheduler: длительность, опоздание запуска, результат;
+- psybot_<источник>_<показатель> — текущие значения статистики компонентов
+  (кэш слотов, очередь исходящих, пул БД, сессии обновлений, вебхук),
+  снимаемые в момент запроса метрик.
+
+Реализация не требует prometheus_client: гистограммы и счётчики — простые
+структуры в памяти процесса.
+"""
+import logging
+import re
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+from apscheduler.events import (
+    EVENT_JOB_SUBMITTED,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_ERROR,
+    EVENT_JOB_MISSED,
+    EVENT_JOB_MAX_INSTANCES
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import METRICS_HOST, METRICS_PORT
+
+PREFIX = "psybot_"
+
+# Границы корзин гистограмм, секунд
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Экранировать значение метки по правилам текстового формата."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Сформировать блок меток {name="value",...}."""
+    pairs = [
+        f'{name}="{_escape(value)}"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Счётчик с метками.
+    
+    Attributes:
+        name (str): Полное имя метрики (с префиксом psybot_)
+        labels (Tuple[str, ...]): Имена меток
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        """Увеличить счётчик для набора значений меток."""
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        """Текущее значение счётчика."""
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        """Строки метрики в текстовом формате Prometheus."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for values, amount in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {amount:g}")
+        return lines
+
+
+class Histogram:
+    """
+    Гистограмма с метками и фиксированными корзинами.
+    
+    Attributes:
+        name (str): Полное имя метрики (с префиксом psybot_)
+        labels (Tuple[str, ...]): Имена меток
+        buckets (Tuple[float, ...]): Верхние границы корзин
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Для каждого набора меток: [счётчики корзин (+Inf последней), сумма]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Учесть одно наблюдение."""
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *label_values: str) -> int:
+        """Число наблюдений для набора значений меток."""
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        """Строки метрики в текстовом формате Prometheus."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, amount in zip(self.buckets + (float("inf"),), counts):
+                cumulative += amount
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labels, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+HANDLER_DURATION = Histogram(
+    "handler_duration_seconds",
+    "Длительность обработчиков обновлений",
+    ("handler", "status")
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Длительность SQL-запросов",
+    ("operation",)
+)
+DB_ERRORS = Counter("db_errors_total", "Ошибки SQL-запросов", ("operation",))
+TELEGRAM_REQUEST_DURATION = Histogram(
+    "telegram_request_duration_seconds",
+    "Длительность вызовов Telegram Bot API",
+    ("method",)
+)
+TELEGRAM_ERRORS = Counter(
+    "telegram_errors_total",
+    "Ошибки вызовов Telegram Bot API",
+    ("method", "error")
+)
+JOB_DURATION = Histogram(
+    "job_duration_seconds",
+    "Длительность задач планировщика",
+    ("job",)
+)
+JOB_LAG = Histogram(
+    "job_lag_seconds",
+    "Опоздание запуска задач планировщика относительно плана",
+    ("job",),
+    LAG_BUCKETS
+)
+JOB_RUNS = Counter(
+    "job_runs_total",
+    "Запуски задач планировщика по результату",
+    ("job", "result")
+)
+
+_metrics: List = [
+    HANDLER_DURATION,
+    DB_QUERY_DURATION,
+    DB_ERRORS,
+    TELEGRAM_REQUEST_DURATION,
+    TELEGRAM_ERRORS,
+    JOB_DURATION,
+    JOB_LAG,
+    JOB_RUNS,
+]
+_collectors: Dict[str, Callable[[], Dict]] = {}
+
+
+def register_collector(source: str, collect: Callable[[], Dict]) -> None:
+    """
+    Подключить источник текущих значений (например, cache_stats).
+    
+    Числовые значения словаря, который возвращает collect, выводятся
+    как метрики psybot_<source>_<ключ> типа gauge.
+    
+    Args:
+        source: Имя источника (часть имени метрики)
+        collect: Функция без аргументов, возвращающая словарь статистики
+    """
+    _collectors[source] = collect
+
+
+def render_metrics() -> str:
+    """
+    Сформировать все метрики в текстовом формате Prometheus.
+    
+    Returns:
+        str: Текст для ответа на запрос /metrics
+    """
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for source, collect in sorted(_collectors.items()):
+        try:
+            values = collect()
+        except Exception as e:
+            logging.error(f"Ошибка сбора метрик {source}: {e}")
+            continue
+        for key, value in sorted(values.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{PREFIX}{source}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def _operation(statement: str) -> str:
+    """Вид SQL-запроса по первому слову (SELECT, INSERT, ...)."""
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["metrics_started"].pop()
+    DB_QUERY_DURATION.observe(time.perf_counter() - started, _operation(statement))
+
+
+def _handle_error(context) -> None:
+    stack = context.connection.info.get("metrics_started") if context.connection else None
+    if stack:
+        stack.pop()
+    DB_ERRORS.inc(_operation(context.statement or ""))
+
+
+def instrument_database() -> None:
+    """Подключить замер SQL-запросов ко всем движкам SQLAlchemy."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+def job_name(job_id: str) -> str:
+    """
+    Имя задачи для метки: ID без номера записи.
+    
+    Задачи напоминаний создаются на каждую запись (reminder_24h:15),
+    а в метрику попадает только их вид (reminder_24h).
+    """
+    return re.sub(r"[:_]\d+$", "", job_id)
+
+
+class SchedulerMetrics:
+    """Слушатель событий APScheduler: длительность, опоздание и результат задач."""
+
+    def __init__(self) -> None:
+        self._started: Dict[Tuple[str, datetime], float] = {}
+
+    def __call__(self, job_event) -> None:
+        name = job_name(job_event.job_id)
+        if job_event.code == EVENT_JOB_SUBMITTED:
+            for run_time in job_event.scheduled_run_times:
+                lag = (datetime.now(run_time.tzinfo) - run_time).total_seconds()
+                JOB_LAG.observe(max(lag, 0.0), name)
+                self._started[(job_event.job_id, run_time)] = time.perf_counter()
+            return
+        if job_event.code == EVENT_JOB_MISSED:
+            JOB_RUNS.inc(name, "missed")
+            return
+        if job_event.code == EVENT_JOB_MAX_INSTANCES:
+            JOB_RUNS.inc(name, "skipped")
+            return
+        started = self._started.pop((job_event.job_id, job_event.scheduled_run_time), None)
+        if started is not None:
+            JOB_DURATION.observe(time.perf_counter() - started, name)
+        JOB_RUNS.inc(name, "error" if job_event.code == EVENT_JOB_ERROR else "ok")
+
+
+def instrument_scheduler(scheduler) -> None:
+    """
+    Подключить метрики задач к планировщику APScheduler.
+    
+    Args:
+        scheduler: Экземпляр планировщика
+    """
+    scheduler.add_listener(
+        SchedulerMetrics(),
+        EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR
+        | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+    )
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """Ответить на запрос /metrics."""
+    return web.Response(
+        text=render_metrics(),
+        content_type="text/plain",
+        charset="utf-8",
+        headers={"X-Content-Type-Options": "nosniff"}
+    )
+
+
+async def start_metrics_server(
+    host: str = METRICS_HOST,
+    port: int = METRICS_PORT
+) -> Optional[web.AppRunner]:
+    """
+    Запустить HTTP-сервер метрик.
+    
+    Args:
+        host: Адрес прослушивания
+        port: Порт (0 — сервер метрик отключён)
+    
+    Returns:
+        Optional[web.AppRunner]: Запущенный сервер или None, если отключён
+    """
+    if not port:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
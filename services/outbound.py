@@ -0,0 +1,343 @@
+"""
+Очередь исходящих сообщений бота с ограничением скорости.
+
+Все рассылки (напоминания, дайджест, уведомления клиентам и психологу,
+списки записей) отправляются через единую очередь вместо прямых вызовов
+bot.send_message. Очередь соблюдает лимиты Telegram Bot API:
+
+- общий лимит бота — корзина токенов OUTBOUND_GLOBAL_RATE сообщений в секунду;
+- лимит на один чат — отдельная корзина OUTBOUND_CHAT_RATE сообщений в секунду
+  с небольшим запасом на всплеск.
+
+Сообщения одного чата отправляются строго по порядку: в каждый момент
+чат обслуживает не более одного обработчика. При ответе TelegramRetryAfter
+отправка приостанавливается на указанное время (ограничение действует
+на весь бот) и то же сообщение повторяется, не нарушая порядок.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from config import (
+    OUTBOUND_GLOBAL_RATE,
+    OUTBOUND_CHAT_RATE,
+    OUTBOUND_CHAT_BURST,
+    OUTBOUND_WORKERS,
+    OUTBOUND_MAX_RETRIES
+)
+
+# Окно, по которому считается скорость отправки
+RATE_WINDOW = 60.0
+
+
+class TokenBucket:
+    """
+    Корзина токенов для ограничения скорости.
+    
+    Токены пополняются со скоростью rate в секунду до ёмкости capacity;
+    каждая отправка забирает один токен. Корзину можно приостановить
+    (pause) — например, на время, указанное в TelegramRetryAfter.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """
+        Args:
+            rate: Скорость пополнения, токенов в секунду
+            capacity: Максимальное число токенов (допустимый всплеск)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        """Пополнить токены за время, прошедшее с последнего обращения."""
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def is_full(self) -> bool:
+        """Проверить, что корзина полностью пополнена и не приостановлена."""
+        now = time.monotonic()
+        self._refill(now)
+        return self._tokens >= self.capacity and now >= self._paused_until
+
+    def pause(self, seconds: float) -> None:
+        """
+        Запретить выдачу токенов на заданное время.
+        
+        Args:
+            seconds: Длительность паузы в секундах
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        """Дождаться свободного токена и забрать его."""
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class OutboundMessage(NamedTuple):
+    """
+    Сообщение в очереди на отправку.
+    
+    Attributes:
+        chat_id (int): ID чата получателя
+        text (str): Текст сообщения
+        kwargs (Dict[str, Any]): Дополнительные параметры send_message
+        future (asyncio.Future): Результат отправки (Message или исключение)
+        enqueued_at (float): Время постановки в очередь (time.monotonic)
+    """
+    chat_id: int
+    text: str
+    kwargs: Dict[str, Any]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    """Пометить исключение как полученное: ошибки уже записаны в лог очереди."""
+    if not future.cancelled():
+        future.exception()
+
+
+class OutboundQueue:
+    """
+    Асинхронная очередь исходящих сообщений.
+    
+    Для каждого чата хранится своя FIFO-очередь; в общей очереди готовых
+    чатов каждый чат присутствует не более одного раза, поэтому сообщения
+    одного чата никогда не отправляются параллельно.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = OUTBOUND_GLOBAL_RATE,
+        chat_rate: float = OUTBOUND_CHAT_RATE,
+        chat_burst: float = OUTBOUND_CHAT_BURST,
+        workers: int = OUTBOUND_WORKERS,
+        max_retries: int = OUTBOUND_MAX_RETRIES
+    ) -> None:
+        """
+        Args:
+            global_rate: Общий лимит бота, сообщений в секунду
+            chat_rate: Лимит на один чат, сообщений в секунду
+            chat_burst: Допустимый всплеск сообщений в один чат
+            workers: Число параллельных обработчиков очереди
+            max_retries: Сколько раз повторять сообщение после RetryAfter
+        """
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self._bot: Optional[Bot] = None
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._pending: Dict[int, Deque[OutboundMessage]] = {}
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._sent_times: Deque[float] = deque()
+        self._stats = {"sent": 0, "failed": 0, "retries": 0}
+        self._max_wait = 0.0
+
+    def start(self, bot: Bot) -> None:
+        """
+        Запустить обработчики очереди.
+        
+        Args:
+            bot: Экземпляр бота для отправки сообщений
+        """
+        self._bot = bot
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Дождаться отправки очереди (не дольше timeout) и остановить обработчики.
+        
+        Args:
+            timeout: Максимальное время ожидания в секундах
+        """
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(
+                f"Очередь исходящих остановлена, не отправлено: {self.depth()}"
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, chat_id: int, text: str, **kwargs: Any) -> asyncio.Future:
+        """
+        Поставить сообщение в очередь, не дожидаясь отправки.
+        
+        Ошибки отправки записываются в лог очередью; дождаться результата
+        можно, выполнив await над возвращённым future.
+        
+        Args:
+            chat_id: ID чата получателя
+            text: Текст сообщения
+            **kwargs: Параметры send_message (reply_markup, parse_mode и т.д.)
+        
+        Returns:
+            asyncio.Future: Отправленное сообщение или исключение
+        """
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        message = OutboundMessage(chat_id, text, kwargs, future, time.monotonic())
+        pending = self._pending.get(chat_id)
+        if pending is None:
+            self._pending[chat_id] = deque([message])
+            self._ready.put_nowait(chat_id)
+        else:
+            pending.append(message)
+        return future
+
+    async def send(self, chat_id: int, text: str, **kwargs: Any) -> Any:
+        """
+        Поставить сообщение в очередь и дождаться его отправки.
+        
+        Args:
+            chat_id: ID чата получателя
+            text: Текст сообщения
+            **kwargs: Параметры send_message
+        
+        Returns:
+            Message: Отправленное сообщение
+        
+        Raises:
+            Exception: Ошибка Telegram API, если сообщение не отправлено
+        """
+        return await self.enqueue(chat_id, text, **kwargs)
+
+    def depth(self) -> int:
+        """Количество сообщений, ожидающих отправки."""
+        return sum(len(pending) for pending in self._pending.values())
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Получить метрики очереди.
+        
+        Returns:
+            Dict[str, float]: Глубина очереди (depth), число чатов с ожидающими
+                сообщениями (chats), счётчики sent/failed/retries, скорость
+                отправки за последнюю минуту (send_rate, сообщений в секунду)
+                и максимальное время ожидания в очереди (max_wait, секунд)
+        """
+        self._trim_sent_times(time.monotonic())
+        return {
+            "depth": self.depth(),
+            "chats": len(self._pending),
+            **self._stats,
+            "send_rate": len(self._sent_times) / RATE_WINDOW,
+            "max_wait": self._max_wait,
+        }
+
+    def _trim_sent_times(self, now: float) -> None:
+        """Удалить отметки отправки старше окна подсчёта скорости."""
+        while self._sent_times and self._sent_times[0] < now - RATE_WINDOW:
+            self._sent_times.popleft()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        """Получить корзину токенов чата, удалив корзины простаивающих чатов."""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > 1000:
+                self._chat_buckets = {
+                    cid: b for cid, b in self._chat_buckets.items()
+                    if cid in self._pending or not b.is_full()
+                }
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _worker(self) -> None:
+        """Обработчик: берёт готовый чат и отправляет его первое сообщение."""
+        while True:
+            chat_id = await self._ready.get()
+            pending = self._pending[chat_id]
+            try:
+                await self._deliver(pending[0])
+            finally:
+                pending.popleft()
+                if pending:
+                    self._ready.put_nowait(chat_id)
+                else:
+                    del self._pending[chat_id]
+                self._ready.task_done()
+
+    async def _deliver(self, message: OutboundMessage) -> None:
+        """
+        Отправить сообщение с учётом лимитов и повторами после RetryAfter.
+        
+        Args:
+            message: Сообщение из очереди
+        """
+        retries = 0
+        while True:
+            await self._chat_bucket(message.chat_id).acquire()
+            await self._global.acquire()
+            try:
+                result = await self._bot.send_message(
+                    chat_id=message.chat_id,
+                    text=message.text,
+                    **message.kwargs
+                )
+            except TelegramRetryAfter as e:
+                self._stats["retries"] += 1
+                retries += 1
+                if retries > self.max_retries:
+                    self._fail(message, e)
+                    return
+                logging.warning(
+                    f"Telegram ограничил отправку, повтор через {e.retry_after} с "
+                    f"(чат {message.chat_id})"
+                )
+                self._global.pause(e.retry_after)
+                continue
+            except asyncio.CancelledError:
+                message.future.cancel()
+                raise
+            except Exception as e:
+                self._fail(message, e)
+                return
+            now = time.monotonic()
+            self._stats["sent"] += 1
+            self._sent_times.append(now)
+            self._trim_sent_times(now)
+            self._max_wait = max(self._max_wait, now - message.enqueued_at)
+            if not message.future.done():
+                message.future.set_result(result)
+            return
+
+    def _fail(self, message: OutboundMessage, error: Exception) -> None:
+        """Записать ошибку отправки и передать её ожидающему."""
+        self._stats["failed"] += 1
+        logging.error(f"Ошибка отправки сообщения в чат {message.chat_id}: {error}")
+        if not message.future.done():
+            message.future.set_exception(error)
+
+
+outbound = OutboundQueue()
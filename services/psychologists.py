@@ -0,0 +1,201 @@
+"""
+Резидентный справочник психологов.
+
+Психологов единицы, а проверка «является ли пользователь психологом»
+выполняется почти в каждом обработчике, поэтому справочник целиком
+держится в памяти в виде неизменяемого снимка. Снимок загружается при
+запуске бота и атомарно заменяется после каждого изменения состава
+психологов (handlers/psychologist/team.py).
+
+До загрузки снимка справочник содержит одного психолога по умолчанию
+с Telegram ID из PSYCHOLOGIST_ID, поэтому бот с одним психологом
+работает так же, как до появления таблицы psychologists. Владелец бота
+(PSYCHOLOGIST_ID) всегда остаётся психологом по умолчанию.
+"""
+from types import MappingProxyType
+from typing import List, Mapping, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import PSYCHOLOGIST_ID
+from database.session import get_session
+from database.models import DEFAULT_PSYCHOLOGIST_ID, Psychologist
+
+DEFAULT_PSYCHOLOGIST_NAME = "Психолог"
+
+
+class PsychologistIdentity(NamedTuple):
+    """
+    Данные психолога, нужные обработчикам и рассылкам.
+    
+    Attributes:
+        id (int): ID психолога
+        telegram_id (int): Telegram ID психолога
+        full_name (str): Имя психолога для клиентов
+    """
+    id: int
+    telegram_id: int
+    full_name: str
+
+
+class Directory(NamedTuple):
+    """
+    Снимок справочника психологов.
+    
+    Attributes:
+        by_id (Mapping[int, PsychologistIdentity]): Активные психологи по ID
+        by_telegram_id (Mapping[int, PsychologistIdentity]): Они же
+            по Telegram ID
+    """
+    by_id: Mapping[int, PsychologistIdentity]
+    by_telegram_id: Mapping[int, PsychologistIdentity]
+
+
+def _build_directory(psychologists: List[PsychologistIdentity]) -> Directory:
+    """
+    Построить снимок справочника.
+    
+    Психолог по умолчанию всегда входит в снимок с Telegram ID владельца.
+    
+    Args:
+        psychologists: Активные психологи
+    
+    Returns:
+        Directory: Неизменяемый снимок
+    """
+    by_id = {p.id: p for p in psychologists}
+    default = by_id.get(DEFAULT_PSYCHOLOGIST_ID)
+    by_id[DEFAULT_PSYCHOLOGIST_ID] = PsychologistIdentity(
+        DEFAULT_PSYCHOLOGIST_ID,
+        PSYCHOLOGIST_ID,
+        default.full_name if default else DEFAULT_PSYCHOLOGIST_NAME
+    )
+    by_id = dict(sorted(by_id.items()))
+    return Directory(
+        MappingProxyType(by_id),
+        MappingProxyType({p.telegram_id: p for p in by_id.values()})
+    )
+
+
+_directory = _build_directory([])
+
+
+def get_psychologist(psychologist_id: int) -> Optional[PsychologistIdentity]:
+    """
+    Получить активного психолога по ID.
+    
+    Args:
+        psychologist_id: ID психолога
+    
+    Returns:
+        Optional[PsychologistIdentity]: Психолог или None, если его нет
+                                        или он больше не принимает
+    """
+    return _directory.by_id.get(psychologist_id)
+
+
+def psychologist_by_telegram_id(telegram_id: Optional[int]) -> Optional[PsychologistIdentity]:
+    """
+    Получить активного психолога по Telegram ID.
+    
+    Args:
+        telegram_id: Telegram ID пользователя
+    
+    Returns:
+        Optional[PsychologistIdentity]: Психолог или None, если пользователь
+                                        не психолог
+    """
+    return _directory.by_telegram_id.get(telegram_id)
+
+
+def is_psychologist(telegram_id: Optional[int]) -> bool:
+    """
+    Проверить, является ли пользователь активным психологом.
+    
+    Args:
+        telegram_id: Telegram ID пользователя
+    
+    Returns:
+        bool: True для психолога
+    """
+    return telegram_id in _directory.by_telegram_id
+
+
+def is_owner(telegram_id: Optional[int]) -> bool:
+    """
+    Проверить, является ли пользователь владельцем бота (PSYCHOLOGIST_ID).
+    
+    Args:
+        telegram_id: Telegram ID пользователя
+    
+    Returns:
+        bool: True для владельца
+    """
+    return telegram_id == PSYCHOLOGIST_ID
+
+
+def psychologist_telegram_id(psychologist_id: Optional[int]) -> int:
+    """
+    Получить Telegram ID психолога для уведомления.
+    
+    Args:
+        psychologist_id: ID психолога (None — психолог по умолчанию)
+    
+    Returns:
+        int: Telegram ID психолога; если психолог больше не активен —
+             Telegram ID владельца бота
+    """
+    psychologist = _directory.by_id.get(psychologist_id)
+    return psychologist.telegram_id if psychologist else PSYCHOLOGIST_ID
+
+
+def list_psychologists() -> List[PsychologistIdentity]:
+    """
+    Получить активных психологов в порядке ID.
+    
+    Returns:
+        List[PsychologistIdentity]: Психологи (психолог по умолчанию первый)
+    """
+    return list(_directory.by_id.values())
+
+
+async def load_psychologists(session: AsyncSession) -> Directory:
+    """
+    Загрузить активных психологов из БД и атомарно заменить снимок.
+    
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+    
+    Returns:
+        Directory: Новый снимок справочника
+    """
+    global _directory
+    query = await session.execute(
+        select(
+            Psychologist.id,
+            Psychologist.telegram_id,
+            Psychologist.full_name
+        ).where(Psychologist.is_active.is_(True))
+    )
+    directory = _build_directory([PsychologistIdentity(*row) for row in query.all()])
+    _directory = directory
+    return directory
+
+
+async def refresh_psychologists() -> Directory:
+    """
+    Перечитать справочник в сессии get_session().
+    
+    Вызывается при запуске бота и после изменения состава психологов.
+    Из обработчика справочник читается в сессии текущего обновления
+    (изменения к этому моменту уже зафиксированы), вне обработки
+    обновления — в собственной сессии.
+    
+    Returns:
+        Directory: Новый снимок справочника
+    """
+    directory = _directory
+    async for session in get_session():
+        directory = await load_psychologists(session)
+    return directory
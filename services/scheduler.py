@@ -2,221 +2,655 @@
 Планировщик автоматических напоминаний и уведомлений.
 
 Управляет отправкой напоминаний клиентам о предстоящих записях
-и ежедневным дайджестом для психолога. Использует APScheduler
+и ежедневным дайджестом для каждого психолога. Использует APScheduler
 для планирования задач.
+
+Задачи напоминаний создаются, переносятся и удаляются в момент записи,
+переноса или отмены приёма (schedule_appointment_reminders /
+cancel_appointment_reminders). Идентификаторы задач детерминированы
+по ID записи, а сами задачи хранятся в таблице apscheduler_jobs
+и переживают перезапуск бота. Хранилище задач синхронное и для SQLite
+делит файл с ботом, поэтому его запись и удаление выполняются в потоке
+(asyncio.to_thread): ожидание блокировки файла не останавливает цикл
+событий и обработку других обновлений.
+
+Каждое отправленное напоминание фиксируется в таблице reminder_log,
+уникальной по паре (запись, вид напоминания), поэтому одно напоминание
+не уходит дважды. Напоминания, пропущенные за время простоя, отправляет
+догоняющая рассылка (dispatch_due_reminders) при запуске и затем
+раз в REMINDER_DISPATCH_INTERVAL. Она же повторяет напоминания, отправка
+которых завершилась ошибкой или прервалась падением процесса.
 """
+import asyncio
 import logging
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta, time, date
+from typing import Any, Dict, List, Optional, Tuple
 
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, and_, insert, not_, or_, select, update, Select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
 
-from database.session import get_session
-from database.models import Appointment, Client
-from config import PSYCHOLOGIST_ID
+from keyboards.callbacks import REMINDER_ANSWER
+from database.session import get_session, pool_stats
+from database.models import Appointment, Client, ReminderLog
+from services.outbound import outbound
+from services.psychologists import list_psychologists
+from config import JOBSTORE_DB_URL, DB_SQLITE_BUSY_TIMEOUT
 
 scheduler = AsyncIOScheduler()
 
+REMINDER_TIME = time(hour=7, minute=30)
+DIGEST_JOB_ID = "daily_digest"
+DISPATCH_JOB_ID = "reminder_dispatch"
+
+# Виды напоминаний (столбец reminder_log.kind)
+REMINDER_24H = "24h"
+REMINDER_DAY = "day"
+
+# Окно догоняющей рассылки и период её повторного запуска
+REMINDER_WINDOW = timedelta(hours=24)
+REMINDER_DISPATCH_INTERVAL = timedelta(minutes=10)
+# Захват без результата отправки старше этого срока считается брошенным
+# (процесс упал во время отправки), и напоминание захватывается заново
+REMINDER_CLAIM_TIMEOUT = timedelta(minutes=15)
+
+
+def reminder_24h_job_id(appointment_id: int) -> str:
+    """Идентификатор задачи напоминания за 24 часа."""
+    return f"reminder_24h:{appointment_id}"
 
-async def send_missed_day_reminders(bot: Bot) -> None:
+
+def reminder_day_job_id(appointment_id: int) -> str:
+    """Идентификатор задачи утреннего напоминания в день приёма."""
+    return f"reminder_day:{appointment_id}"
+
+
+def appointments_for_day_query(day: date, unconfirmed_only: bool = False) -> Select:
     """
-    Отправить пропущенные напоминания о записях на сегодня.
+    Построить запрос актуальных записей на указанный день.
     
-    Вызывается при запуске бота для отправки напоминаний
-    о записях на сегодня, если бот был выключен.
+    Использует индекс ix_appointments_date_time_status.
     
     Args:
-        bot: Экземпляр бота для отправки сообщений
+        day: Дата
+        unconfirmed_only: Только записи, на которые клиент ещё не ответил
+    
+    Returns:
+        Select: Запрос записей, упорядоченных по времени
     """
-    async for session in get_session():
-        now = datetime.now()
-        today = now.date()
-        query = await session.execute(
-            select(Appointment).where(
-                Appointment.date_time >= datetime.combine(today, datetime.min.time()),
-                Appointment.date_time <= datetime.combine(today, datetime.max.time()),
-                Appointment.status.in_(["active", "confirmed"]),
-                Appointment.confirmed == None
-            ).order_by(Appointment.date_time)
-        )
-        appointments = query.scalars().all()
-        for appointment in appointments:
-            if appointment.date_time <= now:
-                continue
-            client = await session.get(Client, appointment.client_id)
-            if not client or not getattr(client, 'telegram_id', None):
-                continue
-            msg = (
-                f"👋 Напоминаем:\n"
-                f"Сегодня у вас запись в <b>{appointment.date_time.strftime('%H:%M')}</b>.\n"
-                f"Пожалуйста, подтвердите, что всё в силе."
-            )
-            kb = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="✅ Да", callback_data=f"confirm_{appointment.id}_yes")],
-                [InlineKeyboardButton(text="❌ Отменить", callback_data=f"confirm_{appointment.id}_no")]
-            ])
-            try:
-                await bot.send_message(chat_id=client.telegram_id, text=msg, reply_markup=kb, parse_mode="HTML")
-            except Exception as e:
-                logging.error(f"Ошибка отправки напоминания клиенту: {e}")
+    query = select(Appointment).where(
+        Appointment.date_time >= datetime.combine(day, datetime.min.time()),
+        Appointment.date_time <= datetime.combine(day, datetime.max.time()),
+        Appointment.status.in_(["active", "confirmed"])
+    )
+    if unconfirmed_only:
+        query = query.where(Appointment.confirmed == None)
+    return query.order_by(Appointment.date_time)
+
 
-async def send_reminder(bot: Bot, appointment_id: int) -> None:
+def reminder_due_time(kind: str, date_time: datetime) -> datetime:
     """
-    Отправить напоминание клиенту за 24 часа до записи.
+    Плановое время отправки напоминания.
     
-    Отправляет сообщение с кнопками подтверждения/отмены записи.
+    Args:
+        kind: Вид напоминания (REMINDER_24H или REMINDER_DAY)
+        date_time: Дата и время приёма
+    
+    Returns:
+        datetime: Когда напоминание должно уйти
+    """
+    if kind == REMINDER_24H:
+        return date_time - timedelta(hours=24)
+    return datetime.combine(date_time.date(), REMINDER_TIME)
+
+
+def _is_reminder_due(
+    kind: str,
+    date_time: datetime,
+    booked_at: Optional[datetime],
+    now: datetime
+) -> bool:
+    """
+    Проверить, что напоминание положено и его срок уже наступил.
+    
+    Напоминание не положено, если его срок наступил раньше, чем запись
+    была оформлена (например, запись на завтра сделана сегодня вечером),
+    или если оно пришлось бы на время после начала приёма.
     
     Args:
-        bot: Экземпляр бота для отправки сообщений
-        appointment_id: ID записи для напоминания
+        kind: Вид напоминания
+        date_time: Дата и время приёма
+        booked_at: Время оформления записи (None - неизвестно)
+        now: Текущее время
+    
+    Returns:
+        bool: True, если напоминание нужно отправить сейчас
     """
-    async for session in get_session():
-        appointment = await session.get(Appointment, appointment_id)
-        if not appointment or appointment.confirmed is not None:
-            return
-        client = await session.get(Client, appointment.client_id)
-        if not client or not getattr(client, 'telegram_id', None):
-            return
+    due_at = reminder_due_time(kind, date_time)
+    if booked_at is not None and booked_at > due_at:
+        return False
+    return due_at <= now < date_time
+
+
+def _build_reminder(
+    kind: str,
+    appointment_id: int,
+    date_time: datetime
+) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Сформировать текст и клавиатуру напоминания.
+    
+    Args:
+        kind: Вид напоминания
+        appointment_id: ID записи
+        date_time: Дата и время приёма
+    
+    Returns:
+        Tuple[str, InlineKeyboardMarkup]: Текст сообщения и кнопки ответа
+    """
+    if kind == REMINDER_24H:
         msg = (
             f"📅 Напоминание:\n"
-            f"Вы записаны на <b>{appointment.date_time.strftime('%d.%m.%Y в %H:%M')}</b>\n"
+            f"Вы записаны на <b>{date_time.strftime('%d.%m.%Y в %H:%M')}</b>\n"
             f"Подтвердите, пожалуйста своё посещение."
         )
-        kb = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Да", callback_data=f"confirm_{appointment.id}_yes")],
-            [InlineKeyboardButton(text="❌ Нет", callback_data=f"confirm_{appointment.id}_no")]
-        ])
-        try:
-            await bot.send_message(chat_id=client.telegram_id, text=msg, reply_markup=kb, parse_mode="HTML")
-        except Exception as e:
-            logging.error(f"Ошибка отправки напоминания клиенту: {e}")
+        no_text = "❌ Нет"
+    else:
+        msg = (
+            f"👋 Напоминаем:\n"
+            f"Сегодня у вас запись в <b>{date_time.strftime('%H:%M')}</b>.\n"
+            f"Пожалуйста, подтвердите, что всё в силе."
+        )
+        no_text = "❌ Отменить"
+    kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="✅ Да", callback_data=REMINDER_ANSWER.pack(appointment_id, True))],
+        [InlineKeyboardButton(text=no_text, callback_data=REMINDER_ANSWER.pack(appointment_id, False))]
+    ])
+    return msg, kb
 
-async def send_day_of_reminder(bot: Bot, appointment_id: int) -> None:
+
+def _reminder_retryable(log: Any, now: datetime) -> ColumnElement:
     """
-    Отправить утреннее напоминание в день приёма.
+    Условие: строка журнала не мешает снова захватить напоминание.
     
-    Отправляется в 7:30 утра в день записи.
+    Напоминание не отправлено, и либо отправка завершилась ошибкой,
+    либо захват старше REMINDER_CLAIM_TIMEOUT.
     
     Args:
-        bot: Экземпляр бота для отправки сообщений
-        appointment_id: ID записи для напоминания
+        log: Таблица журнала (ReminderLog или её псевдоним)
+        now: Текущее время
+    
+    Returns:
+        ColumnElement: Условие для WHERE или ON
+    """
+    return and_(
+        log.sent_at == None,
+        or_(
+            log.error != None,
+            log.claimed_at == None,
+            log.claimed_at < now - REMINDER_CLAIM_TIMEOUT
+        )
+    )
+
+
+async def _claim_reminder(
+    session: AsyncSession,
+    kind: str,
+    appointment_id: int,
+    due_at: datetime
+) -> bool:
+    """
+    Захватить напоминание в журнале перед отправкой.
+    
+    Строка журнала вставляется и фиксируется до отправки. Если строка
+    уже есть, напоминание перехватывается условным UPDATE только тогда,
+    когда прошлая отправка завершилась ошибкой или её захват устарел;
+    отправленное или отправляемое параллельно напоминание пропускается.
+    
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        kind: Вид напоминания
+        appointment_id: ID записи
+        due_at: Плановое время отправки
+    
+    Returns:
+        bool: True, если напоминание захвачено этим вызовом
+    """
+    now = datetime.now()
+    try:
+        await session.execute(
+            insert(ReminderLog).values(
+                appointment_id=appointment_id,
+                kind=kind,
+                due_at=due_at,
+                claimed_at=now
+            )
+        )
+        await session.commit()
+        return True
+    except IntegrityError:
+        await session.rollback()
+    result = await session.execute(
+        update(ReminderLog)
+        .where(
+            ReminderLog.appointment_id == appointment_id,
+            ReminderLog.kind == kind,
+            _reminder_retryable(ReminderLog, now)
+        )
+        .values(due_at=due_at, claimed_at=now, error=None)
+    )
+    if result.rowcount != 1:
+        await session.rollback()
+        return False
+    await session.commit()
+    logging.info(f"Повторная отправка напоминания {kind} по записи {appointment_id}")
+    return True
+
+
+async def _send_reminder_message(
+    kind: str,
+    appointment_id: int,
+    date_time: datetime,
+    chat_id: int
+) -> Dict[str, Any]:
+    """
+    Отправить захваченное напоминание через очередь исходящих сообщений.
+    
+    Args:
+        kind: Вид напоминания
+        appointment_id: ID записи
+        date_time: Дата и время приёма
+        chat_id: Telegram ID клиента
+    
+    Returns:
+        Dict[str, Any]: Значения для строки журнала — время отправки
+                        и опоздание либо текст ошибки
+    """
+    due_at = reminder_due_time(kind, date_time)
+    msg, kb = _build_reminder(kind, appointment_id, date_time)
+    try:
+        await outbound.send(chat_id, msg, reply_markup=kb, parse_mode="HTML")
+    except Exception as e:
+        logging.error(f"Ошибка отправки напоминания {kind} по записи {appointment_id}: {e}")
+        return {"error": str(e)[:256]}
+    sent_at = datetime.now()
+    lag = sent_at - due_at
+    logging.info(
+        f"Напоминание {kind} по записи {appointment_id} отправлено, "
+        f"опоздание {lag.total_seconds():.0f} с"
+    )
+    return {"sent_at": sent_at, "lag_seconds": int(lag.total_seconds())}
+
+
+async def _record_delivery(
+    session: AsyncSession,
+    kind: str,
+    appointment_id: int,
+    values: Dict[str, Any]
+) -> None:
+    """
+    Записать результат отправки в журнал напоминаний.
+    
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        kind: Вид напоминания
+        appointment_id: ID записи
+        values: Результат _send_reminder_message
+    """
+    await session.execute(
+        update(ReminderLog)
+        .where(
+            ReminderLog.appointment_id == appointment_id,
+            ReminderLog.kind == kind
+        )
+        .values(**values)
+    )
+    await session.commit()
+
+
+async def deliver_reminder(appointment_id: int, kind: str) -> bool:
+    """
+    Отправить одно напоминание по записи, если оно ещё положено.
+    
+    Не отправляется, если запись отменена, уже прошла, клиент уже
+    ответил или напоминание уже отправлено либо отправляется другим
+    вызовом (см. _claim_reminder).
+    
+    Args:
+        appointment_id: ID записи
+        kind: Вид напоминания
+    
+    Returns:
+        bool: True, если напоминание отправлено
     """
     async for session in get_session():
-        appointment = await session.get(Appointment, appointment_id)
-        if not appointment:
-            return
-        client = await session.get(Client, appointment.client_id)
-        if not client or not getattr(client, 'telegram_id', None):
-            return
-        msg = (
-            f"👋 Напоминаем:\n"
-            f"Сегодня у вас запись в <b>{appointment.date_time.strftime('%H:%M')}</b>.\n"
-            f"Пожалуйста, подтвердите, что всё в силе."
+        query = await session.execute(
+            select(
+                Appointment.date_time,
+                Appointment.booked_at,
+                Client.telegram_id
+            )
+            .join(Client, Client.id == Appointment.client_id)
+            .where(
+                Appointment.id == appointment_id,
+                Appointment.status == "active",
+                Appointment.confirmed == None
+            )
+        )
+        row = query.first()
+        if not row or not row.telegram_id:
+            return False
+        if not _is_reminder_due(kind, row.date_time, row.booked_at, datetime.now()):
+            return False
+        due_at = reminder_due_time(kind, row.date_time)
+        if not await _claim_reminder(session, kind, appointment_id, due_at):
+            return False
+        values = await _send_reminder_message(
+            kind, appointment_id, row.date_time, row.telegram_id
         )
-        kb = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Да", callback_data=f"confirm_{appointment.id}_yes")],
-            [InlineKeyboardButton(text="❌ Отменить", callback_data=f"confirm_{appointment.id}_no")]
-        ])
-        try:
-            await bot.send_message(chat_id=client.telegram_id, text=msg, reply_markup=kb, parse_mode="HTML")
-        except Exception as e:
-            logging.error(f"Ошибка отправки утреннего напоминания клиенту: {e}")
+        await _record_delivery(session, kind, appointment_id, values)
+        return "sent_at" in values
+    return False
+
+
+async def send_reminder(appointment_id: int) -> None:
+    """
+    Отправить напоминание клиенту за 24 часа до записи.
+    
+    Args:
+        appointment_id: ID записи для напоминания
+    """
+    await deliver_reminder(appointment_id, REMINDER_24H)
+
+
+async def send_day_of_reminder(appointment_id: int) -> None:
+    """
+    Отправить утреннее напоминание в день приёма (7:30).
+    
+    Args:
+        appointment_id: ID записи для напоминания
+    """
+    await deliver_reminder(appointment_id, REMINDER_DAY)
 
-async def send_daily_digest(bot: Bot) -> None:
+
+def due_reminders_query(now: datetime) -> Select:
     """
-    Отправить утренний дайджест психологу.
+    Построить запрос записей скользящего окна напоминаний.
     
-    Формирует сводку всех записей на сегодня с отметками
-    о подтверждении клиентами. Отправляется в 7:30 утра.
+    Любое положенное, но ещё не отправленное напоминание относится к записи
+    в окне (now, now + 24 ч]: напоминание за сутки с наступившим сроком —
+    к записи не позже чем через 24 часа, утреннее — к записи на сегодня.
+    Отметки журнала по обоим видам присоединяются к той же выборке, если
+    они мешают отправке: напоминание отправлено или захвачено недавно
+    и без ошибки.
     
     Args:
-        bot: Экземпляр бота для отправки сообщений
+        now: Текущее время
+    
+    Returns:
+        Select: Запрос строк (id, date_time, booked_at, telegram_id,
+                log_24h_id, log_day_id)
+    """
+    log_24h = aliased(ReminderLog)
+    log_day = aliased(ReminderLog)
+    return (
+        select(
+            Appointment.id,
+            Appointment.date_time,
+            Appointment.booked_at,
+            Client.telegram_id,
+            log_24h.id.label("log_24h_id"),
+            log_day.id.label("log_day_id")
+        )
+        .join(Client, Client.id == Appointment.client_id)
+        .outerjoin(log_24h, and_(
+            log_24h.appointment_id == Appointment.id,
+            log_24h.kind == REMINDER_24H,
+            not_(_reminder_retryable(log_24h, now))
+        ))
+        .outerjoin(log_day, and_(
+            log_day.appointment_id == Appointment.id,
+            log_day.kind == REMINDER_DAY,
+            not_(_reminder_retryable(log_day, now))
+        ))
+        .where(
+            Appointment.date_time > now,
+            Appointment.date_time <= now + REMINDER_WINDOW,
+            Appointment.status == "active",
+            Appointment.confirmed == None,
+            Client.telegram_id != None
+        )
+        .order_by(Appointment.date_time)
+    )
+
+
+async def dispatch_due_reminders() -> int:
+    """
+    Догнать все положенные, но не отправленные напоминания.
+    
+    Вызывается при запуске бота и периодически планировщиком: находит
+    одним запросом напоминания, пропущенные за время простоя или из-за
+    сбоя задачи, а также те, отправка которых завершилась ошибкой или
+    прервалась, и отправляет их. Дважды одно напоминание не уйдёт —
+    журнал напоминаний проверяется и в запросе, и при захвате.
+    
+    Returns:
+        int: Количество отправленных напоминаний
+    """
+    sent = 0
+    async for session in get_session():
+        now = datetime.now()
+        query = await session.execute(due_reminders_query(now))
+        claimed = []
+        for row in query.all():
+            for kind, log_id in ((REMINDER_24H, row.log_24h_id), (REMINDER_DAY, row.log_day_id)):
+                if log_id is not None:
+                    continue
+                if not _is_reminder_due(kind, row.date_time, row.booked_at, now):
+                    continue
+                due_at = reminder_due_time(kind, row.date_time)
+                if await _claim_reminder(session, kind, row.id, due_at):
+                    claimed.append((kind, row.id, row.date_time, row.telegram_id))
+        # Все захваченные напоминания ставятся в очередь разом: скорость
+        # отправки ограничивает сама очередь исходящих сообщений
+        results = await asyncio.gather(*(
+            _send_reminder_message(*reminder) for reminder in claimed
+        ))
+        for (kind, appointment_id, _, _), values in zip(claimed, results):
+            await _record_delivery(session, kind, appointment_id, values)
+            if "sent_at" in values:
+                sent += 1
+    if sent:
+        logging.info(
+            f"Догоняющая рассылка: отправлено напоминаний — {sent}; "
+            f"пул БД: {pool_stats()}"
+        )
+    return sent
+
+
+async def send_daily_digest() -> None:
+    """
+    Отправить утренний дайджест каждому психологу.
+    
+    Формирует для каждого психолога сводку его записей на сегодня
+    с отметками о подтверждении клиентами. Записи всех психологов
+    загружаются вместе с клиентами одним запросом и раскладываются
+    по психологам в памяти, поэтому число запросов не зависит от числа
+    психологов. Отправляется в 7:30 утра.
     """
     async for session in get_session():
         today = datetime.now().date()
         query = await session.execute(
-            select(Appointment).where(
-                Appointment.date_time >= datetime.combine(today, datetime.min.time()),
-                Appointment.date_time <= datetime.combine(today, datetime.max.time()),
-                Appointment.status.in_(["active", "confirmed"])
-            ).order_by(Appointment.date_time)
+            appointments_for_day_query(today)
+            .options(joinedload(Appointment.client))
         )
-        appointments = query.scalars().all()
-        if not appointments:
-            await bot.send_message(chat_id=PSYCHOLOGIST_ID, text="📭 Сегодня нет приёмов.")
-            return
-        lines = []
-        for app in appointments:
-            client = await session.get(Client, app.client_id)
-            name = getattr(client, 'full_name', 'Неизвестный') if client else 'Неизвестный'
-            confirm_icon = "✅" if app.confirmed else "❓"
-            time_str = app.date_time.strftime("%H:%M")
-            lines.append(f"• {time_str} — {name} {confirm_icon}")
-        summary = f"🧠 <b>Сегодня у вас {len(appointments)} приёмов:</b>\n\n" + "\n".join(lines)
-        try:
-            await bot.send_message(chat_id=PSYCHOLOGIST_ID, text=summary, parse_mode="HTML")
-        except Exception as e:
-            logging.error(f"Ошибка отправки дайджеста психологу: {e}")
-
-def schedule_reminders(bot: Bot) -> None:
+        by_psychologist: Dict[int, list] = {}
+        for app in query.scalars().all():
+            by_psychologist.setdefault(app.psychologist_id, []).append(app)
+        for psychologist in list_psychologists():
+            appointments = by_psychologist.get(psychologist.id)
+            if not appointments:
+                summary = "📭 Сегодня нет приёмов."
+            else:
+                lines = []
+                for app in appointments:
+                    client = app.client
+                    name = getattr(client, 'full_name', 'Неизвестный') if client else 'Неизвестный'
+                    confirm_icon = "✅" if app.confirmed else "❓"
+                    time_str = app.date_time.strftime("%H:%M")
+                    lines.append(f"• {time_str} — {name} {confirm_icon}")
+                summary = f"🧠 <b>Сегодня у вас {len(appointments)} приёмов:</b>\n\n" + "\n".join(lines)
+            try:
+                await outbound.send(psychologist.telegram_id, summary, parse_mode="HTML")
+            except Exception as e:
+                logging.error(f"Ошибка отправки дайджеста психологу {psychologist.id}: {e}")
+
+
+async def schedule_appointment_reminders(appointment_id: int, date_time: datetime) -> None:
     """
-    Запустить планировщик напоминаний.
+    Создать или перенести задачи напоминаний для записи.
     
-    Инициализирует APScheduler и настраивает задачи:
-    - Проверка записей для напоминаний за 24 часа (каждый час)
-    - Проверка записей для утренних напоминаний
-    - Ежедневный дайджест для психолога (7:30)
+    Вызывается после записи и переноса. Задачи с уже прошедшим временем
+    запуска удаляются, поэтому повторный вызов после переноса корректно
+    перемещает напоминания. Хранилище задач обновляется в отдельном потоке.
     
     Args:
-        bot: Экземпляр бота для передачи в задачи
-    """
-    async def planner():
-        async for session in get_session():
-            now = datetime.now()
-            # Напоминания за 24 часа
-            in_24h_range_start = now + timedelta(hours=24)
-            in_24h_range_end = in_24h_range_start + timedelta(minutes=1)
-            query_24h = await session.execute(
-                select(Appointment).where(
-                    Appointment.date_time.between(in_24h_range_start, in_24h_range_end),
-                    Appointment.status.in_(["active", "confirmed"]),
-                    Appointment.confirmed == None
-                )
+        appointment_id: ID записи
+        date_time: Дата и время приёма
+    """
+    await asyncio.to_thread(_schedule_reminder_jobs, appointment_id, date_time)
+
+
+def _schedule_reminder_jobs(appointment_id: int, date_time: datetime) -> None:
+    """Создать, перенести или удалить задачи напоминаний (синхронно)."""
+    now = datetime.now()
+    jobs = (
+        (reminder_24h_job_id(appointment_id), send_reminder,
+         date_time - timedelta(hours=24)),
+        (reminder_day_job_id(appointment_id), send_day_of_reminder,
+         datetime.combine(date_time.date(), REMINDER_TIME)),
+    )
+    for job_id, func, run_date in jobs:
+        if now < run_date < date_time:
+            scheduler.add_job(
+                func,
+                trigger="date",
+                run_date=run_date,
+                args=[appointment_id],
+                id=job_id,
+                replace_existing=True,
+                misfire_grace_time=None
             )
-            for appointment in query_24h.scalars().all():
-                scheduler.add_job(
-                    send_reminder,
-                    args=[bot, appointment.id],
-                    trigger="date",
-                    run_date=in_24h_range_start
-                )
-            # Утренние напоминания в день приёма
-            today = now.date()
-            query_today = await session.execute(
-                select(Appointment).where(
-                    Appointment.date_time >= datetime.combine(today, datetime.min.time()),
-                    Appointment.date_time <= datetime.combine(today, datetime.max.time()),
-                    Appointment.status.in_(["active", "confirmed"]),
-                    Appointment.confirmed == None
-                )
+        else:
+            _remove_job(job_id)
+
+
+async def cancel_appointment_reminders(appointment_id: int) -> None:
+    """
+    Удалить задачи напоминаний для отменённой записи.
+    
+    Хранилище задач обновляется в отдельном потоке.
+    
+    Args:
+        appointment_id: ID записи
+    """
+    await asyncio.to_thread(_cancel_reminder_jobs, appointment_id)
+
+
+def _cancel_reminder_jobs(appointment_id: int) -> None:
+    """Удалить задачи напоминаний записи (синхронно)."""
+    _remove_job(reminder_24h_job_id(appointment_id))
+    _remove_job(reminder_day_job_id(appointment_id))
+
+
+def _remove_job(job_id: str) -> None:
+    """Удалить задачу, если она существует."""
+    try:
+        scheduler.remove_job(job_id)
+    except JobLookupError:
+        pass
+
+
+async def restore_reminder_jobs() -> int:
+    """
+    Сверить задачи напоминаний с будущими записями.
+    
+    Вызывается один раз при запуске: создаёт задачи для записей,
+    появившихся до перехода на событийное планирование или в обход бота.
+    Благодаря детерминированным ID существующие задачи не дублируются.
+    Все задачи записываются в хранилище одним вызовом в отдельном потоке.
+    
+    Returns:
+        int: Количество обработанных записей
+    """
+    rows = []
+    async for session in get_session():
+        query = await session.execute(
+            select(Appointment.id, Appointment.date_time).where(
+                Appointment.date_time > datetime.now(),
+                Appointment.status == "active",
+                Appointment.confirmed == None
             )
-            for appointment in query_today.scalars().all():
-                run_time = datetime.combine(today, time(hour=7, minute=30))
-                if run_time > now:
-                    scheduler.add_job(
-                        send_day_of_reminder,
-                        args=[bot, appointment.id],
-                        trigger="date",
-                        run_date=run_time
-                    )
-        scheduler.add_job(
-            send_daily_digest,
-            args=[bot],
-            trigger="cron",
-            hour=7,
-            minute=30
         )
-    scheduler.add_job(planner, "interval", minutes=60)
+        rows = query.all()
+    await asyncio.to_thread(_restore_reminder_jobs, rows)
+    return len(rows)
+
+
+def _restore_reminder_jobs(rows: List[Tuple[int, datetime]]) -> None:
+    """Создать задачи напоминаний для пар (ID записи, время приёма) (синхронно)."""
+    for appointment_id, date_time in rows:
+        _schedule_reminder_jobs(appointment_id, date_time)
+
+
+def create_jobstore() -> SQLAlchemyJobStore:
+    """
+    Создать постоянное хранилище задач в базе JOBSTORE_DB_URL.
+    
+    Для SQLite хранилище работает с тем же файлом, что и бот, поэтому
+    ждёт освобождения блокировки записи так же, как основной движок.
+    
+    Returns:
+        SQLAlchemyJobStore: Хранилище задач APScheduler
+    """
+    engine_options = {}
+    if JOBSTORE_DB_URL.startswith("sqlite"):
+        engine_options["connect_args"] = {"timeout": DB_SQLITE_BUSY_TIMEOUT}
+    return SQLAlchemyJobStore(url=JOBSTORE_DB_URL, engine_options=engine_options)
+
+
+def schedule_reminders() -> None:
+    """
+    Запустить планировщик напоминаний.
+    
+    Подключает постоянное хранилище задач и настраивает ежедневный
+    дайджест для психолога (7:30) и периодическую догоняющую рассылку.
+    Задачи напоминаний клиентам создаются обработчиками записи,
+    переноса и отмены. Сообщения из задач отправляются через очередь
+    исходящих сообщений (services/outbound.py), поэтому в аргументы задач,
+    хранящихся в БД, попадает только ID записи.
+    """
+    scheduler.configure(
+        jobstores={"default": create_jobstore()}
+    )
+    scheduler.add_job(
+        send_daily_digest,
+        trigger="cron",
+        hour=REMINDER_TIME.hour,
+        minute=REMINDER_TIME.minute,
+        id=DIGEST_JOB_ID,
+        replace_existing=True
+    )
+    scheduler.add_job(
+        dispatch_due_reminders,
+        trigger="interval",
+        seconds=int(REMINDER_DISPATCH_INTERVAL.total_seconds()),
+        id=DISPATCH_JOB_ID,
+        replace_existing=True
+    )
     scheduler.start()
@@ -4,17 +4,553 @@
 Модуль предоставляет функции для определения свободных дней и времени,
 когда клиенты могут записаться на приём к психологу, с учётом рабочего
 расписания, существующих записей и вручную закрытых слотов.
+
+Свободные слоты вычисляются в памяти: рабочее расписание берётся из
+резидентного снимка (services.work_schedule), а расчёт всего горизонта
+выполняет два запроса (записи, закрытые интервалы) в одной сессии,
+независимо от продолжительности рабочего дня и количества дней.
+
+Услуги длятся разное время (services.catalog): слот свободен, если приём
+выбранной услуги вместе с перерывом после него не пересекается ни с одной
+активной записью (с её перерывом) и ни с одним закрытым интервалом.
+Занятые интервалы дня собираются в IntervalIndex, который отвечает
+на вопрос о пересечении за O(log n) на каждое время-кандидат.
+
+Индексы занятости кэшируются по психологам и датам, свободные слоты —
+по датам и услугам. Кэш каждого психолога — отдельный раздел со своей
+версией: запросы, загрузка и сброс затрагивают только раздел одного
+психолога, поэтому их стоимость не зависит от числа психологов.
+Обработчики, изменяющие записи, закрытые слоты или рабочее расписание,
+сбрасывают затронутые даты психолога через invalidate_dates /
+invalidate_range / invalidate_all.
 """
-from datetime import datetime, timedelta, date
-from typing import List, Tuple
+from bisect import bisect_left
+from datetime import datetime, timedelta, date, time
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Sequence, Optional
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, Select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.session import get_session
-from database.models import WorkSchedule, UnavailableSlot, Appointment
+from database.models import DEFAULT_PSYCHOLOGIST_ID, UnavailableSlot, Appointment
+from services.catalog import DEFAULT_SERVICE, MAX_BUSY, Service, get_service
+from services.work_schedule import (
+    get_schedule_snapshot,
+    load_schedule_snapshot
+)
+
+SLOT_STEP = timedelta(minutes=60)  # Шаг сетки начала приёмов
+
+
+class IntervalIndex:
+    """
+    Занятые интервалы [начало, конец) с поиском пересечения за O(log n).
+    
+    Интервалы объединяются и сортируются при построении, поэтому
+    пересечение с запросом возможно только у последнего интервала,
+    начинающегося раньше конца запроса; он находится бинарным поиском.
+    """
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals: Iterable[Tuple[datetime, datetime]]) -> None:
+        merged = _merge_intervals(list(intervals))
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """
+        Проверить, пересекает ли [start, end) хотя бы один интервал.
+        
+        Args:
+            start: Начало проверяемого интервала
+            end: Конец проверяемого интервала
+        
+        Returns:
+            bool: True, если интервал пересекается с занятым временем
+        """
+        index = bisect_left(self.starts, end) - 1
+        return index >= 0 and self.ends[index] > start
+
+
+class DayAvailability(NamedTuple):
+    """
+    Занятость рабочего дня.
+    
+    Attributes:
+        window_start (datetime): Начало рабочего дня
+        window_end (datetime): Конец рабочего дня
+        busy (IntervalIndex): Записи с перерывами и закрытые интервалы
+        slots (Dict[str, List[str]]): Рассчитанные свободные слоты по кодам
+            услуг без учёта прошедшего времени (заполняется по запросу)
+    """
+    window_start: datetime
+    window_end: datetime
+    busy: IntervalIndex
+    slots: Dict[str, List[str]]
+
+
+# Кэш доступности: психолог -> дата -> занятость дня (None — нерабочий день)
+_cache: Dict[int, Dict[date, Optional[DayAvailability]]] = {}
+# Версии разделов кэша по психологам и версия сбросов всех разделов сразу
+_tenant_versions: Dict[int, int] = {}
+_all_version = 0
+_cache_version = 0
+_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def availability_version() -> int:
+    """
+    Получить текущую версию кэша доступности.
+    
+    Версия увеличивается при каждом сбросе кэша любого психолога, поэтому
+    её можно использовать как ключ для производных кэшей.
+    
+    Returns:
+        int: Номер версии
+    """
+    return _cache_version
+
+
+def _partition_version(psychologist_id: int) -> Tuple[int, int]:
+    """
+    Получить версию раздела кэша психолога.
+    
+    Args:
+        psychologist_id: ID психолога
+    
+    Returns:
+        Tuple[int, int]: Версия сбросов всех разделов и версия раздела
+    """
+    return _all_version, _tenant_versions.get(psychologist_id, 0)
+
+
+def _bump(psychologist_id: Optional[int]) -> None:
+    """
+    Увеличить версии кэша после сброса.
+    
+    Args:
+        psychologist_id: Психолог, раздел которого сброшен (None — все)
+    """
+    global _all_version, _cache_version
+    if psychologist_id is None:
+        _all_version += 1
+    else:
+        _tenant_versions[psychologist_id] = _tenant_versions.get(psychologist_id, 0) + 1
+    _cache_version += 1
+    _cache_stats["invalidations"] += 1
+
+
+def invalidate_dates(*dates: date, psychologist_id: Optional[int] = None) -> None:
+    """
+    Сбросить кэш доступности для указанных дат.
+    
+    Вызывается после фиксации изменений записей на эти даты.
+    
+    Args:
+        *dates: Даты, доступность которых изменилась
+        psychologist_id: Психолог, у которого изменились записи
+                         (None — даты всех психологов)
+    """
+    if psychologist_id is None:
+        partitions = list(_cache.values())
+    else:
+        partitions = [_cache.get(psychologist_id, {})]
+    for partition in partitions:
+        for day in dates:
+            partition.pop(day, None)
+    _bump(psychologist_id)
+
+
+def invalidate_range(
+    start: datetime,
+    end: datetime,
+    psychologist_id: Optional[int] = None
+) -> None:
+    """
+    Сбросить кэш доступности для всех дат интервала [start, end].
+    
+    Args:
+        start: Начало изменённого интервала
+        end: Конец изменённого интервала
+        psychologist_id: Психолог, у которого изменился интервал
+                         (None — все психологи)
+    """
+    first, last = sorted((start.date(), end.date()))
+    invalidate_dates(
+        *(
+            first + timedelta(days=offset)
+            for offset in range((last - first).days + 1)
+        ),
+        psychologist_id=psychologist_id
+    )
+
+
+def invalidate_all(psychologist_id: Optional[int] = None) -> None:
+    """
+    Полностью сбросить кэш доступности психолога.
+    
+    Используется при изменении рабочего расписания, которое влияет
+    на все даты сразу.
+    
+    Args:
+        psychologist_id: Психолог, расписание которого изменилось
+                         (None — все психологи)
+    """
+    if psychologist_id is None:
+        _cache.clear()
+    else:
+        _cache.pop(psychologist_id, None)
+    _bump(psychologist_id)
+
+
+def cache_stats() -> Dict[str, int]:
+    """
+    Получить статистику кэша доступности.
+    
+    Returns:
+        Dict[str, int]: Попадания и промахи (по датам), количество сбросов,
+                        текущая версия, число психологов в кэше
+                        и число закэшированных дат
+    """
+    return {
+        **_cache_stats,
+        "version": _cache_version,
+        "tenants": len(_cache),
+        "size": sum(len(partition) for partition in _cache.values()),
+    }
+
+
+def _merge_intervals(
+    intervals: Sequence[Tuple[datetime, datetime]]
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Объединить пересекающиеся интервалы [начало, конец).
+    
+    Args:
+        intervals: Произвольный набор интервалов
+    
+    Returns:
+        List[Tuple[datetime, datetime]]: Отсортированные непересекающиеся
+                                         интервалы
+    """
+    merged: List[Tuple[datetime, datetime]] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def appointment_busy_until(
+    date_time: datetime,
+    service: str,
+    busy_until: Optional[datetime] = None
+) -> datetime:
+    """
+    Получить момент, до которого запись занимает расписание.
+    
+    Args:
+        date_time: Начало приёма
+        service: Код услуги
+        busy_until: Сохранённый конец приёма с перерывом (None — вычислить
+                    по каталогу услуг)
+    
+    Returns:
+        datetime: Конец приёма вместе с перерывом после него
+    """
+    return busy_until or date_time + get_service(service).busy
+
+
+def compute_free_slots(
+    day: DayAvailability,
+    service: Service,
+    now: Optional[datetime] = None
+) -> List[str]:
+    """
+    Вычислить свободные слоты дня для услуги без обращения к базе данных.
+    
+    Время-кандидат берётся по сетке SLOT_STEP от начала рабочего дня.
+    Приём должен закончиться до конца рабочего дня, а приём вместе
+    с перерывом — не пересекаться с занятыми интервалами.
+    
+    Args:
+        day: Занятость рабочего дня
+        service: Услуга, на которую ищется время
+        now: Текущий момент; если задан, из слотов сегодняшнего дня
+             исключается прошедшее время
+    
+    Returns:
+        List[str]: Свободное время в формате "HH:MM"
+    """
+    current = day.window_start
+    last_start = day.window_end - service.duration
+    skip_past = now is not None and current.date() == now.date()
+    slots = []
+    
+    while current <= last_start:
+        is_past = skip_past and current.time() <= now.time()
+        if not is_past and not day.busy.overlaps(current, current + service.busy):
+            slots.append(current.strftime("%H:%M"))
+        current += SLOT_STEP
+    
+    return slots
+
+
+def booked_slots_query(
+    start: datetime,
+    end: datetime,
+    psychologist_id: int = DEFAULT_PSYCHOLOGIST_ID
+) -> Select:
+    """
+    Построить запрос активных записей психолога, занимающих время в [start, end).
+    
+    Запись, начавшаяся до start, может ещё продолжаться, поэтому начало
+    диапазона сдвинуто на наибольшую продолжительность услуги (MAX_BUSY).
+    Использует частичный индекс ux_appointments_tenant_active_slot.
+    
+    Args:
+        start: Начало интервала
+        end: Конец интервала
+        psychologist_id: ID психолога
+    
+    Returns:
+        Select: Запрос начала, конца с перерывом и кода услуги записей
+    """
+    return select(
+        Appointment.date_time,
+        Appointment.busy_until,
+        Appointment.service
+    ).where(
+        and_(
+            Appointment.psychologist_id == psychologist_id,
+            Appointment.date_time > start - MAX_BUSY,
+            Appointment.date_time < end,
+            Appointment.status == "active"
+        )
+    )
+
+
+def closures_query(
+    start: datetime,
+    end: datetime,
+    psychologist_id: int = DEFAULT_PSYCHOLOGIST_ID
+) -> Select:
+    """
+    Построить запрос закрытых интервалов психолога, пересекающих [start, end).
+    
+    Использует индекс ix_unavailable_slots_tenant_range.
+    
+    Args:
+        start: Начало интервала
+        end: Конец интервала
+        psychologist_id: ID психолога
+    
+    Returns:
+        Select: Запрос пар (начало, конец) закрытых интервалов
+    """
+    return select(
+        UnavailableSlot.date_time_start,
+        UnavailableSlot.date_time_end
+    ).where(
+        and_(
+            UnavailableSlot.psychologist_id == psychologist_id,
+            UnavailableSlot.date_time_start < end,
+            UnavailableSlot.date_time_end > start
+        )
+    )
+
+
+async def load_calendar(
+    session: AsyncSession,
+    start_date: date,
+    days: int,
+    psychologist_id: int = DEFAULT_PSYCHOLOGIST_ID
+) -> Dict[date, DayAvailability]:
+    """
+    Построить занятость рабочих дней горизонта за одно обращение к БД.
+    
+    Загружает активные записи и закрытые интервалы психолога на весь
+    горизонт двумя запросами и строит по ним IntervalIndex каждого
+    рабочего дня по снимку рабочего расписания. Если снимок ещё
+    не загружен, он загружается в этой же сессии.
+    
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        start_date: Первый день горизонта
+        days: Количество дней в горизонте
+        psychologist_id: ID психолога
+    
+    Returns:
+        Dict[date, DayAvailability]: Занятость по датам (в порядке дат);
+                                     нерабочие дни в словарь не попадают
+    """
+    schedules = get_schedule_snapshot(psychologist_id)
+    if schedules is None:
+        await load_schedule_snapshot(session)
+        schedules = get_schedule_snapshot(psychologist_id)
+    if not schedules or days <= 0:
+        return {}
+    
+    horizon_start = datetime.combine(start_date, time.min)
+    horizon_end = horizon_start + timedelta(days=days)
+    
+    booked_q = await session.execute(
+        booked_slots_query(horizon_start, horizon_end, psychologist_id)
+    )
+    busy = [
+        (date_time, appointment_busy_until(date_time, service, busy_until))
+        for date_time, busy_until, service in booked_q.all()
+    ]
+    closures_q = await session.execute(
+        closures_query(horizon_start, horizon_end, psychologist_id)
+    )
+    busy.extend(tuple(row) for row in closures_q.all())
+    
+    calendar: Dict[date, DayAvailability] = {}
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        schedule = schedules.get(day.weekday())
+        if not schedule:
+            continue
+        window_start = datetime.combine(day, schedule.start_time)
+        window_end = datetime.combine(day, schedule.end_time)
+        calendar[day] = DayAvailability(
+            window_start,
+            window_end,
+            IntervalIndex(
+                (start, end) for start, end in busy
+                if start < window_end and end > window_start
+            ),
+            {}
+        )
+    return calendar
+
+
+def _drop_past(day: date, slots: List[str], now: datetime) -> List[str]:
+    """
+    Исключить прошедшие слоты, если дата — сегодня.
+    
+    Args:
+        day: Дата слотов
+        slots: Слоты в формате "HH:MM"
+        now: Текущий момент
+    
+    Returns:
+        List[str]: Слоты, которые ещё не наступили
+    """
+    if day != now.date():
+        return list(slots)
+    current = now.strftime("%H:%M")
+    return [slot for slot in slots if slot > current]
+
+
+def _day_slots(day: DayAvailability, service: Service) -> List[str]:
+    """
+    Получить свободные слоты дня для услуги, рассчитав их при первом запросе.
+    
+    Args:
+        day: Занятость рабочего дня
+        service: Услуга
+    
+    Returns:
+        List[str]: Свободное время без учёта прошедшего
+    """
+    slots = day.slots.get(service.code)
+    if slots is None:
+        slots = day.slots[service.code] = compute_free_slots(day, service)
+    return slots
+
+
+async def get_calendar(
+    days_ahead: int = 10,
+    start_date: Optional[date] = None,
+    service: str = DEFAULT_SERVICE,
+    psychologist_id: int = DEFAULT_PSYCHOLOGIST_ID
+) -> Dict[date, List[str]]:
+    """
+    Получить карту свободных слотов психолога «дата → слоты» на горизонт.
+    
+    Единая точка расчёта доступности для процессов записи, переноса
+    и ручной записи. Занятость дат берётся из раздела кэша психолога;
+    отсутствующие в кэше даты загружаются одним вызовом load_calendar
+    в одной сессии.
+    
+    Args:
+        days_ahead: Количество дней в горизонте (по умолчанию 10)
+        start_date: Первый день горизонта (по умолчанию сегодня)
+        service: Код услуги, продолжительность которой учитывается
+        psychologist_id: ID психолога
+    
+    Returns:
+        Dict[date, List[str]]: Свободные слоты по рабочим дням горизонта
+    
+    Example:
+        >>> calendar = await get_calendar(7, service="supervision")
+        >>> calendar[date(2025, 11, 5)]
+        ['10:00', '14:00']
+    """
+    today = date.today()
+    start_date = start_date or today
+    days = [start_date + timedelta(days=offset) for offset in range(days_ahead)]
+    
+    partition = _cache.get(psychologist_id, {})
+    entries = {day: partition[day] for day in days if day in partition}
+    missing = [day for day in days if day not in entries]
+    _cache_stats["hits"] += len(entries)
+    _cache_stats["misses"] += len(missing)
+    
+    if missing:
+        version = _partition_version(psychologist_id)
+        span = (missing[-1] - missing[0]).days + 1
+        loaded: Dict[date, DayAvailability] = {}
+        async for session in get_session():
+            loaded = await load_calendar(session, missing[0], span, psychologist_id)
+        for day in missing:
+            entries[day] = loaded.get(day)
+        # Пока шла загрузка, данные психолога могли измениться — такой
+        # результат отдаём вызывающему, но в кэш не кладём
+        if version == _partition_version(psychologist_id):
+            partition = _cache.setdefault(psychologist_id, {})
+            for stale in [day for day in partition if day < today]:
+                del partition[stale]
+            for day in missing:
+                partition[day] = entries[day]
+    
+    catalog_service = get_service(service)
+    now = datetime.now()
+    return {
+        day: _drop_past(day, _day_slots(entries[day], catalog_service), now)
+        for day in days
+        if entries[day] is not None
+    }
+
+
+def format_day_label(day: date, slots: Sequence[str]) -> str:
+    """
+    Сформировать текст кнопки выбора дня.
+    
+    Args:
+        day: Дата
+        slots: Свободные слоты этой даты
+    
+    Returns:
+        str: Метка вида "Mon, 05 Nov — 5 слотов"
+    """
+    return f"{day.strftime('%a, %d %b')} — {len(slots)} слотов"
 
 
-async def get_available_days(days_ahead: int = 10) -> List[Tuple[str, date]]:
+async def get_available_days(
+    days_ahead: int = 10,
+    service: str = DEFAULT_SERVICE,
+    psychologist_id: int = DEFAULT_PSYCHOLOGIST_ID
+) -> List[Tuple[str, date]]:
     """
     Получить список доступных для записи дней.
     
@@ -24,113 +560,63 @@ async def get_available_days(days_ahead: int = 10) -> List[Tuple[str, date]]:
     
     Args:
         days_ahead (int): Количество дней вперёд для проверки (по умолчанию 10)
-        
+        service (str): Код услуги, продолжительность которой учитывается
+        psychologist_id (int): ID психолога
+    
     Returns:
         List[Tuple[str, date]]: Список кортежей (текстовая метка, объект даты),
                                 где метка содержит день недели, дату и количество
                                 свободных слотов
-        
+    
     Example:
         >>> days = await get_available_days(7)
         >>> print(days)
         [('Mon, 05 Nov — 5 слотов', datetime.date(2025, 11, 5)), ...]
     """
-    today = date.today()
-    results = []
-    async for session in get_session():
-        for offset in range(days_ahead):
-            check_date = today + timedelta(days=offset)
-            weekday = check_date.weekday()
-            
-            # Проверяем наличие рабочего расписания на этот день недели
-            sched_q = await session.execute(
-                select(WorkSchedule).where(WorkSchedule.weekday == weekday)
-            )
-            sched = sched_q.scalar()
-            if not sched:
-                continue
-            
-            # Проверяем наличие свободных слотов
-            slots = await get_available_slots(check_date)
-            if slots:
-                label = f"{check_date.strftime('%a, %d %b')} — {len(slots)} слотов"
-                results.append((label, check_date))
-    return results
-
-
-async def get_available_slots(selected_date: date) -> List[str]:
+    calendar = await get_calendar(
+        days_ahead,
+        service=service,
+        psychologist_id=psychologist_id
+    )
+    return [
+        (format_day_label(day, slots), day)
+        for day, slots in calendar.items()
+        if slots
+    ]
+
+
+async def get_available_slots(
+    selected_date: date,
+    service: str = DEFAULT_SERVICE,
+    psychologist_id: int = DEFAULT_PSYCHOLOGIST_ID
+) -> List[str]:
     """
     Получить список свободных временных слотов на указанную дату.
     
     Проверяет рабочее расписание психолога на выбранный день недели,
     затем фильтрует слоты с учётом:
     - Прошедшего времени (если дата = сегодня)
-    - Существующих активных записей
+    - Продолжительности услуги и перерыва после неё
+    - Существующих активных записей (с их перерывами)
     - Вручную заблокированных слотов (отпуск, личные дела)
     
     Args:
         selected_date (date): Дата для проверки доступных слотов
-        
+        service (str): Код услуги, продолжительность которой учитывается
+        psychologist_id (int): ID психолога
+    
     Returns:
         List[str]: Список строк с доступным временем в формате "HH:MM"
-        
+    
     Example:
         >>> slots = await get_available_slots(date(2025, 11, 5))
         >>> print(slots)
         ['10:00', '11:00', '14:00', '15:00']
     """
-    weekday = selected_date.weekday()
-    slots = []
-    
-    async for session in get_session():
-        # Получаем рабочее расписание для данного дня недели
-        schedule_q = await session.execute(
-            select(WorkSchedule).where(WorkSchedule.weekday == weekday)
-        )
-        schedule = schedule_q.scalar()
-        if not schedule:
-            return []
-        
-        start = datetime.combine(selected_date, schedule.start_time)
-        end = datetime.combine(selected_date, schedule.end_time)
-        now = datetime.now()
-        step = timedelta(minutes=60)  # Слоты по 60 минут
-        current = start
-        
-        while current < end:
-            # Пропускаем слоты в прошлом (если выбран сегодня)
-            if selected_date == now.date() and current.time() <= now.time():
-                current += step
-                continue
-            
-            # Проверяем наличие активной записи на это время
-            slot_taken_q = await session.execute(
-                select(Appointment).where(
-                    and_(
-                        Appointment.date_time == current,
-                        Appointment.status == "active"
-                    )
-                )
-            )
-            if slot_taken_q.scalar():
-                current += step
-                continue
-            
-            # Проверяем вручную закрытые слоты
-            busy_q = await session.execute(
-                select(UnavailableSlot).where(
-                    and_(
-                        UnavailableSlot.date_time_start <= current,
-                        UnavailableSlot.date_time_end > current
-                    )
-                )
-            )
-            if busy_q.scalar():
-                current += step
-                continue
-            
-            # Слот свободен — добавляем в список
-            slots.append(current.strftime("%H:%M"))
-            current += step
-    
-    return slots
+    calendar = await get_calendar(
+        1,
+        start_date=selected_date,
+        service=service,
+        psychologist_id=psychologist_id
+    )
+    return calendar.get(selected_date, [])
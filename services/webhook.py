@@ -0,0 +1,187 @@
+"""
+Приём обновлений Telegram через вебхук.
+
+Режим включается переменной BOT_MODE=webhook. Бот поднимает собственный
+aiohttp-сервер и регистрирует адрес WEBHOOK_BASE_URL + WEBHOOK_PATH
+в Telegram с секретным токеном. Обработчик запроса:
+
+1. сверяет заголовок X-Telegram-Bot-Api-Secret-Token с секретом;
+2. кладёт обновление в ограниченную очередь и сразу отвечает 200 —
+   Telegram не ждёт, пока отработают обработчики бота;
+3. если очередь переполнена, отвечает 503, и Telegram повторит доставку позже.
+
+Очередь разбирает фиксированное число обработчиков (WEBHOOK_WORKERS),
+поэтому одновременно обрабатывается не больше WEBHOOK_WORKERS обновлений.
+"""
+import asyncio
+import logging
+import secrets
+from typing import Dict, List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from services.metrics import register_collector
+from config import (
+    WEBHOOK_BASE_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_WORKERS,
+    WEBHOOK_QUEUE_SIZE
+)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookReceiver:
+    """
+    Приёмник обновлений: проверка секрета, очередь и пул обработчиков.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        dp: Dispatcher,
+        secret: str,
+        workers: int = WEBHOOK_WORKERS,
+        queue_size: int = WEBHOOK_QUEUE_SIZE
+    ) -> None:
+        """
+        Args:
+            bot: Экземпляр бота
+            dp: Диспетчер с зарегистрированными обработчиками
+            secret: Секретный токен, переданный Telegram в setWebhook
+            workers: Число одновременно обрабатываемых обновлений
+            queue_size: Максимальная длина очереди обновлений
+        """
+        self.bot = bot
+        self.dp = dp
+        self.secret = secret
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks: List[asyncio.Task] = []
+        self._stats = {"received": 0, "rejected": 0, "dropped": 0, "processed": 0, "failed": 0}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        Принять одно обновление от Telegram.
+        
+        Args:
+            request: HTTP-запрос Telegram
+        
+        Returns:
+            web.Response: 200 — обновление принято, 401 — неверный секрет,
+                          400 — некорректное тело, 503 — очередь переполнена
+        """
+        token = request.headers.get(SECRET_HEADER, "")
+        if not secrets.compare_digest(token, self.secret):
+            self._stats["rejected"] += 1
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception as e:
+            logging.error(f"Некорректное обновление от Telegram: {e}")
+            return web.Response(status=400)
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            logging.warning("Очередь обновлений переполнена, Telegram повторит доставку")
+            return web.Response(status=503)
+        self._stats["received"] += 1
+        return web.Response()
+
+    def start(self) -> None:
+        """Запустить пул обработчиков обновлений."""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker())
+                for _ in range(self.workers)
+            ]
+
+    async def stop(self) -> None:
+        """Дообработать очередь и остановить пул обработчиков."""
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Получить метрики приёма обновлений.
+        
+        Returns:
+            Dict[str, int]: Счётчики received/rejected/dropped/processed/failed
+                            и текущая длина очереди (queue_depth)
+        """
+        return {**self._stats, "queue_depth": self._queue.qsize()}
+
+    async def _worker(self) -> None:
+        """Обработчик: передаёт обновления из очереди в диспетчер."""
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+                self._stats["processed"] += 1
+            except Exception as e:
+                self._stats["failed"] += 1
+                logging.exception(f"Ошибка обработки обновления {update.update_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+def create_webhook_app(receiver: WebhookReceiver, path: str = WEBHOOK_PATH) -> web.Application:
+    """
+    Создать aiohttp-приложение с маршрутом вебхука.
+    
+    Args:
+        receiver: Приёмник обновлений
+        path: Путь вебхука
+    
+    Returns:
+        web.Application: Приложение aiohttp
+    """
+    app = web.Application()
+    app.router.add_post(path, receiver.handle)
+    return app
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher, secret: Optional[str] = WEBHOOK_SECRET) -> None:
+    """
+    Зарегистрировать вебхук в Telegram и обслуживать его до остановки.
+    
+    Если WEBHOOK_SECRET не задан, секрет генерируется при каждом запуске:
+    он всё равно передаётся Telegram заново в setWebhook.
+    
+    Args:
+        bot: Экземпляр бота
+        dp: Диспетчер с зарегистрированными обработчиками
+        secret: Секретный токен вебхука
+    """
+    secret = secret or secrets.token_urlsafe(32)
+    receiver = WebhookReceiver(bot, dp, secret)
+    register_collector("webhook", receiver.stats)
+    runner = web.AppRunner(create_webhook_app(receiver))
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    
+    await dp.emit_startup(bot=bot, dispatcher=dp, bots=[bot])
+    receiver.start()
+    await site.start()
+    await bot.set_webhook(
+        url=WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH,
+        secret_token=secret,
+        allowed_updates=dp.resolve_used_update_types()
+    )
+    logging.info(f"Вебхук слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await receiver.stop()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp, bots=[bot])
+        await bot.session.close()
@@ -0,0 +1,138 @@
+"""
+Резидентный снимок рабочего расписания психологов.
+
+Таблица work_schedule содержит не более семи строк на психолога (по одной
+на день недели), поэтому она целиком держится в памяти в виде
+неизменяемого снимка «психолог → неделя». Снимок загружается один раз
+при запуске бота и атомарно заменяется новым после каждого изменения
+расписания, так что расчёт слотов не обращается к базе данных за строками
+расписания. После изменения расписания одного психолога перечитываются
+только его строки.
+"""
+from datetime import time
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.session import get_session
+from database.models import DEFAULT_PSYCHOLOGIST_ID, WorkSchedule
+
+
+class WorkDay(NamedTuple):
+    """
+    Рабочие часы одного дня недели.
+    
+    Attributes:
+        start_time (time): Время начала рабочего дня
+        end_time (time): Время окончания рабочего дня
+    """
+    start_time: time
+    end_time: time
+
+
+WeeklySchedule = Mapping[int, WorkDay]
+TenantSchedules = Mapping[int, WeeklySchedule]
+
+_EMPTY_WEEK: WeeklySchedule = MappingProxyType({})
+
+# None — снимок ещё не загружался
+_snapshot: Optional[TenantSchedules] = None
+
+
+def get_schedule_snapshot(
+    psychologist_id: int = DEFAULT_PSYCHOLOGIST_ID
+) -> Optional[WeeklySchedule]:
+    """
+    Получить текущий снимок расписания психолога.
+    
+    Args:
+        psychologist_id: ID психолога
+    
+    Returns:
+        Optional[WeeklySchedule]: Неизменяемое отображение «день недели →
+                                  рабочие часы» (пустое, если у психолога
+                                  нет расписания) или None, если снимок
+                                  ещё не загружен
+    """
+    if _snapshot is None:
+        return None
+    return _snapshot.get(psychologist_id, _EMPTY_WEEK)
+
+
+def _weekly(rows) -> WeeklySchedule:
+    """
+    Собрать неделю психолога из строк расписания.
+    
+    Если на один день недели заведено несколько строк, используется первая.
+    
+    Args:
+        rows: Строки WorkSchedule одного психолога
+    
+    Returns:
+        WeeklySchedule: Неизменяемое расписание недели
+    """
+    days: Dict[int, WorkDay] = {}
+    for row in rows:
+        days.setdefault(row.weekday, WorkDay(row.start_time, row.end_time))
+    return MappingProxyType(days)
+
+
+async def load_schedule_snapshot(
+    session: AsyncSession,
+    psychologist_id: Optional[int] = None
+) -> TenantSchedules:
+    """
+    Загрузить расписание из БД и атомарно заменить снимок.
+    
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        psychologist_id: Перечитать только расписание этого психолога
+                         (None — всех психологов)
+    
+    Returns:
+        TenantSchedules: Новый снимок «психолог → неделя»
+    """
+    global _snapshot
+    query = select(WorkSchedule).order_by(WorkSchedule.psychologist_id, WorkSchedule.id)
+    partial = psychologist_id is not None and _snapshot is not None
+    if partial:
+        query = query.where(WorkSchedule.psychologist_id == psychologist_id)
+    rows: Dict[int, list] = {}
+    for row in (await session.execute(query)).scalars().all():
+        rows.setdefault(row.psychologist_id, []).append(row)
+    # Снимок копируется после запроса: так не теряются изменения,
+    # внесённые другими обновлениями, пока запрос выполнялся
+    tenants = dict(_snapshot) if partial else {}
+    if partial:
+        tenants[psychologist_id] = _EMPTY_WEEK
+    for tenant, tenant_rows in rows.items():
+        tenants[tenant] = _weekly(tenant_rows)
+    snapshot = MappingProxyType(tenants)
+    _snapshot = snapshot
+    return snapshot
+
+
+async def refresh_schedule_snapshot(
+    psychologist_id: Optional[int] = None
+) -> TenantSchedules:
+    """
+    Перечитать расписание в сессии get_session().
+    
+    Вызывается при запуске бота (все психологи) и после фиксации
+    изменений расписания психолога. Из обработчика расписание читается
+    в сессии текущего обновления (изменения к этому моменту уже
+    зафиксированы), вне обработки обновления — в собственной сессии.
+    
+    Args:
+        psychologist_id: ID психолога, расписание которого изменилось
+                         (None — перечитать всех)
+    
+    Returns:
+        TenantSchedules: Новый снимок расписания
+    """
+    snapshot: TenantSchedules = MappingProxyType({})
+    async for session in get_session():
+        snapshot = await load_schedule_snapshot(session, psychologist_id)
+    return snapshot
@@ -14,6 +14,7 @@ class BookingStates(StatesGroup):
     Attributes:
         full_name: Ввод полного имени клиента (ФИО)
         phone: Ввод номера телефона клиента
+        psychologist: Выбор психолога (если психологов несколько)
         service: Выбор типа услуги (консультация, первая встреча, супервизия)
         date: Выбор даты приёма
         time: Выбор времени приёма
@@ -22,6 +23,7 @@ class BookingStates(StatesGroup):
     """
     full_name: State = State()
     phone: State = State()
+    psychologist: State = State()
     service: State = State()
     date: State = State()
     time: State = State()
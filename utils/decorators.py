@@ -7,7 +7,7 @@
 from functools import wraps
 from typing import Callable, Awaitable, Any
 
-from config import PSYCHOLOGIST_ID
+from services.psychologists import is_psychologist
 
 
 def psychologist_only(
@@ -17,8 +17,9 @@ def psychologist_only(
     Декоратор для ограничения доступа к функции только психологу.
     
     Проверяет Telegram ID пользователя, вызвавшего команду/callback.
-    Если ID не совпадает с PSYCHOLOGIST_ID из конфигурации, отправляет
-    сообщение об отказе в доступе и прерывает выполнение функции.
+    Если пользователь не входит в справочник психологов
+    (services/psychologists.py), отправляет сообщение об отказе
+    в доступе и прерывает выполнение функции.
     
     Args:
         func: Асинхронная функция-обработчик для защиты
@@ -48,7 +49,7 @@ def psychologist_only(
             user_id = event.message.from_user.id
         
         # Проверка доступа
-        if user_id != PSYCHOLOGIST_ID:
+        if not is_psychologist(user_id):
             await event.answer(
                 "🚫 Доступ запрещён. Только психолог может использовать эту команду."
             )
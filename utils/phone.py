@@ -0,0 +1,38 @@
+"""
+Нормализация номеров телефонов.
+
+Клиенты и психолог вводят телефон в произвольном виде: с пробелами,
+скобками, дефисами, через «+7» или «8». Нормализованный номер
+(только цифры, российский префикс «8» заменён на «7») служит ключом
+клиента в таблице clients: по нему запись находит уже существующего
+клиента одним INSERT ... ON CONFLICT.
+"""
+from typing import Optional
+
+# Номера короче этого числа цифр ключом клиента не считаются
+MIN_PHONE_DIGITS = 5
+# Длина столбца clients.phone_normalized
+MAX_PHONE_DIGITS = 32
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """
+    Привести номер телефона к ключу клиента.
+    
+    Args:
+        phone: Номер телефона в том виде, в каком его ввели
+    
+    Returns:
+        Optional[str]: Цифры номера ('79001234567') или None, если
+                       в строке слишком мало цифр для номера
+    
+    Example:
+        >>> normalize_phone("8 (900) 123-45-67")
+        '79001234567'
+    """
+    digits = "".join(char for char in phone or "" if char.isdigit())
+    if len(digits) < MIN_PHONE_DIGITS:
+        return None
+    if len(digits) == 11 and digits[0] == "8":
+        digits = "7" + digits[1:]
+    return digits[:MAX_PHONE_DIGITS]